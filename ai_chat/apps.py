@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class AiChatConfig(AppConfig):
     name = 'ai_chat'
+
+    def ready(self):
+        from . import context, retrieval
+        context.connect_signals()
+        retrieval.connect_signals()
@@ -0,0 +1,152 @@
+"""
+Mentor Mode context snapshot.
+
+Every chat message needs the same few facts about the user: her active
+goals, how her recent diary moods have been trending and her profile
+name. They change a few times a day while chat sends dozens of messages,
+so the summary strings are built once and cached per user. Saves and
+deletes of Goal, DiaryEntry and UserProfile drop the snapshot, which
+means prompt assembly does no queries until one of them changes.
+"""
+import logging
+from django.apps import apps
+from core.caching import tiered
+from django.db.models.signals import post_save, post_delete
+
+logger = logging.getLogger('ai_chat')
+
+CONTEXT_CACHE_TIMEOUT = 60 * 60 * 6  # 6 hours, signals do the real invalidation
+
+MOOD_LABELS = {
+    1: 'struggling',
+    2: 'difficult',
+    3: 'neutral',
+    4: 'good',
+    5: 'great',
+}
+
+
+def context_cache_key(user_id):
+    return f'ai_chat:mentor_context:{user_id}'
+
+
+def _goals_context(user_id):
+    Goal = apps.get_model('goals', 'Goal')
+    active_goals = Goal.objects.filter(
+        user_id=user_id,
+        status='active'
+    ).order_by('-created_at').values_list('title', 'role_category', 'time_horizon')[:3]
+
+    goal_list = [f"{title} ({role}, {horizon})" for title, role, horizon in active_goals]
+    return {
+        'active_goals': goal_list,
+        'goals_summary': '; '.join(goal_list) if goal_list else 'No active goals currently set',
+    }
+
+
+def _diary_context(user_id):
+    DiaryEntry = apps.get_model('diary', 'DiaryEntry')
+    recent_entries = list(
+        DiaryEntry.objects.filter(user_id=user_id)
+        .order_by('-entry_date')
+        .values_list('entry_date', 'mood')[:3]
+    )
+    if not recent_entries:
+        return {
+            'recent_diary_mood': 'unknown',
+            'mood_trend': '',
+            'recent_entries_summary': 'No recent diary entries',
+        }
+
+    # Newest first; trend compares the latest mood with the oldest of the three
+    moods = [mood for _, mood in recent_entries if mood]
+    recent_mood = 'unknown'
+    mood_trend = ''
+    if moods:
+        recent_mood = MOOD_LABELS.get(round(sum(moods) / len(moods)), 'unknown')
+        if len(moods) > 1:
+            if moods[0] > moods[-1]:
+                mood_trend = 'improving'
+            elif moods[0] < moods[-1]:
+                mood_trend = 'dipping'
+            else:
+                mood_trend = 'steady'
+
+    # Just dates, not content, for privacy
+    entry_dates = [entry_date.strftime('%b %d') for entry_date, _ in recent_entries]
+    return {
+        'recent_diary_mood': recent_mood,
+        'mood_trend': mood_trend,
+        'recent_entries_summary': f"Recent entries on: {', '.join(entry_dates)}",
+    }
+
+
+def _profile_context(user_id):
+    UserProfile = apps.get_model('core', 'UserProfile')
+    profile = UserProfile.objects.filter(user_id=user_id).values(
+        'display_name', 'preferred_language'
+    ).first()
+    return profile or {'display_name': 'Jayti', 'preferred_language': 'en'}
+
+
+def build_user_context(user_id):
+    """Run the context queries and build the summary strings"""
+    context_data = {}
+
+    try:
+        context_data.update(_goals_context(user_id))
+    except Exception as e:
+        logger.warning(f"[AI Context] Error fetching goals: {e}")
+        context_data.update(active_goals=[], goals_summary='Goals data unavailable')
+
+    try:
+        context_data.update(_diary_context(user_id))
+    except Exception as e:
+        logger.warning(f"[AI Context] Error fetching diary: {e}")
+        context_data.update(
+            recent_diary_mood='unknown',
+            mood_trend='',
+            recent_entries_summary='Diary data unavailable',
+        )
+
+    try:
+        context_data.update(_profile_context(user_id))
+    except Exception as e:
+        logger.warning(f"[AI Context] Error fetching profile: {e}")
+        context_data.update(display_name='Jayti', preferred_language='en')
+
+    return context_data
+
+
+def get_user_context(user):
+    """
+    Fetch the Mentor Mode context for a user: active goals, recent diary
+    mood and trend, entry dates and profile name. Served from the cache
+    after the first call; rebuilt only after a relevant change.
+    """
+    key = context_cache_key(user.pk)
+    context_data = tiered.get(key)
+    if context_data is None:
+        context_data = build_user_context(user.pk)
+        if 'unavailable' not in (context_data['goals_summary'] + context_data['recent_entries_summary']):
+            tiered.set(key, context_data, CONTEXT_CACHE_TIMEOUT)
+    return context_data
+
+
+def invalidate_user_context(user_id):
+    """Drop a user's cached snapshot"""
+    tiered.delete(context_cache_key(user_id))
+
+
+def _on_context_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_user_context(instance.user_id)
+
+
+def connect_signals():
+    """Invalidate snapshots when their sources change (called from AiChatConfig.ready)"""
+    for label in ('goals.Goal', 'diary.DiaryEntry', 'core.UserProfile'):
+        model = apps.get_model(label)
+        uid = label.replace('.', '_').lower()
+        post_save.connect(_on_context_change, sender=model, dispatch_uid=f'mentor_context_save_{uid}')
+        post_delete.connect(_on_context_change, sender=model, dispatch_uid=f'mentor_context_delete_{uid}')
@@ -0,0 +1,252 @@
+"""
+Keyword intent matcher behind Ask Jayti's fallback replies.
+
+All keyword groups for a language are compiled into one word-level
+automaton. The message is split into words once and each word is matched
+whole ("mad" no longer fires on "made"). Keywords list their word forms
+explicitly ("pain", "painful", not "pain*", which also fires on
+"painting"); the matcher still accepts a trailing * for word endings but
+no keyword group uses it. Phrases are followed word by word from their
+first word. Every hit adds the keyword's word count to its
+intent and the highest score wins, ties going to the intent listed first. Hindi (Devanagari) and Hinglish (romanised)
+keywords are added on top of English according to the user's
+UserProfile.preferred_language.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+# (intent, reply, {language: keywords}) in priority order
+INTENTS = [
+    ('sad',
+     "I hear that you're carrying something heavy right now. Please remember that difficult emotions are temporary, even when they feel permanent. Your Diary is always here if you need to pour out your thoughts without judgment.",
+     {'en': ['sad', 'sadness', 'upset', 'hurt', 'hurts', 'hurting', 'pain', 'painful', 'cry', 'cried', 'crying', 'depressed', 'depressing', 'depression', 'heartbroken'],
+      'hi': ['उदास', 'दुखी', 'दुख', 'रोना', 'रो रही', 'दर्द'],
+      'he': ['udaas', 'udas', 'dukhi', 'dukh', 'rona', 'ro rahi', 'dard']}),
+    ('happy',
+     "Your happiness lights up this moment. Savor it fully—these are the memories that sustain us through harder times. Would you like to capture this feeling in your Diary?",
+     {'en': ['happy', 'happiness', 'joy', 'joyful', 'excited', 'exciting', 'good news', 'celebrate', 'celebrating', 'celebration'],
+      'hi': ['खुश', 'खुशी', 'आनंद', 'मज़ा', 'मजा'],
+      'he': ['khush', 'khushi', 'maza', 'mazaa']}),
+    ('anxious',
+     "I can sense the weight of your worries. Take a slow, deep breath with me. Sometimes our minds create storms that reality doesn't warrant. What's one small thing you can control right now?",
+     {'en': ['worry', 'worries', 'worried', 'worrying', 'anxious', 'anxiety', 'stress', 'stressed', 'stressful',
+            'nervous', 'overwhelm', 'overwhelmed', 'overwhelming', 'panic', 'panicking', 'panicked'],
+      'hi': ['चिंता', 'तनाव', 'घबराहट', 'डर'],
+      'he': ['chinta', 'tension', 'ghabrahat', 'darr', 'dar lag', 'dar lagta', 'dar lagti', 'dar lag raha']}),
+    ('tired',
+     "Exhaustion is your body's way of asking for gentleness. You don't need to earn rest—it is your birthright. What would true restoration look like for you today?",
+     {'en': ['tired', 'exhausted', 'exhausting', 'exhaustion', 'burnout', 'burned out', 'burnt out', 'fatigue', 'fatigued', 'drained'],
+      'hi': ['थकी', 'थका', 'थकान', 'थकावट'],
+      'he': ['thaki', 'thak gayi', 'thakaan', 'thakan']}),
+    ('angry',
+     "Anger often masks deeper feelings—hurt, fear, or disappointment. Your feelings are valid. Would writing in your Diary help you understand what's really beneath the surface?",
+     {'en': ['angry', 'anger', 'frustrated', 'frustrating', 'frustration', 'annoyed', 'annoying', 'mad', 'furious', 'irritated', 'irritating'],
+      'hi': ['गुस्सा', 'नाराज़', 'नाराज', 'चिढ़'],
+      'he': ['gussa', 'naraz', 'naraaz', 'chidh']}),
+    ('confused',
+     "Feeling lost often precedes finding a new path. The uncertainty is uncomfortable, but it also means possibilities are open. Your Astro section might offer some cosmic perspective on this transition.",
+     {'en': ['confused', 'confusing', 'confusion', 'lost', 'uncertain', 'uncertainty', 'direction', 'stuck'],
+      'hi': ['उलझन', 'भ्रम', 'समझ नहीं'],
+      'he': ['uljhan', 'samajh nahi', 'samajh nahin']}),
+    ('goals',
+     "Your Goals section is designed to transform dreams into achievable steps. I've seen how breaking big aspirations into smaller actions creates momentum. What goal is calling for your attention right now?",
+     {'en': ['goal', 'goals', 'objective', 'objectives', 'target', 'targets', 'career', 'careers',
+            'aspiration', 'aspirations'],
+      'hi': ['लक्ष्य', 'करियर', 'सपना', 'सपने'],
+      'he': ['lakshya', 'sapna', 'sapne']}),
+    ('diary',
+     "Your Diary is a sacred space—no filters, no performances, just truth. You can type, speak, or even write by hand. And remember, you can only write for today, which makes each entry precious.",
+     {'en': ['diary', 'diaries', 'journal', 'journaling', 'journalling', 'write', 'writing', 'reflect', 'reflecting', 'reflection'],
+      'hi': ['डायरी'],
+      'he': []}),
+    ('notes',
+     "The Notes section is your external memory—freeing your mind to be more present. Tag them so you can find insights when you need them most.",
+     {'en': ['note', 'notes', 'remember', 'reminder', 'reminders', 'idea', 'ideas'],
+      'hi': ['नोट', 'याद'],
+      'he': ['yaad']}),
+    ('astro',
+     "Your birth chart is a snapshot of the sky when you entered this world. It doesn't dictate your fate, but it offers archetypal insights into your strengths and growth areas. What would you like to explore?",
+     {'en': ['astro', 'astrology', 'horoscope', 'horoscopes', 'chart', 'birth chart', 'planet', 'planets', 'zodiac'],
+      'hi': ['कुंडली', 'ज्योतिष', 'राशि', 'ग्रह'],
+      'he': ['kundli', 'kundali', 'jyotish', 'rashi', 'grah']}),
+    ('birthday',
+     "February 6th marked another year of your beautiful, complex existence. Birthdays are portals—moments to honor how far you've come and set intentions for where you're going. How are you feeling about this new year of life?",
+     {'en': ['birthday', 'birthdays', 'birth date', 'february', 'turning'],
+      'hi': ['जन्मदिन'],
+      'he': ['janamdin', 'janmdin', 'bday']}),
+    ('relationship',
+     "Relationships are where we learn some of our deepest lessons—about ourselves, about others, about trust and vulnerability. What's your heart trying to tell you about this connection?",
+     {'en': ['relationship', 'relationships', 'love', 'partner', 'boyfriend', 'girlfriend', 'marriage', 'married', 'husband', 'wife'],
+      'hi': ['प्यार', 'रिश्ता', 'रिश्ते', 'शादी'],
+      'he': ['pyaar', 'pyar', 'rishta', 'rishte', 'shaadi', 'shadi']}),
+    ('family',
+     "Family bonds run deep, carrying both nourishment and complexity. Whether you're seeking to strengthen connections or establish boundaries, your feelings about family matter.",
+     {'en': ['family', 'families', 'mother', 'mom', 'mum', 'father', 'dad', 'parents', 'sibling', 'siblings', 'brother', 'brothers', 'sister', 'sisters'],
+      'hi': ['परिवार', 'माँ', 'मां', 'पापा', 'पिता', 'भाई', 'बहन'],
+      'he': ['parivaar', 'parivar', 'mummy', 'papa', 'maa', 'bhai', 'behen']}),
+    ('friends',
+     "Human connection is essential nourishment. If you're feeling isolated, know that reaching out—even in small ways—can begin to bridge the distance. You don't have to carry everything alone.",
+     {'en': ['friend', 'friends', 'lonely', 'loneliness', 'alone'],
+      'hi': ['दोस्त', 'दोस्ती', 'अकेली', 'अकेला', 'अकेलापन'],
+      'he': ['dost', 'dosti', 'akeli', 'akela', 'akelapan']}),
+    ('work',
+     "Work is where we spend so much of our energy—it's natural for it to affect our wellbeing deeply. Are you feeling fulfilled by what you do, or is something asking to change?",
+     {'en': ['job', 'jobs', 'work', 'working', 'boss', 'colleague', 'colleagues', 'office', 'promotion', 'manager'],
+      'hi': ['नौकरी', 'काम', 'बॉस', 'ऑफिस'],
+      'he': ['naukri', 'kaam']}),
+    ('purpose',
+     "Questions of purpose are some of the most human questions we can ask. There's no single answer—purpose often emerges through lived experience, not sudden revelation. Trust the unfolding.",
+     {'en': ['purpose', 'meaning', 'meaningful', 'passion', 'passionate', 'calling'],
+      'hi': ['मकसद', 'उद्देश्य'],
+      'he': ['maqsad', 'maksad']}),
+    ('calm',
+     "Stillness is where clarity often lives. Even five minutes of intentional quiet can shift your entire day. The Astro section has some thoughts on spiritual timing if that interests you.",
+     {'en': ['meditate', 'meditating', 'meditation', 'mindful', 'mindfulness', 'spiritual',
+            'spirituality', 'peace', 'peaceful', 'calm', 'calmer'],
+      'hi': ['ध्यान', 'शांति', 'सुकून'],
+      'he': ['dhyan', 'shanti', 'sukoon']}),
+    ('about',
+     "I'm Ask Jayti—your personal companion in this space. I'm not human, but I'm here to listen, reflect, and support you. Think of me as a thoughtful friend who's always available when you need to talk.",
+     {'en': ['who are you', 'what are you', 'your name', 'are you human'],
+      'hi': ['तुम कौन हो', 'आप कौन हैं'],
+      'he': ['tum kaun ho', 'aap kaun ho']}),
+    ('creator',
+     "This entire space was created by Vivek as a birthday gift for you. Every feature, every color, every word was chosen with care for your wellbeing. Whether he remains in your life or not, this sanctuary is yours.",
+     {'en': ['vivek', 'creator', 'made this', 'built this', 'gift'],
+      'hi': ['विवेक', 'तोहफा', 'तोहफ़ा'],
+      'he': ['tohfa']}),
+    ('health',
+     "Your physical wellbeing is the foundation for everything else. Small, consistent care often matters more than dramatic changes. What one thing could you do today to honor your body?",
+     {'en': ['health', 'healthy', 'sick', 'doctor', 'doctors', 'exercise', 'exercising', 'diet', 'sleep',
+            'sleeping', 'sleepless'],
+      'hi': ['सेहत', 'स्वास्थ्य', 'बीमार', 'डॉक्टर', 'नींद'],
+      'he': ['sehat', 'bimar', 'bimaar', 'neend']}),
+]
+
+DEFAULT_RESPONSE = "I'm here with you. Tell me more about what's on your mind, or if you'd prefer, I can guide you to any of your tools—the Diary for reflection, Goals for planning, Astro for cosmic insight, or Notes for capturing thoughts."
+
+RESPONSES = {name: reply for name, reply, _ in INTENTS}
+PRIORITY = {name: i for i, (name, _, _) in enumerate(INTENTS)}
+
+# Keyword sets used for each UserProfile.preferred_language; Hindi speakers
+# often type in roman script too, so 'hi' also gets the Hinglish set
+LANGUAGE_KEYWORDS = {
+    'en': ('en',),
+    'hi': ('en', 'hi', 'he'),
+    'he': ('en', 'he'),
+}
+
+# \w does not cover Devanagari vowel signs, so they are added explicitly
+TOKEN_RE = re.compile(r'[\w\u0900-\u097F]+')
+
+
+class Matcher:
+    """
+    Word-level automaton over a language's keywords. Whole words are
+    looked up in a dict, * keywords by their prefix, and phrases are
+    followed word by word from their first word.
+    """
+
+    def __init__(self, keywords):
+        self.words = {}
+        self.prefixes = {}
+        self.phrases = {}
+        for keyword, intent in keywords:
+            is_prefix = keyword.endswith('*')
+            words = tuple(keyword.rstrip('*').lower().split())
+            if len(words) > 1:
+                self.phrases.setdefault(words[0], []).append((words[1:], is_prefix, intent))
+            elif is_prefix:
+                self.prefixes.setdefault(words[0], intent)
+            else:
+                self.words.setdefault(words[0], intent)
+        for candidates in self.phrases.values():
+            # Longest first, so "burned out" wins over a shorter phrase
+            candidates.sort(key=lambda c: len(c[0]), reverse=True)
+        self.prefix_lengths = sorted({len(p) for p in self.prefixes}, reverse=True)
+
+    def _match_phrase(self, tokens, i):
+        for rest, is_prefix, intent in self.phrases.get(tokens[i], ()):
+            end = i + 1 + len(rest)
+            following = tokens[i + 1:end]
+            if len(following) != len(rest):
+                continue
+            if following[:-1] != list(rest[:-1]):
+                continue
+            last = following[-1]
+            if last == rest[-1] or (is_prefix and last.startswith(rest[-1])):
+                return intent, end
+        return None, i
+
+    def _match_word(self, token):
+        intent = self.words.get(token)
+        if intent is None:
+            for length in self.prefix_lengths:
+                if length <= len(token):
+                    intent = self.prefixes.get(token[:length])
+                    if intent is not None:
+                        break
+        return intent
+
+    def scores(self, text):
+        """
+        Score every intent in one pass; a phrase scores once per word.
+        Each distinct word is looked up once however often it repeats, and
+        only positions holding a phrase's first word are walked in order.
+        """
+        tokens = TOKEN_RE.findall(text.lower())
+        counts = Counter(tokens)
+        scores = Counter()
+        for token, count in counts.items():
+            intent = self._match_word(token)
+            if intent is not None:
+                scores[intent] += count
+
+        if not self.phrases.keys().isdisjoint(counts):
+            phrases = self.phrases
+            resume = 0
+            for i in [i for i, token in enumerate(tokens) if token in phrases]:
+                if i < resume:
+                    continue
+                intent, end = self._match_phrase(tokens, i)
+                if intent is None:
+                    continue
+                # The phrase replaces whatever its words scored on their own
+                for token in tokens[i:end]:
+                    word_intent = self._match_word(token)
+                    if word_intent is not None:
+                        scores[word_intent] -= 1
+                scores[intent] += end - i
+                resume = end
+
+        return {intent: score for intent, score in scores.items() if score > 0}
+
+
+@lru_cache(maxsize=None)
+def compile_matcher(language='en'):
+    """Build (once per process) the matcher for a language's keyword sets"""
+    sets = LANGUAGE_KEYWORDS.get(language, LANGUAGE_KEYWORDS['en'])
+    return Matcher(
+        (keyword, name)
+        for name, _, keywords_by_language in INTENTS
+        for lang in sets
+        for keyword in keywords_by_language.get(lang, [])
+    )
+
+
+def score_intents(text, language='en'):
+    return compile_matcher(language).scores(text)
+
+
+def match_intent(text, language='en'):
+    """Best intent for the text, or None"""
+    scores = score_intents(text, language)
+    if not scores:
+        return None
+    return max(scores, key=lambda name: (scores[name], -PRIORITY[name]))
+
+
+def get_fallback_reply(text, language='en'):
+    intent = match_intent(text, language)
+    return RESPONSES[intent] if intent else DEFAULT_RESPONSE
@@ -0,0 +1,64 @@
+"""
+Benchmark the fallback intent matcher on long messages.
+
+Compares the compiled single-pass matcher with the sequential substring
+scan it replaced (one `any(word in text)` per keyword group, rebuilt here
+from the same English keywords) on generated messages of growing length.
+
+Usage:
+    python manage.py benchmark_fallback
+    python manage.py benchmark_fallback --sizes 1000 100000 --repeat 20
+"""
+
+import random
+import time
+from django.core.management.base import BaseCommand
+from ai_chat.intents import INTENTS, compile_matcher, match_intent
+
+FILLER = (
+    'today the meeting ran over and then I walked home through the market '
+    'thinking about everything that happened this week with the team'
+).split()
+
+
+def legacy_match(text):
+    text = text.lower()
+    for name, _, keywords in INTENTS:
+        if any(kw.rstrip('*') in text for kw in keywords['en']):
+            return name
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the compiled fallback intent matcher against a sequential substring scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[200, 2000, 20000, 200000],
+                            help='Message lengths in characters')
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        for language in ('en', 'hi', 'he'):
+            compile_matcher(language)
+
+        for size in options['sizes']:
+            words = []
+            while sum(len(w) + 1 for w in words) < size:
+                words.append(rng.choice(FILLER))
+            # Worst case for the old scan: the only keyword comes last
+            text = ' '.join(words) + ' and honestly I feel so lonely'
+
+            results = []
+            for label, func in (
+                ('sequential scan', legacy_match),
+                ('compiled (en)', lambda t: match_intent(t, 'en')),
+                ('compiled (hi)', lambda t: match_intent(t, 'hi')),
+            ):
+                start = time.perf_counter()
+                for _ in range(options['repeat']):
+                    intent = func(text)
+                elapsed = (time.perf_counter() - start) * 1000 / options['repeat']
+                results.append(f'{label} {elapsed:.3f} ms -> {intent}')
+            self.stdout.write(self.style.SUCCESS(f'{len(text):>7} chars: ' + ' | '.join(results)))
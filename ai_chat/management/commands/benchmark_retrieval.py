@@ -0,0 +1,91 @@
+"""
+Benchmark the Mentor Mode retrieval index on synthetic documents.
+
+Builds an index of --docs generated notes (Zipf-distributed vocabulary,
+fixed seed) in a temporary directory, then times the full build, a cold
+load from disk, queries, and incremental saves. Needs no database and no
+network.
+
+Usage:
+    python manage.py benchmark_retrieval
+    python manage.py benchmark_retrieval --docs 50000 --queries 500
+"""
+
+import itertools
+import random
+import statistics
+import tempfile
+import time
+from django.core.management.base import BaseCommand, CommandError
+from ai_chat import retrieval
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks building, loading, querying and updating the retrieval index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--docs', type=int, default=50000, help='Documents to index')
+        parser.add_argument('--queries', type=int, default=200, help='Queries to time')
+        parser.add_argument('--updates', type=int, default=50, help='Incremental saves to time')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not retrieval.NUMPY_AVAILABLE:
+            raise CommandError('numpy is not installed')
+
+        rng = random.Random(options['seed'])
+        vocabulary = [f'word{i}' for i in range(20000)]
+        cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+
+        def make_text():
+            return ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(40, 250)))
+
+        documents = [(f'note:{i}', f'Note {i}', make_text()) for i in range(options['docs'])]
+        queries = [' '.join(rng.choices(vocabulary[50:5000], k=rng.randint(3, 12))) for _ in range(options['queries'])]
+
+        with tempfile.TemporaryDirectory() as index_dir:
+            start = time.perf_counter()
+            segment = retrieval.write_index('bench', documents, index_dir)
+            build_s = time.perf_counter() - start
+            self.stdout.write(
+                f'Build: {len(documents)} documents, {segment.num_rows} passages, '
+                f'{len(segment.terms)} postings in {build_s:.1f} s'
+            )
+
+            start = time.perf_counter()
+            index = retrieval.load_index('bench', index_dir)
+            self.stdout.write(f'Cold load: {(time.perf_counter() - start) * 1000:.0f} ms')
+
+            self._time_queries('Query', index, queries)
+
+            update_ms = []
+            for i in range(options['updates']):
+                key, label, _ = documents[rng.randrange(len(documents))]
+                start = time.perf_counter()
+                retrieval.update_documents('bench', upserts=[(key, label, make_text())], index_dir=index_dir)
+                update_ms.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(
+                f'Incremental save: p50 {statistics.median(update_ms):.1f} ms, '
+                f'p95 {_percentile(update_ms, 95):.1f} ms'
+            )
+
+            start = time.perf_counter()
+            index = retrieval.load_index('bench', index_dir)
+            self.stdout.write(f'Reload with delta: {(time.perf_counter() - start) * 1000:.0f} ms')
+            self._time_queries('Query with delta', index, queries)
+
+    def _time_queries(self, label, index, queries):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, k=3)
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(self.style.SUCCESS(
+            f'{label}: p50 {statistics.median(timings):.2f} ms, '
+            f'p95 {_percentile(timings, 95):.2f} ms, max {max(timings):.2f} ms'
+        ))
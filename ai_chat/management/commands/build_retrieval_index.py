@@ -0,0 +1,54 @@
+"""
+Rebuild the Mentor Mode retrieval indexes from the database.
+
+Indexes are kept current by signals. A user without one gets it built in
+the background after their first chat message; railway_startup.sh runs
+this with --missing so that after a deploy (which wipes the disk) the
+build happens before anyone asks. Otherwise it is only needed after bulk
+imports or to compact a user's index by hand.
+
+Usage:
+    python manage.py build_retrieval_index
+    python manage.py build_retrieval_index --missing
+    python manage.py build_retrieval_index --user jayti
+"""
+
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from ai_chat import retrieval
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-user retrieval indexes over notes and diary entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Username to rebuild (default: every user)',
+        )
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Only build users who have no index yet',
+        )
+
+    def handle(self, *args, **options):
+        if not retrieval.NUMPY_AVAILABLE:
+            raise CommandError('numpy is not installed')
+
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(username=options['user'])
+            if not users.exists():
+                raise CommandError(f"User '{options['user']}' not found")
+
+        for user in users.order_by('pk'):
+            if options['missing'] and retrieval.has_index(user.pk):
+                continue
+            start = time.perf_counter()
+            segment = retrieval.build_user_index(user.pk)
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stdout.write(self.style.SUCCESS(
+                f'{user.username}: {len(segment.doc_keys)} documents, '
+                f'{segment.num_rows} passages in {elapsed:.0f} ms'
+            ))
@@ -0,0 +1,113 @@
+"""
+Conversation memory for Ask Jayti.
+
+The prompt gets the latest turns (read newest-first off the
+(conversation, timestamp) index) plus a rolling summary of everything
+older, kept on the AIConversation and extended a few messages at a time.
+Both are trimmed to a fixed token budget, so prompt size and upstream
+latency stay flat no matter how long the conversation grows.
+"""
+import re
+from django.conf import settings
+
+RECENT_TURNS = getattr(settings, 'AI_CHAT_RECENT_TURNS', 10)
+HISTORY_TOKEN_BUDGET = getattr(settings, 'AI_CHAT_HISTORY_TOKEN_BUDGET', 800)
+SUMMARY_TOKEN_BUDGET = getattr(settings, 'AI_CHAT_SUMMARY_TOKEN_BUDGET', 250)
+
+# Max messages folded into the summary per request (keeps catch-up bounded)
+SUMMARY_FOLD_LIMIT = 20
+
+USER_SNIPPET_CHARS = 140
+AI_SNIPPET_CHARS = 80
+# A single long message is cut rather than pushing every other turn out
+MAX_TURN_CHARS = 1200
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def get_recent_messages(conversation, limit=RECENT_TURNS):
+    """Latest messages in chronological order, fetched with a reverse index scan"""
+    recent = list(conversation.messages.order_by('-timestamp', '-id')[:limit])
+    recent.reverse()
+    return recent
+
+
+def _snippet(text, max_chars):
+    text = re.sub(r'<br\s*/?>', ' ', text)
+    text = ' '.join(text.split())
+    first_sentence = re.split(r'(?<=[.!?])\s', text, maxsplit=1)[0]
+    if len(first_sentence) > max_chars:
+        first_sentence = first_sentence[:max_chars - 1].rstrip() + '…'
+    return first_sentence
+
+
+def trim_to_budget(lines, budget):
+    """Keep the newest lines whose combined estimate fits the budget"""
+    kept = []
+    used = 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    kept.reverse()
+    return kept
+
+
+def update_summary(conversation, recent_messages):
+    """
+    Fold messages that have dropped out of the recent window into the
+    conversation's rolling summary. Only messages after the summary cursor
+    are read, so each request folds at most a couple of new messages.
+    """
+    if not recent_messages:
+        return
+
+    oldest_recent_id = recent_messages[0].id
+    folded = list(
+        conversation.messages.filter(
+            id__gt=conversation.summary_through_id or 0,
+            id__lt=oldest_recent_id,
+        ).order_by('id')[:SUMMARY_FOLD_LIMIT]
+    )
+    if not folded:
+        return
+
+    lines = conversation.summary.splitlines() if conversation.summary else []
+    for message in folded:
+        if message.sender == 'user':
+            lines.append(f"- She said: {_snippet(message.content, USER_SNIPPET_CHARS)}")
+        else:
+            lines.append(f"- You replied: {_snippet(message.content, AI_SNIPPET_CHARS)}")
+
+    conversation.summary = '\n'.join(trim_to_budget(lines, SUMMARY_TOKEN_BUDGET))
+    conversation.summary_through_id = folded[-1].id
+    conversation.save(update_fields=['summary', 'summary_through_id'])
+
+
+def format_history(summary, recent_messages, budget=HISTORY_TOKEN_BUDGET):
+    """Prompt lines for the summary and recent turns, newest turns kept first"""
+    turn_lines = []
+    for message in recent_messages:
+        sender = "User" if message.sender == 'user' else "Assistant"
+        content = message.content
+        if len(content) > MAX_TURN_CHARS:
+            content = content[:MAX_TURN_CHARS] + '…'
+        turn_lines.append(f"{sender}: {content}")
+    turn_lines = trim_to_budget(turn_lines, budget)
+
+    parts = []
+    remaining = budget - sum(estimate_tokens(line) for line in turn_lines)
+    if summary and remaining > 0:
+        summary_lines = trim_to_budget(summary.splitlines(), min(remaining, SUMMARY_TOKEN_BUDGET))
+        if summary_lines:
+            parts.append("\nEarlier in your conversations:")
+            parts.extend(summary_lines)
+    if turn_lines:
+        parts.append("\nRecent conversation:")
+        parts.extend(turn_lines)
+    return parts
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiconversation',
+            name='summary',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='aiconversation',
+            name='summary_through_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='aimessage',
+            index=models.Index(fields=['conversation', 'timestamp'], name='ai_chat_aim_convers_234806_idx'),
+        ),
+    ]
@@ -10,6 +10,10 @@ class AIConversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Rolling summary of messages older than the recent window (see memory.py)
+    summary = models.TextField(blank=True)
+    summary_through_id = models.BigIntegerField(null=True, blank=True)
+    
     def __str__(self):
         return f"Conversation with {self.user.username} on {self.created_at}"
 
@@ -28,6 +32,9 @@ class AIMessage(models.Model):
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['conversation', 'timestamp']),
+        ]
     
     def __str__(self):
         return f"{self.sender}: {self.content[:50]}"
@@ -0,0 +1,603 @@
+"""
+Local retrieval over a user's notes and diary for Mentor Mode.
+
+Documents are split into short passages and turned into hashed TF-IDF
+vectors: tokens are hashed into a fixed number of buckets (no vocabulary
+to maintain), each passage keeps its sublinear, L2-normalised term
+weights, and IDF is applied at query time so adding documents never
+rewrites existing weights. Everything runs locally with NumPy.
+
+Each user's index lives on disk as two files under AI_CHAT_INDEX_DIR:
+
+    <user_id>.npz         main segment, postings sorted by bucket
+    <user_id>.delta.json  documents changed since the last merge, plus
+                          tombstones for main-segment documents they replace
+
+A save only rewrites the small delta file. Queries binary-search the main
+postings and scan the delta, and the delta is merged into the main
+segment once it grows past a fraction of it.
+
+A full build streams the database for a while, so saves made meanwhile
+must survive it. It leaves a <user_id>.building marker, during which saves
+go to the delta even before there is a main segment, and notes the delta
+as it was when it started. The new main segment then replaces only those
+entries; anything recorded after the start stays in the delta.
+
+A chat message never waits for a full build: a user with no index yet
+(a new account, or any user after a deploy wipes the disk) gets no
+passages while build_user_index runs in a background thread, and
+railway_startup.sh builds the missing indexes as the server starts.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from functools import lru_cache
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models.signals import post_save, post_delete
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines; gunicorn runs on Linux
+    fcntl = None
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger('ai_chat')
+
+RETRIEVAL_ENABLED = getattr(settings, 'AI_CHAT_RETRIEVAL_ENABLED', True)
+
+NUM_BUCKETS = 1 << 18
+PASSAGE_WORDS = 80
+PASSAGE_STRIDE = 60
+MIN_SCORE = 0.1
+# Merge the delta once it holds this many passages, or this share of the main segment
+DELTA_MERGE_MIN_ROWS = 500
+DELTA_MERGE_RATIO = 0.1
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from had has have he her hers him his i if in
+into is it its just me my no not of on or our she so than that the their them
+then there they this to too was we were what when which who will with you your
+am been being do did does done i'm it's im its've ive dont don't can could would
+should very really also about
+""".split())
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def get_index_dir():
+    return getattr(settings, 'AI_CHAT_INDEX_DIR', settings.BASE_DIR / 'data' / 'retrieval')
+
+
+@lru_cache(maxsize=200000)
+def _bucket(token):
+    # crc32 rather than hash(): buckets must be stable across processes
+    return zlib.crc32(token.encode('utf-8')) & (NUM_BUCKETS - 1)
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def split_passages(text):
+    """Overlapping word windows, so a match near a boundary keeps its context"""
+    words = text.split()
+    if len(words) <= PASSAGE_WORDS:
+        return [' '.join(words)] if words else []
+    passages = []
+    for start in range(0, len(words) - PASSAGE_WORDS + PASSAGE_STRIDE, PASSAGE_STRIDE):
+        passages.append(' '.join(words[start:start + PASSAGE_WORDS]))
+    return passages
+
+
+def _pack_strings(strings):
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob, offsets):
+    raw = blob.tobytes()
+    return [raw[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+class Segment:
+    """
+    A block of passages and their postings.
+    terms/rows/weights are parallel posting arrays; row_doc maps each
+    passage row to its document in doc_keys/doc_labels.
+    """
+
+    def __init__(self, terms, rows, weights, row_doc, passages, doc_keys, doc_labels):
+        self.terms = terms
+        self.rows = rows
+        self.weights = weights
+        self.row_doc = row_doc
+        self.passages = passages
+        self.doc_keys = doc_keys
+        self.doc_labels = doc_labels
+        self._df = None
+
+    @property
+    def num_rows(self):
+        return len(self.passages)
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int32), [], [], [],
+        )
+
+    @classmethod
+    def from_documents(cls, documents, sort=True):
+        """Build a segment from (key, label, text) tuples"""
+        terms, rows, weights, row_doc = [], [], [], []
+        passages, doc_keys, doc_labels = [], [], []
+
+        for key, label, text in documents:
+            doc_index = len(doc_keys)
+            doc_keys.append(key)
+            doc_labels.append(label)
+            for passage in split_passages(text):
+                tokens = tokenize(passage)
+                if not tokens:
+                    continue
+                buckets, counts = np.unique(
+                    np.fromiter((_bucket(t) for t in tokens), dtype=np.int32, count=len(tokens)),
+                    return_counts=True,
+                )
+                tf = 1.0 + np.log(counts)
+                row = len(passages)
+                passages.append(passage)
+                row_doc.append(doc_index)
+                terms.append(buckets)
+                rows.append(np.full(len(buckets), row, dtype=np.int32))
+                weights.append((tf / np.sqrt(np.dot(tf, tf))).astype(np.float32))
+
+        if not passages:
+            segment = cls.empty()
+            segment.doc_keys, segment.doc_labels = doc_keys, doc_labels
+            return segment
+
+        segment = cls(
+            np.concatenate(terms), np.concatenate(rows), np.concatenate(weights),
+            np.array(row_doc, dtype=np.int32), passages, doc_keys, doc_labels,
+        )
+        if sort:
+            segment.sort_postings()
+        return segment
+
+    def document_frequencies(self):
+        """Passages per bucket, computed once per loaded segment"""
+        if self._df is None:
+            self._df = np.bincount(self.terms, minlength=NUM_BUCKETS)
+        return self._df
+
+    def sort_postings(self):
+        order = np.argsort(self.terms, kind='stable')
+        self.terms = self.terms[order]
+        self.rows = self.rows[order]
+        self.weights = self.weights[order]
+        self._df = None
+
+    def compact(self, alive_rows, other):
+        """Return a new sorted segment: this segment's live rows followed by other"""
+        keep = np.flatnonzero(alive_rows)
+        new_row = np.full(self.num_rows, -1, dtype=np.int32)
+        new_row[keep] = np.arange(len(keep), dtype=np.int32)
+        posting_mask = alive_rows[self.rows] if self.num_rows else np.zeros(0, dtype=bool)
+
+        kept_docs = np.unique(self.row_doc[keep])
+        new_doc = np.full(len(self.doc_keys), -1, dtype=np.int32)
+        new_doc[kept_docs] = np.arange(len(kept_docs), dtype=np.int32)
+
+        segment = Segment(
+            np.concatenate([self.terms[posting_mask], other.terms]),
+            np.concatenate([new_row[self.rows[posting_mask]], other.rows + len(keep)]),
+            np.concatenate([self.weights[posting_mask], other.weights]),
+            np.concatenate([new_doc[self.row_doc[keep]], other.row_doc + len(kept_docs)]).astype(np.int32),
+            [self.passages[i] for i in keep] + other.passages,
+            [self.doc_keys[i] for i in kept_docs] + other.doc_keys,
+            [self.doc_labels[i] for i in kept_docs] + other.doc_labels,
+        )
+        segment.sort_postings()
+        return segment
+
+    def save(self, path):
+        passages_blob, passages_offsets = _pack_strings(self.passages)
+        keys_blob, keys_offsets = _pack_strings(self.doc_keys)
+        labels_blob, labels_offsets = _pack_strings(self.doc_labels)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f, terms=self.terms, rows=self.rows, weights=self.weights, row_doc=self.row_doc,
+                passages_blob=passages_blob, passages_offsets=passages_offsets,
+                keys_blob=keys_blob, keys_offsets=keys_offsets,
+                labels_blob=labels_blob, labels_offsets=labels_offsets,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data['terms'], data['rows'], data['weights'], data['row_doc'],
+                _unpack_strings(data['passages_blob'], data['passages_offsets']),
+                _unpack_strings(data['keys_blob'], data['keys_offsets']),
+                _unpack_strings(data['labels_blob'], data['labels_offsets']),
+            )
+
+
+class UserIndex:
+    """A user's main segment and delta, with the derived state queries need"""
+
+    def __init__(self, main, delta_docs, tombstones):
+        self.main = main
+        self.delta_docs = delta_docs
+        self.tombstones = set(tombstones)
+        self.delta = Segment.from_documents(
+            ((key, label, text) for key, (label, text) in delta_docs.items()), sort=False
+        )
+
+        dead_docs = np.array(
+            [i for i, key in enumerate(main.doc_keys) if key in self.tombstones], dtype=np.int32
+        )
+        self.main_alive = ~np.isin(main.row_doc, dead_docs)
+
+        # Document frequencies over live passages; IDF is derived per query
+        df = main.document_frequencies().copy()
+        if len(dead_docs):
+            df -= np.bincount(main.terms[~self.main_alive[main.rows]], minlength=NUM_BUCKETS)
+        df += np.bincount(self.delta.terms, minlength=NUM_BUCKETS)
+        self.df = df
+        self.num_rows = int(self.main_alive.sum()) + self.delta.num_rows
+
+    def search(self, query, k=3):
+        """Return up to k passages (best one per document) as dicts"""
+        tokens = tokenize(query)
+        if not tokens or not self.num_rows:
+            return []
+        q_terms, q_counts = np.unique(np.array([_bucket(t) for t in tokens], dtype=np.int32), return_counts=True)
+        idf = np.log((self.num_rows + 1) / (self.df[q_terms] + 1)) + 1.0
+        q_weights = (1.0 + np.log(q_counts)) * idf
+        q_weights = q_weights / np.sqrt(np.dot(q_weights, q_weights)) * idf
+
+        candidates = []
+        for segment, alive, postings in (
+            (self.main, self.main_alive, self._main_postings(q_terms)),
+            (self.delta, None, self._delta_postings(q_terms)),
+        ):
+            rows, term_index, weights = postings
+            if not len(rows):
+                continue
+            scores = np.bincount(rows, weights=weights * q_weights[term_index], minlength=segment.num_rows)
+            if alive is not None:
+                scores[~alive] = 0.0
+            top = min(k * 4, len(scores))
+            best = np.argpartition(-scores, top - 1)[:top]
+            candidates.extend((float(scores[r]), segment, int(r)) for r in best if scores[r] >= MIN_SCORE)
+
+        results = []
+        seen_docs = set()
+        for score, segment, row in sorted(candidates, key=lambda c: -c[0]):
+            doc = segment.row_doc[row]
+            key = segment.doc_keys[doc]
+            if key in seen_docs:
+                continue
+            seen_docs.add(key)
+            results.append({
+                'key': key,
+                'label': segment.doc_labels[doc],
+                'text': segment.passages[row],
+                'score': round(score, 4),
+            })
+            if len(results) == k:
+                break
+        return results
+
+    def _main_postings(self, q_terms):
+        terms = self.main.terms
+        starts = np.searchsorted(terms, q_terms, side='left')
+        ends = np.searchsorted(terms, q_terms, side='right')
+        spans = [(i, s, e) for i, (s, e) in enumerate(zip(starts, ends)) if e > s]
+        if not spans:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows = np.concatenate([self.main.rows[s:e] for _, s, e in spans])
+        term_index = np.concatenate([np.full(e - s, i) for i, s, e in spans])
+        weights = np.concatenate([self.main.weights[s:e] for _, s, e in spans])
+        return rows, term_index, weights
+
+    def _delta_postings(self, q_terms):
+        mask = np.isin(self.delta.terms, q_terms)
+        terms = self.delta.terms[mask]
+        return self.delta.rows[mask], np.searchsorted(q_terms, terms), self.delta.weights[mask]
+
+
+# ---------------------------------------------------------------------------
+# Storage, locking and the per-process cache
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _paths(user_id, index_dir=None):
+    index_dir = str(index_dir or get_index_dir())
+    base = os.path.join(index_dir, str(user_id))
+    return f'{base}.npz', f'{base}.delta.json', f'{base}.lock'
+
+
+def _building_path(user_id, index_dir=None):
+    return os.path.join(str(index_dir or get_index_dir()), f'{user_id}.building')
+
+
+class _FileLock:
+    """Exclusive lock so gunicorn workers don't interleave index writes"""
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self):
+        self.handle = open(self.path, 'a')
+        if fcntl:
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+        self.handle.close()
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _read_delta(delta_path):
+    try:
+        with open(delta_path, encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('docs', {}), data.get('tombstones', [])
+    except FileNotFoundError:
+        return {}, []
+
+
+def _write_delta(delta_path, docs, tombstones):
+    tmp_path = f'{delta_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'docs': docs, 'tombstones': sorted(tombstones)}, f, ensure_ascii=False)
+    os.replace(tmp_path, delta_path)
+
+
+def load_index(user_id, index_dir=None):
+    """Return the user's UserIndex, reloading only when a file changed on disk"""
+    main_path, delta_path, _ = _paths(user_id, index_dir)
+    stamp = (_mtime(main_path), _mtime(delta_path))
+    if stamp[0] is None:
+        return None
+
+    cache_key = (str(index_dir or get_index_dir()), user_id)
+    with _cache_lock:
+        cached = _cache.get(cache_key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+    # A save only touches the delta; keep the already loaded main segment
+    if cached and cached[0][0] == stamp[0]:
+        main = cached[1].main
+    else:
+        main = Segment.load(main_path)
+    delta_docs, tombstones = _read_delta(delta_path)
+    index = UserIndex(main, delta_docs, tombstones)
+    with _cache_lock:
+        _cache[cache_key] = (stamp, index)
+    return index
+
+
+def _changed_since(start, docs, tombstones):
+    """The delta entries recorded after `start` (a (docs, tombstones) snapshot)"""
+    start_docs, start_tombstones = start
+    kept = {key: value for key, value in docs.items() if start_docs.get(key) != value}
+    deleted = {key for key in start_docs if key not in docs}
+    return kept, set(kept) | deleted | (set(tombstones) - set(start_tombstones))
+
+
+def write_index(user_id, documents, index_dir=None, delta_at_start=None):
+    """
+    Replace a user's index with a freshly built main segment. The delta is
+    dropped, except for entries recorded after delta_at_start when given
+    (the documents were read while saves kept coming in).
+    """
+    main_path, delta_path, lock_path = _paths(user_id, index_dir)
+    os.makedirs(os.path.dirname(main_path), exist_ok=True)
+    segment = Segment.from_documents(documents)
+    with _FileLock(lock_path):
+        segment.save(main_path)
+        docs, tombstones = _changed_since(delta_at_start, *_read_delta(delta_path)) if delta_at_start else ({}, set())
+        if docs or tombstones:
+            _write_delta(delta_path, docs, tombstones)
+        elif os.path.exists(delta_path):
+            os.remove(delta_path)
+    return segment
+
+
+def update_documents(user_id, upserts=(), deletes=(), index_dir=None):
+    """
+    Record changed documents in the delta. upserts are (key, label, text)
+    tuples; deletes are keys. Merges the delta into the main segment once
+    it is large enough, unless a build is about to replace that segment.
+    """
+    main_path, delta_path, lock_path = _paths(user_id, index_dir)
+    with _FileLock(lock_path):
+        docs, tombstones = _read_delta(delta_path)
+        tombstones = set(tombstones)
+        for key, label, text in upserts:
+            docs[key] = [label, text]
+            tombstones.add(key)
+        for key in deletes:
+            docs.pop(key, None)
+            tombstones.add(key)
+        _write_delta(delta_path, docs, tombstones)
+
+        if is_building(user_id, index_dir):
+            return
+        delta_rows = sum(len(split_passages(text)) for _, text in docs.values())
+        if delta_rows > DELTA_MERGE_MIN_ROWS and delta_rows > DELTA_MERGE_RATIO * _main_num_rows(main_path):
+            index = load_index(user_id, index_dir)
+            if index is not None:
+                index.main.compact(index.main_alive, index.delta).save(main_path)
+                os.remove(delta_path)
+
+
+def _main_num_rows(main_path):
+    # npz members load lazily, so this reads one small array
+    try:
+        with np.load(main_path) as data:
+            return len(data['row_doc'])
+    except FileNotFoundError:
+        return 0
+
+
+# ---------------------------------------------------------------------------
+# Notes and diary as documents
+
+def _note_document(note):
+    text = f"{note.title}\n{note.content_plain}".strip()
+    return f'note:{note.pk}', f"Note: {note.title or 'Untitled'}", text
+
+
+def _diary_document(entry):
+    text = '\n'.join(part for part in (entry.content, entry.mood_note) if part)
+    return f'diary:{entry.pk}', f"Diary, {entry.entry_date.strftime('%b %d, %Y')}", text
+
+
+def iter_user_documents(user_id):
+    Note = apps.get_model('notes', 'Note')
+    DiaryEntry = apps.get_model('diary', 'DiaryEntry')
+    notes = Note.objects.filter(user_id=user_id).only('id', 'title', 'content_plain')
+    for note in notes.iterator(chunk_size=500):
+        yield _note_document(note)
+    entries = DiaryEntry.objects.filter(user_id=user_id).only('id', 'entry_date', 'content', 'mood_note')
+    for entry in entries.iterator(chunk_size=500):
+        yield _diary_document(entry)
+
+
+def build_user_index(user_id, index_dir=None):
+    """Index every note and diary entry of a user from the database"""
+    main_path, delta_path, lock_path = _paths(user_id, index_dir)
+    building_path = _building_path(user_id, index_dir)
+    os.makedirs(os.path.dirname(main_path), exist_ok=True)
+    with _FileLock(lock_path):
+        # From here on saves land in the delta (see _apply_change)
+        open(building_path, 'a').close()
+        delta_at_start = _read_delta(delta_path)
+    try:
+        return write_index(user_id, iter_user_documents(user_id), index_dir, delta_at_start)
+    finally:
+        try:
+            os.remove(building_path)
+        except FileNotFoundError:
+            pass  # a concurrent build of the same user finished first
+
+
+_building = set()
+_building_lock = threading.Lock()
+
+
+def _build_in_background(user_id):
+    try:
+        build_user_index(user_id)
+    except Exception as e:
+        logger.warning(f"[AI Retrieval] Background build failed for user {user_id}: {e}")
+    finally:
+        close_old_connections()
+        with _building_lock:
+            _building.discard(user_id)
+
+
+def schedule_build(user_id):
+    """Build the user's index in a background thread (once per process at a time)"""
+    with _building_lock:
+        if user_id in _building:
+            return
+        _building.add(user_id)
+    threading.Thread(target=_build_in_background, args=(user_id,), daemon=True,
+                     name=f'retrieval-build-{user_id}').start()
+
+
+def has_index(user_id, index_dir=None):
+    return os.path.exists(_paths(user_id, index_dir)[0])
+
+
+def is_building(user_id, index_dir=None):
+    return os.path.exists(_building_path(user_id, index_dir))
+
+
+def get_relevant_passages(user_id, query, k=3):
+    """
+    Top-k passages from the user's notes and diary for a chat message;
+    none while the user's index is still being built
+    """
+    if not (NUMPY_AVAILABLE and RETRIEVAL_ENABLED):
+        return []
+    try:
+        index = load_index(user_id)
+        if index is None:
+            schedule_build(user_id)
+            return []
+        return index.search(query, k)
+    except Exception as e:
+        logger.warning(f"[AI Retrieval] Search failed for user {user_id}: {e}")
+        return []
+
+
+def _on_document_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    document = _note_document(instance) if sender._meta.model_name == 'note' else _diary_document(instance)
+    _apply_change(instance.user_id, upserts=[document])
+
+
+def _on_document_deleted(sender, instance, **kwargs):
+    prefix = 'note' if sender._meta.model_name == 'note' else 'diary'
+    _apply_change(instance.user_id, deletes=[f'{prefix}:{instance.pk}'])
+
+
+def _apply_change(user_id, upserts=(), deletes=()):
+    # A user with no index yet gets a full build on their first query
+    # instead, unless one is already reading the database: it may have
+    # passed this document, so the change goes to the delta it keeps
+    if not (NUMPY_AVAILABLE and RETRIEVAL_ENABLED):
+        return
+    if not has_index(user_id) and not is_building(user_id):
+        return
+    try:
+        update_documents(user_id, upserts, deletes)
+    except Exception as e:
+        # Never fail a save over the index; the next rebuild catches up
+        logger.warning(f"[AI Retrieval] Index update failed for user {user_id}: {e}")
+
+
+def connect_signals():
+    """Keep indexes current as notes and diary entries change (called from AiChatConfig.ready)"""
+    for label in ('notes.Note', 'diary.DiaryEntry'):
+        model = apps.get_model(label)
+        uid = label.replace('.', '_').lower()
+        post_save.connect(_on_document_saved, sender=model, dispatch_uid=f'retrieval_save_{uid}')
+        post_delete.connect(_on_document_deleted, sender=model, dispatch_uid=f'retrieval_delete_{uid}')
@@ -1,3 +1,48 @@
-from django.test import TestCase
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from notes.models import Note
+from . import retrieval
 
-# Create your tests here.
+
+class IndexBuildTests(TestCase):
+    def setUp(self):
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.index_dir.cleanup)
+        override = override_settings(AI_CHAT_INDEX_DIR=self.index_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user('writer')
+        self.note = Note.objects.create(user=self.user, title='Garden', content='tomatoes and basil')
+
+    def search(self, query):
+        return [hit['key'] for hit in retrieval.load_index(self.user.pk).search(query)]
+
+    def test_saves_during_a_build_are_kept(self):
+        stream = retrieval.iter_user_documents
+
+        def slow_stream(user_id):
+            yield from stream(user_id)
+            # Saved after the build read the notes, before it wrote the index
+            self.note.content = 'cucumbers and dill'
+            self.note.save()
+            Note.objects.create(user=self.user, title='Travel', content='lisbon trams')
+
+        with mock.patch.object(retrieval, 'iter_user_documents', slow_stream):
+            retrieval.build_user_index(self.user.pk)
+
+        self.assertFalse(retrieval.is_building(self.user.pk))
+        self.assertEqual(self.search('cucumbers'), [f'note:{self.note.pk}'])
+        self.assertEqual(self.search('tomatoes'), [])
+        self.assertEqual(len(self.search('lisbon')), 1)
+
+    def test_rebuild_drops_the_delta_it_replaces(self):
+        retrieval.build_user_index(self.user.pk)
+        self.note.content = 'cucumbers and dill'
+        self.note.save()
+
+        retrieval.build_user_index(self.user.pk)
+
+        self.assertEqual(retrieval._read_delta(retrieval._paths(self.user.pk)[1]), ({}, []))
+        self.assertEqual(self.search('cucumbers'), [f'note:{self.note.pk}'])
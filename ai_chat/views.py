@@ -1,3 +1,4 @@
+import logging
 import os
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
@@ -8,81 +9,20 @@ from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 import json
-import google.generativeai as genai
+from core import clients
+from core.llm import gemini_enabled, generate_content, LLMUnavailable
 from .models import AIConversation, AIMessage
+from .context import get_user_context
+from .retrieval import get_relevant_passages
+from .intents import get_fallback_reply
+from .memory import RECENT_TURNS, get_recent_messages, update_summary, format_history
 
-# Configure Gemini API
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-    gemini_model = genai.GenerativeModel(settings.GEMINI_MODEL)
-else:
-    gemini_model = None
+logger = logging.getLogger('ai_chat')
 
-
-def get_user_context(user):
-    """
-    Fetch real database context for Mentor Mode AI.
-    Returns active goals and recent diary entries.
-    """
-    context_data = {
-        'active_goals': [],
-        'recent_diary_mood': 'unknown',
-        'recent_entries_summary': '',
-        'goals_summary': ''
-    }
-    
-    try:
-        # Fetch Active Goals
-        from goals.models import Goal
-        active_goals = Goal.objects.filter(
-            user=user, 
-            status='active'
-        ).order_by('-created_at')[:3]
-        
-        if active_goals:
-            goal_list = [f"{g.title} ({g.role_category}, {g.time_horizon})" for g in active_goals]
-            context_data['active_goals'] = goal_list
-            context_data['goals_summary'] = '; '.join(goal_list)
-        else:
-            context_data['goals_summary'] = 'No active goals currently set'
-        
-    except Exception as e:
-        print(f"[AI Context] Error fetching goals: {e}")
-        context_data['goals_summary'] = 'Goals data unavailable'
-    
-    try:
-        # Fetch Recent Diary Entries (last 3)
-        from diary.models import DiaryEntry
-        recent_entries = DiaryEntry.objects.filter(
-            user=user
-        ).order_by('-entry_date')[:3]
-        
-        if recent_entries:
-            # Calculate average mood
-            moods = [e.mood for e in recent_entries if e.mood]
-            if moods:
-                avg_mood = sum(moods) / len(moods)
-                mood_labels = {
-                    1: 'struggling',
-                    2: 'difficult', 
-                    3: 'neutral',
-                    4: 'good',
-                    5: 'great'
-                }
-                context_data['recent_diary_mood'] = mood_labels.get(round(avg_mood), 'unknown')
-            
-            # Summarize recent entries (just dates, not content for privacy)
-            entry_dates = [e.entry_date.strftime('%b %d') for e in recent_entries]
-            context_data['recent_entries_summary'] = f"Recent entries on: {', '.join(entry_dates)}"
-        else:
-            context_data['recent_entries_summary'] = 'No recent diary entries'
-            context_data['recent_diary_mood'] = 'unknown'
-            
-    except Exception as e:
-        print(f"[AI Context] Error fetching diary: {e}")
-        context_data['recent_entries_summary'] = 'Diary data unavailable'
-    
-    return context_data
+# Chat replies are interactive: queue briefly for a Gemini slot and give
+# up on a slow reply (GEMINI_CHAT_TIMEOUT) well before the worker timeout,
+# then fall back
+GEMINI_QUEUE_DEADLINE = 2
 
 
 # System prompt for Jayti's AI Companion - MENTOR MODE
@@ -116,17 +56,19 @@ CONTEXT AWARENESS:
 - You celebrate her progress visibly"""
 
 
-def get_ai_response(user_input, user, conversation_history=None):
+def get_ai_response(user_input, user, conversation_history=None, conversation_summary=''):
     """Get response from Gemini API with Mentor Mode context"""
+    # FETCH REAL CONTEXT (Mentor Mode) - cached snapshot, rebuilt on change
+    user_context = get_user_context(user)
+    language = user_context['preferred_language']
+    
+    # Gemini client (or the load-testing stub), imported on first use
+    gemini_model = clients.get('gemini_model')
     if not gemini_model:
-        return get_fallback_response(user_input)
+        return get_fallback_response(user_input, language)
     
     try:
-        # Get user's display name
-        display_name = user.profile.display_name if hasattr(user, 'profile') else "Jayti"
-        
-        # FETCH REAL CONTEXT FROM DATABASE (Mentor Mode)
-        user_context = get_user_context(user)
+        display_name = user_context['display_name']
         
         # Build Mentor Mode context injection
         context_parts = [SYSTEM_PROMPT]
@@ -135,18 +77,22 @@ def get_ai_response(user_input, user, conversation_history=None):
         # Inject dynamic context - THIS IS THE MENTOR MODE
         context_parts.append(f"\n=== CONTEXT (You remember this about her) ===")
         context_parts.append(f"CURRENT ACTIVE GOALS: {user_context['goals_summary']}")
-        context_parts.append(f"RECENT MOOD: She has been feeling {user_context['recent_diary_mood']} recently")
+        mood_trend = f" ({user_context['mood_trend']})" if user_context['mood_trend'] else ''
+        context_parts.append(f"RECENT MOOD: She has been feeling {user_context['recent_diary_mood']} recently{mood_trend}")
         context_parts.append(f"DIARY ACTIVITY: {user_context['recent_entries_summary']}")
+        
+        # Passages from her own notes and diary that relate to this message
+        passages = get_relevant_passages(user.pk, user_input)
+        if passages:
+            context_parts.append("FROM HER NOTES AND DIARY (relevant to this message):")
+            for passage in passages:
+                context_parts.append(f"- [{passage['label']}] {passage['text'][:400]}")
         context_parts.append(f"=== END CONTEXT ===")
         
         context_parts.append(f"\nMENTOR INSTRUCTION: Based on the above context, provide personalized guidance. Reference her specific goals. Acknowledge her emotional state. Be the wise companion who remembers her journey.")
         
-        # Add recent conversation history for continuity
-        if conversation_history:
-            context_parts.append("\nRecent conversation:")
-            for msg in conversation_history[-5:]:
-                sender = "User" if msg.sender == 'user' else "Assistant"
-                context_parts.append(f"{sender}: {msg.content}")
+        # Add rolling summary and recent turns, within the history token budget
+        context_parts.extend(format_history(conversation_summary, conversation_history or []))
         
         context_parts.append(f"\nUser: {user_input}")
         context_parts.append("\nAssistant (respond as her personal mentor):")
@@ -154,97 +100,33 @@ def get_ai_response(user_input, user, conversation_history=None):
         full_prompt = "\n".join(context_parts)
         
         # Generate response
-        response = gemini_model.generate_content(
+        response = generate_content(
+            gemini_model,
             full_prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=200,
-                top_p=0.9,
-            )
+            user_id=user.pk,
+            timeout=getattr(settings, 'GEMINI_CHAT_TIMEOUT', None),
+            queue_deadline=GEMINI_QUEUE_DEADLINE,
+            generation_config={
+                'temperature': 0.7,
+                'max_output_tokens': 200,
+                'top_p': 0.9,
+            }
         )
         
         # Clean and return response
-        ai_response = response.text.strip() if response.text else get_fallback_response(user_input)
+        ai_response = response.text.strip() if response.text else get_fallback_response(user_input, language)
         return clean_response(ai_response)
         
+    except LLMUnavailable:
+        return get_fallback_response(user_input, language)
     except Exception as e:
-        print(f"Gemini API error: {e}")
-        return get_fallback_response(user_input)
+        logger.exception("Gemini API error: %s", e)
+        return get_fallback_response(user_input, language)
 
 
-def get_fallback_response(user_input):
+def get_fallback_response(user_input, language='en'):
     """Fallback responses when Gemini API fails"""
-    user_input_lower = user_input.lower()
-    
-    # Emotional support patterns
-    if any(word in user_input_lower for word in ['sad', 'upset', 'hurt', 'pain', 'cry', 'depressed']):
-        return "I hear that you're carrying something heavy right now. Please remember that difficult emotions are temporary, even when they feel permanent. Your Diary is always here if you need to pour out your thoughts without judgment."
-    
-    if any(word in user_input_lower for word in ['happy', 'joy', 'excited', 'good news', 'celebrate']):
-        return "Your happiness lights up this moment. Savor it fully—these are the memories that sustain us through harder times. Would you like to capture this feeling in your Diary?"
-    
-    if any(word in user_input_lower for word in ['worried', 'anxious', 'stress', 'nervous', 'overwhelmed']):
-        return "I can sense the weight of your worries. Take a slow, deep breath with me. Sometimes our minds create storms that reality doesn't warrant. What's one small thing you can control right now?"
-    
-    if any(word in user_input_lower for word in ['tired', 'exhausted', 'burnout', 'fatigue']):
-        return "Exhaustion is your body's way of asking for gentleness. You don't need to earn rest—it is your birthright. What would true restoration look like for you today?"
-    
-    if any(word in user_input_lower for word in ['angry', 'frustrated', 'annoyed', 'mad']):
-        return "Anger often masks deeper feelings—hurt, fear, or disappointment. Your feelings are valid. Would writing in your Diary help you understand what's really beneath the surface?"
-    
-    if any(word in user_input_lower for word in ['confused', 'lost', 'uncertain', 'direction']):
-        return "Feeling lost often precedes finding a new path. The uncertainty is uncomfortable, but it also means possibilities are open. Your Astro section might offer some cosmic perspective on this transition."
-    
-    # Feature-related
-    if any(word in user_input_lower for word in ['goal', 'objective', 'target', 'career', 'aspiration']):
-        return "Your Goals section is designed to transform dreams into achievable steps. I've seen how breaking big aspirations into smaller actions creates momentum. What goal is calling for your attention right now?"
-    
-    if any(word in user_input_lower for word in ['diary', 'journal', 'write', 'reflect']):
-        return "Your Diary is a sacred space—no filters, no performances, just truth. You can type, speak, or even write by hand. And remember, you can only write for today, which makes each entry precious."
-    
-    if any(word in user_input_lower for word in ['note', 'remember', 'reminder', 'idea']):
-        return "The Notes section is your external memory—freeing your mind to be more present. Tag them so you can find insights when you need them most."
-    
-    if any(word in user_input_lower for word in ['astro', 'astrology', 'horoscope', 'chart', 'planet']):
-        return "Your birth chart is a snapshot of the sky when you entered this world. It doesn't dictate your fate, but it offers archetypal insights into your strengths and growth areas. What would you like to explore?"
-    
-    if any(word in user_input_lower for word in ['birthday', 'birth date', 'february', 'turning']):
-        return "February 6th marked another year of your beautiful, complex existence. Birthdays are portals—moments to honor how far you've come and set intentions for where you're going. How are you feeling about this new year of life?"
-    
-    # Relationship topics
-    if any(word in user_input_lower for word in ['relationship', 'love', 'partner', 'boyfriend', 'girlfriend', 'marriage']):
-        return "Relationships are where we learn some of our deepest lessons—about ourselves, about others, about trust and vulnerability. What's your heart trying to tell you about this connection?"
-    
-    if any(word in user_input_lower for word in ['family', 'mother', 'father', 'parents', 'sibling']):
-        return "Family bonds run deep, carrying both nourishment and complexity. Whether you're seeking to strengthen connections or establish boundaries, your feelings about family matter."
-    
-    if any(word in user_input_lower for word in ['friend', 'friendship', 'lonely', 'alone']):
-        return "Human connection is essential nourishment. If you're feeling isolated, know that reaching out—even in small ways—can begin to bridge the distance. You don't have to carry everything alone."
-    
-    # Work/Career topics
-    if any(word in user_input_lower for word in ['job', 'work', 'boss', 'colleague', 'office', 'promotion']):
-        return "Work is where we spend so much of our energy—it's natural for it to affect our wellbeing deeply. Are you feeling fulfilled by what you do, or is something asking to change?"
-    
-    # Self-discovery
-    if any(word in user_input_lower for word in ['purpose', 'meaning', 'why', 'passion', 'calling']):
-        return "Questions of purpose are some of the most human questions we can ask. There's no single answer—purpose often emerges through lived experience, not sudden revelation. Trust the unfolding."
-    
-    if any(word in user_input_lower for word in ['meditate', 'mindful', 'spiritual', 'peace', 'calm']):
-        return "Stillness is where clarity often lives. Even five minutes of intentional quiet can shift your entire day. The Astro section has some thoughts on spiritual timing if that interests you."
-    
-    # About the companion
-    if any(word in user_input_lower for word in ['who are you', 'what are you', 'your name', 'are you human']):
-        return "I'm Ask Jayti—your personal companion in this space. I'm not human, but I'm here to listen, reflect, and support you. Think of me as a thoughtful friend who's always available when you need to talk."
-    
-    if any(word in user_input_lower for word in ['vivek', 'creator', 'made this', 'built this', 'gift']):
-        return "This entire space was created by Vivek as a birthday gift for you. Every feature, every color, every word was chosen with care for your wellbeing. Whether he remains in your life or not, this sanctuary is yours."
-    
-    # Health
-    if any(word in user_input_lower for word in ['health', 'sick', 'doctor', 'exercise', 'diet', 'sleep']):
-        return "Your physical wellbeing is the foundation for everything else. Small, consistent care often matters more than dramatic changes. What one thing could you do today to honor your body?"
-    
-    # Default response
-    return "I'm here with you. Tell me more about what's on your mind, or if you'd prefer, I can guide you to any of your tools—the Diary for reflection, Goals for planning, Astro for cosmic insight, or Notes for capturing thoughts."
+    return get_fallback_reply(user_input, language)
 
 
 def clean_response(response):
@@ -273,10 +155,10 @@ def chat_interface(request):
         user=request.user,
     )
     
-    messages = conversation.messages.all()[:50]  # Last 50 messages
+    messages = get_recent_messages(conversation, 50)  # Last 50 messages
     
     # Check if Gemini is available
-    gemini_available = gemini_model is not None
+    gemini_available = gemini_enabled()
     
     context = {
         'messages': messages,
@@ -300,30 +182,35 @@ def send_message(request):
         # Get or create conversation
         conversation, _ = AIConversation.objects.get_or_create(user=request.user)
         
+        # Latest turns (before this message) for context; older ones live in the summary
+        recent_messages = get_recent_messages(conversation)
+        
         # Save user message
-        AIMessage.objects.create(
+        user_msg = AIMessage.objects.create(
             conversation=conversation,
             sender='user',
             content=user_message
         )
         
-        # Get recent conversation history for context
-        recent_messages = conversation.messages.all()[:10]
-        
         # Get AI response (Gemini with Mentor Mode context)
-        ai_response = get_ai_response(user_message, request.user, recent_messages)
+        ai_response = get_ai_response(
+            user_message, request.user, recent_messages, conversation.summary
+        )
         
         # Save AI message
-        AIMessage.objects.create(
+        ai_message = AIMessage.objects.create(
             conversation=conversation,
             sender='ai',
             content=ai_response
         )
         
+        # Fold turns that just left the recent window into the rolling summary
+        update_summary(conversation, (recent_messages + [user_msg, ai_message])[-RECENT_TURNS:])
+        
         return JsonResponse({
             'response': ai_response,
-            'timestamp': conversation.messages.last().timestamp.isoformat(),
-            'ai_engine': 'gemini' if gemini_model else 'fallback'
+            'timestamp': ai_message.timestamp.isoformat(),
+            'ai_engine': 'gemini' if gemini_enabled() else 'fallback'
         })
     
     except Exception as e:
@@ -4,14 +4,13 @@ from django.contrib import messages
 from .models import BirthChart, PlanetPosition, HouseDetail, Prediction
 from datetime import datetime, timedelta
 import math
+from core.caching import tiered
+from core import clients
 
-# Try to import swisseph - make astrology optional if library fails
-try:
-    import swisseph as swe
-    SWISSEPH_AVAILABLE = True
-except ImportError:
-    swe = None
-    SWISSEPH_AVAILABLE = False
+# swisseph (wrapped for Server-Timing) is imported on first use through
+# clients.get('swisseph'), which is None when the library is missing
+
+CHART_CACHE_TIMEOUT = 60 * 60 * 24
 
 # Jayti's birth data
 JAYTI_BIRTH_DATA = {
@@ -27,19 +26,17 @@ JAYTI_BIRTH_DATA = {
 }
 
 # Vedic Astrology Constants
-if SWISSEPH_AVAILABLE:
-    PLANETS = {
-        swe.SUN: ('sun', 'Sun', '☉'),
-        swe.MOON: ('moon', 'Moon', '☽'),
-        swe.MARS: ('mars', 'Mars', '♂'),
-        swe.MERCURY: ('mercury', 'Mercury', '☿'),
-        swe.JUPITER: ('jupiter', 'Jupiter', '♃'),
-        swe.VENUS: ('venus', 'Venus', '♀'),
-        swe.SATURN: ('saturn', 'Saturn', '♄'),
-        swe.TRUE_NODE: ('rahu', 'Rahu', '☊'),
-    }
-else:
-    PLANETS = {}
+# Keyed by Swiss Ephemeris body number (swe.SUN == 0 ... swe.TRUE_NODE == 11)
+PLANETS = {
+    0: ('sun', 'Sun', '☉'),
+    1: ('moon', 'Moon', '☽'),
+    4: ('mars', 'Mars', '♂'),
+    2: ('mercury', 'Mercury', '☿'),
+    5: ('jupiter', 'Jupiter', '♃'),
+    3: ('venus', 'Venus', '♀'),
+    6: ('saturn', 'Saturn', '♄'),
+    11: ('rahu', 'Rahu', '☊'),
+}
 
 # Calculate Ketu position (opposite to Rahu)
 def get_ketu_position(rahu_degree):
@@ -137,7 +134,8 @@ PLANET_INFO = {
 
 def calculate_julian_day(year, month, day, hour, minute, timezone_offset=5.5):
     """Calculate Julian Day Number for given date/time"""
-    if not SWISSEPH_AVAILABLE:
+    swe = clients.get('swisseph')
+    if swe is None:
         return 0
     decimal_hour = hour + minute / 60.0 - timezone_offset
     return swe.julday(year, month, day, decimal_hour)
@@ -166,7 +164,8 @@ def get_nakshatra_from_degree(degree):
 
 def calculate_houses(julian_day, latitude, longitude):
     """Calculate house cusps using Placidus system"""
-    if not SWISSEPH_AVAILABLE:
+    swe = clients.get('swisseph')
+    if swe is None:
         return [0] * 12
     houses = swe.houses_ex(julian_day, latitude, longitude, b'P')
     return houses[0]  # Array of 12 house cusps
@@ -176,7 +175,8 @@ def calculate_planet_positions(julian_day):
     """Calculate all planet positions"""
     positions = {}
     
-    if not SWISSEPH_AVAILABLE:
+    swe = clients.get('swisseph')
+    if swe is None:
         return positions
     
     for planet_id, (name, full_name, symbol) in PLANETS.items():
@@ -220,7 +220,8 @@ def calculate_planet_positions(julian_day):
 
 def assign_planets_to_houses(planet_positions, house_cusps):
     """Assign planets to houses based on house cusps"""
-    if not SWISSEPH_AVAILABLE:
+    swe = clients.get('swisseph')
+    if swe is None:
         return {}
     ayanamsa = swe.get_ayanamsa_ut(swe.julday(1997, 2, 6, 17.5))
     
@@ -514,7 +515,8 @@ def calculate_birth_chart():
             planet_positions[planet_name]['house'] = house
     
     # Determine ascendant (1st house cusp)
-    ayanamsa = swe.get_ayanamsa_ut(jd) if SWISSEPH_AVAILABLE else 0
+    swe = clients.get('swisseph')
+    ayanamsa = swe.get_ayanamsa_ut(jd) if swe is not None else 0
     ascendant_degree = (house_cusps[0] - ayanamsa) % 360
     ascendant_rashi, _ = get_rashi_from_degree(ascendant_degree)
     
@@ -525,7 +527,7 @@ def calculate_birth_chart():
     houses = {}
     for i in range(12):
         house_num = i + 1
-        cusp_degree = (house_cusps[i] - ayanamsa) % 360 if SWISSEPH_AVAILABLE else 0
+        cusp_degree = (house_cusps[i] - ayanamsa) % 360 if swe is not None else 0
         rashi, _ = get_rashi_from_degree(cusp_degree)
         
         planets_in_house = [
@@ -554,16 +556,25 @@ def calculate_birth_chart():
     }
 
 
+def get_birth_chart():
+    """
+    The birth chart from the tiered cache. Positions never change, but
+    current_dasha depends on the date, so each day gets its own entry.
+    """
+    today = datetime.now().date().isoformat()
+    return tiered.get_or_compute(f'astro:chart:{today}', calculate_birth_chart, timeout=CHART_CACHE_TIMEOUT)
+
+
 @login_required
 def astro_dashboard(request):
     """Astrology dashboard overview"""
-    if not SWISSEPH_AVAILABLE:
+    if clients.get('swisseph') is None:
         messages.warning(request, 'Astrology features are temporarily unavailable. Please try again later.')
         return render(request, 'astro/astro_dashboard.html', {
             'birth_data': JAYTI_BIRTH_DATA,
             'swisseph_unavailable': True,
         })
-    chart_data = calculate_birth_chart()
+    chart_data = get_birth_chart()
     
     context = {
         'birth_data': JAYTI_BIRTH_DATA,
@@ -577,7 +588,7 @@ def astro_dashboard(request):
 @login_required
 def birth_chart(request):
     """Display birth chart with visual representation"""
-    chart_data = calculate_birth_chart()
+    chart_data = get_birth_chart()
     
     # Prepare chart data for display
     chart_display = []
@@ -630,7 +641,7 @@ def birth_chart(request):
 @login_required
 def house_details(request):
     """Detailed house analysis"""
-    chart_data = calculate_birth_chart()
+    chart_data = get_birth_chart()
     
     house_meanings = {
         1: 'Self, Personality, Physical Appearance, Overall Well-being',
@@ -688,7 +699,7 @@ def house_details(request):
 @login_required
 def dasha_periods(request):
     """Display Vimshottari Dasha periods"""
-    chart_data = calculate_birth_chart()
+    chart_data = get_birth_chart()
     
     dasha_periods = chart_data['dasha_periods']
     current_dasha = chart_data['current_dasha']
@@ -743,7 +754,7 @@ def predictions(request):
     today = datetime.now().date()
     
     # Calculate current chart
-    chart_data = calculate_birth_chart()
+    chart_data = get_birth_chart()
     
     # Get current dasha for personalized predictions
     current_dasha = chart_data['current_dasha']
@@ -900,7 +911,7 @@ def generate_health_description(intensity, dasha_influence=""):
 @login_required
 def planet_detail(request, planet):
     """Detailed information about a planet"""
-    chart_data = calculate_birth_chart()
+    chart_data = get_birth_chart()
     
     if planet not in chart_data['planets']:
         messages.error(request, 'Planet not found.')
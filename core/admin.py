@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import UserProfile, DailyThought, DailyFlower
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from .models import UserProfile, DailyThought, DailyFlower, SyncOperation, ProfileReport
 
 
 @admin.register(UserProfile)
@@ -22,3 +26,53 @@ class DailyThoughtAdmin(admin.ModelAdmin):
 class DailyFlowerAdmin(admin.ModelAdmin):
     list_display = ['name', 'season', 'is_active']
     list_filter = ['season', 'is_active']
+
+
+@admin.register(SyncOperation)
+class SyncOperationAdmin(admin.ModelAdmin):
+    list_display = ['key', 'user', 'created_at']
+    search_fields = ['key', 'user__username']
+
+
+@admin.register(ProfileReport)
+class ProfileReportAdmin(admin.ModelAdmin):
+    list_display = ['path', 'method', 'mode', 'status_code', 'duration_ms', 'query_count', 'query_ms', 'user', 'created_at']
+    list_filter = ['mode', 'method']
+    search_fields = ['path']
+    fields = ['path', 'method', 'mode', 'status_code', 'duration_ms', 'query_count', 'query_ms',
+              'user', 'created_at', 'collapsed_file', 'stats_report', 'query_report']
+    readonly_fields = fields
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def get_urls(self):
+        return [
+            path('<int:pk>/collapsed/', self.admin_site.admin_view(self.collapsed_view),
+                 name='core_profilereport_collapsed'),
+        ] + super().get_urls()
+    
+    def collapsed_view(self, request, pk):
+        report = get_object_or_404(ProfileReport, pk=pk)
+        response = HttpResponse(report.collapsed, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{report.pk}.folded"'
+        return response
+    
+    def collapsed_file(self, obj):
+        if not obj.collapsed:
+            return '-'
+        url = reverse('admin:core_profilereport_collapsed', args=[obj.pk])
+        return format_html('<a href="{}">Download collapsed stacks</a>', url)
+    
+    def stats_report(self, obj):
+        return format_html('<pre style="font-size: 11px;">{}</pre>', obj.stats) if obj.stats else '-'
+    
+    def query_report(self, obj):
+        # Slowest first
+        queries = sorted(obj.queries, key=lambda q: -q['ms'])
+        return format_html(
+            '<table>{}</table>',
+            format_html_join('', '<tr><td>{}&nbsp;ms</td><td><code>{}</code><br><small>{}</small></td></tr>', (
+                (q['ms'], q['sql'], ' → '.join(q['origin'])) for q in queries
+            )),
+        )
@@ -5,3 +5,10 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
     verbose_name = 'Core'
+    
+    def ready(self):
+        from . import context_processors, dashboard, llm, sync
+        llm.configure_google_credentials()
+        sync.connect_signals()
+        dashboard.connect_signals()
+        context_processors.connect_signals()
@@ -0,0 +1,146 @@
+"""
+Delta autosave for long text fields (diary entries and notes).
+
+Editors send small splice patches against the version they last saw
+instead of re-posting the whole document:
+
+    {"version": 3, "patches": {"content": [[start, delete_count, "text"], ...]}}
+
+Offsets count Unicode code points over text with LF line breaks, which is
+what browsers report for a textarea; every write path stores text through
+normalize_newlines() so the server counts the same characters. A patch is applied only if the stored
+row is still at the client's version; otherwise the caller gets the
+current text back to rebase on. Only the patched columns are written,
+after the model's field validation (max_length) of those columns.
+"""
+import json
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+
+
+class PatchError(ValueError):
+    """Raised when a patch payload is malformed or out of bounds"""
+
+
+def normalize_newlines(text):
+    """Text with CRLF and lone CR line breaks turned into LF"""
+    if not text:
+        return text
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def apply_text_patch(text, ops):
+    """Apply a list of [start, delete_count, insert] splices to text, in order"""
+    if not isinstance(ops, list):
+        raise PatchError('Patch must be a list of operations')
+
+    for op in ops:
+        if not isinstance(op, (list, tuple)) or len(op) != 3:
+            raise PatchError('Each operation must be [start, delete_count, insert]')
+        start, delete_count, insert = op
+        if not isinstance(start, int) or not isinstance(delete_count, int) or not isinstance(insert, str):
+            raise PatchError('Invalid operation types')
+        if start < 0 or delete_count < 0 or start + delete_count > len(text):
+            raise PatchError('Operation out of bounds')
+        text = text[:start] + insert + text[start + delete_count:]
+
+    return text
+
+
+def parse_autosave_request(request):
+    """Decode an autosave body into (base_version, patches) or raise PatchError"""
+    try:
+        data = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        raise PatchError('Invalid JSON')
+
+    if not isinstance(data, dict):
+        raise PatchError('Invalid payload')
+    base_version = data.get('version')
+    patches = data.get('patches') or {}
+    if not isinstance(base_version, int) or not isinstance(patches, dict):
+        raise PatchError('Payload needs an integer version and a patches object')
+
+    return base_version, patches
+
+
+def _conflict(instance, fields):
+    return JsonResponse({
+        'error': 'conflict',
+        'version': instance.version,
+        'fields': {field: normalize_newlines(getattr(instance, field)) for field in fields},
+    }, status=409)
+
+
+def autosave_instance(queryset, lookup, base_version, patches, fields, derived_fields=None, create=None):
+    """
+    Apply text patches to a single row with optimistic concurrency.
+
+    The row is locked and its version compared with base_version. Only the
+    patched columns, version, modified_at and any columns the model's save()
+    derives from them (derived_fields maps field -> [columns]) are written.
+    When the row does not exist yet and base_version is 0, create() builds
+    an unsaved instance to patch; if another request creates the row first
+    (two tabs, or autosave racing the form), its copy comes back as a
+    conflict. Returns a JsonResponse.
+    """
+    derived_fields = derived_fields or {}
+    unknown = set(patches) - set(fields)
+    if unknown:
+        return JsonResponse({'error': f"Fields not patchable: {', '.join(sorted(unknown))}"}, status=400)
+
+    with transaction.atomic():
+        instance = queryset.select_for_update().filter(**lookup).first()
+        if instance is None:
+            if create is None or base_version != 0:
+                return JsonResponse({'error': 'Not found'}, status=404)
+            instance = create()
+
+        if instance.version != base_version:
+            return _conflict(instance, fields)
+
+        changed = []
+        try:
+            for field, ops in patches.items():
+                # Rows saved before normalization may still hold CRLF
+                value = normalize_newlines(apply_text_patch(normalize_newlines(getattr(instance, field)), ops))
+                if value != getattr(instance, field):
+                    setattr(instance, field, value)
+                    changed.append(field)
+        except PatchError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        exclude = [field.name for field in instance._meta.concrete_fields if field.name not in changed]
+        try:
+            instance.clean_fields(exclude=exclude)
+        except ValidationError as e:
+            return JsonResponse({'error': '; '.join(
+                f"{field}: {' '.join(messages)}" for field, messages in e.message_dict.items()
+            )}, status=400)
+
+        if changed:
+            instance.version += 1
+            if instance._state.adding:
+                try:
+                    with transaction.atomic():
+                        instance.save()
+                except IntegrityError:
+                    # Created concurrently since our lookup found nothing
+                    existing = queryset.select_for_update().filter(**lookup).first()
+                    if existing is None:
+                        raise
+                    return _conflict(existing, fields)
+            else:
+                update_fields = changed + ['version', 'modified_at']
+                for field in changed:
+                    update_fields += derived_fields.get(field, [])
+                instance.save(update_fields=update_fields)
+
+    return JsonResponse({
+        'success': True,
+        'id': None if instance._state.adding else str(instance.pk),
+        'version': instance.version,
+        'saved_fields': changed,
+        'modified_at': instance.modified_at.isoformat() if instance.modified_at else None,
+    })
@@ -0,0 +1,301 @@
+"""
+Two-tier cache with tags and stampede protection.
+
+    from core.caching import tiered
+
+    chart = tiered.get_or_compute('astro:chart:2026-10-19', calculate_birth_chart,
+                                  timeout=60 * 60, version=1)
+    counts = tiered.get_or_compute(f'dashboard:counts:{user.pk}', compute,
+                                   timeout=300, tags=[f'user:{user.pk}:counts'])
+    tiered.invalidate_tags(f'user:{user.pk}:counts')
+
+Tiers:
+
+* local   an LRU dict in this worker process (CACHE_LOCAL_MAX_ENTRIES).
+          Values are kept pickled so callers never share a mutable object.
+          An entry is trusted for at most CACHE_LOCAL_TIMEOUT seconds and
+          then re-read from the shared tier, which bounds how long another
+          worker's invalidation takes to arrive here.
+* shared  Django's default cache (settings.CACHES): Redis when REDIS_URL is
+          set, otherwise files on local disk, both shared by every
+          gunicorn worker on the machine.
+
+Keys carry a version (bump it when the cached value's shape changes).
+Tags are tokens in the shared tier; an entry remembers the tokens it was
+written under and is ignored once any of them changes, so
+invalidate_tags() is one write however many entries carry the tag.
+
+get_or_compute() avoids stampedes three ways:
+
+* early refresh  a caller may recompute before expiry with a probability
+                 that rises as expiry nears, weighted by how long the last
+                 compute took (probabilistic early expiration, "XFetch")
+* single flight  one thread per process (a lock) and one process per key
+                 (cache.add on a lock key) recomputes; the others are
+                 served the stale value, or wait briefly when there is none
+* stale grace    shared entries outlive their logical expiry by
+                 STALE_GRACE seconds so there is something to serve
+
+cache.add is atomic on Redis and the database cache; on the file cache
+two workers can occasionally both recompute.
+
+Hits, misses, refreshes and stale serves are counted per key namespace
+(the part before the first ':') in core.metrics.CACHE_REQUESTS.
+"""
+import math
+import pickle
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import caches
+from .metrics import CACHE_REQUESTS
+
+STALE_GRACE = 60
+LOCK_TIMEOUT = 30
+WAIT_STEP = 0.05
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Thread-safe, size-bounded, expiring dict for one worker process"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (entry, local expiry)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            entry, expires = item
+            if expires <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, timeout):
+        with self._lock:
+            self._data[key] = (entry, time.time() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_tagged(self, tags):
+        tags = set(tags)
+        with self._lock:
+            for key in [key for key, (entry, _) in self._data.items() if tags & entry['tags'].keys()]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache:
+    """See the module docstring"""
+
+    def __init__(self, alias='default', local_max_entries=None, local_timeout=None):
+        self.alias = alias
+        self.local = LocalLRU(local_max_entries or getattr(settings, 'CACHE_LOCAL_MAX_ENTRIES', 1000))
+        self.local_timeout = local_timeout if local_timeout is not None else getattr(settings, 'CACHE_LOCAL_TIMEOUT', 5)
+        self._flights = {}  # key -> [lock, users]
+        self._flights_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def make_key(key, version=1):
+        return f'{key}|v{version}'
+
+    # Tags
+
+    @staticmethod
+    def _tag_key(tag):
+        return f'tag:{tag}'
+
+    def _tag_tokens(self, tags, create=False):
+        """{tag: current token}; missing tokens are created when create is set"""
+        if not tags:
+            return {}
+        keys = {self._tag_key(tag): tag for tag in tags}
+        found = self.shared.get_many(list(keys))
+        tokens = {keys[key]: token for key, token in found.items()}
+        if create:
+            for tag in set(tags) - tokens.keys():
+                # add() so two writers agree on a single token
+                self.shared.add(self._tag_key(tag), uuid.uuid4().hex, timeout=None)
+                tokens[tag] = self.shared.get(self._tag_key(tag))
+        return tokens
+
+    def invalidate_tags(self, *tags):
+        """Retire every entry written under any of tags"""
+        self.shared.set_many({self._tag_key(tag): uuid.uuid4().hex for tag in tags}, timeout=None)
+        self.local.delete_tagged(tags)
+
+    # Entries: {'value': pickled bytes, 'tags': {tag: token}, 'expires': ts, 'delta': seconds}
+
+    def _shared_entry(self, full_key):
+        entry = self.shared.get(full_key)
+        if entry is None:
+            return None
+        if entry['tags'] and self._tag_tokens(list(entry['tags'])) != entry['tags']:
+            return None
+        return entry
+
+    def _store(self, full_key, value, timeout, tags, delta=0.0, tokens=None):
+        """tokens: the tag tokens read before value was computed (read now if None)"""
+        entry = {
+            'value': pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            'tags': tokens if tokens is not None else self._tag_tokens(list(tags), create=True),
+            'expires': time.time() + timeout,
+            'delta': delta,
+        }
+        self.shared.set(full_key, entry, timeout + STALE_GRACE)
+        self.local.set(full_key, entry, min(self.local_timeout, timeout))
+        return entry
+
+    @staticmethod
+    def _needs_refresh(entry, beta):
+        now = time.time()
+        if now >= entry['expires']:
+            return True
+        # XFetch: -log(U) is exponential with mean 1, scaled by compute time
+        return beta > 0 and now - entry['delta'] * beta * math.log(1 - random.random()) >= entry['expires']
+
+    @staticmethod
+    def _count(key, result):
+        CACHE_REQUESTS.inc(key.split(':', 1)[0], result)
+
+    # Public API
+
+    def get(self, key, default=None, version=1):
+        full_key = self.make_key(key, version)
+        entry = self.local.get(full_key)
+        result = 'local_hit'
+        if entry is None:
+            entry = self._shared_entry(full_key)
+            result = 'shared_hit'
+            if entry is not None:
+                self.local.set(full_key, entry, min(self.local_timeout, max(entry['expires'] - time.time(), 0)))
+        if entry is None or time.time() >= entry['expires']:
+            self._count(key, 'miss')
+            return default
+        self._count(key, result)
+        return pickle.loads(entry['value'])
+
+    def set(self, key, value, timeout=300, tags=(), version=1):
+        self._store(self.make_key(key, version), value, timeout, tags)
+
+    def delete(self, key, version=1):
+        full_key = self.make_key(key, version)
+        self.shared.delete(full_key)
+        self.local.delete(full_key)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def get_or_compute(self, key, compute, timeout=300, tags=(), version=1, beta=1.0, wait=None):
+        """
+        The cached value for key, calling compute() to fill or refresh it.
+        While another caller recomputes, a stale value is returned if there
+        is one; otherwise this waits up to `wait` seconds (LOCK_TIMEOUT by
+        default) for it and then computes anyway.
+        """
+        full_key = self.make_key(key, version)
+        entry = self.local.get(full_key)
+        result = 'local_hit'
+        if entry is None:
+            entry = self._shared_entry(full_key)
+            result = 'shared_hit'
+        if entry is not None and not self._needs_refresh(entry, beta):
+            if result == 'shared_hit':
+                self.local.set(full_key, entry, min(self.local_timeout, entry['expires'] - time.time()))
+            self._count(key, result)
+            return pickle.loads(entry['value'])
+        return self._recompute(key, full_key, compute, timeout, tags, stale=entry,
+                               wait=LOCK_TIMEOUT if wait is None else wait)
+
+    def _recompute(self, key, full_key, compute, timeout, tags, stale, wait):
+        with self._flight(full_key, block=stale is None) as leader:
+            if not leader:
+                self._count(key, 'stale')
+                return pickle.loads(stale['value'])
+
+            # Someone may have refreshed it while this thread waited
+            current = self._shared_entry(full_key)
+            if current is not None and (stale is None or current['expires'] > stale['expires']) \
+                    and time.time() < current['expires']:
+                self.local.set(full_key, current, min(self.local_timeout, current['expires'] - time.time()))
+                self._count(key, 'shared_hit')
+                return pickle.loads(current['value'])
+
+            lock_key = f'lock:{full_key}'
+            if not self.shared.add(lock_key, 1, LOCK_TIMEOUT):
+                if stale is not None:
+                    self._count(key, 'stale')
+                    return pickle.loads(stale['value'])
+                value = self._wait_for(full_key, wait)
+                if value is not _MISSING:
+                    self._count(key, 'wait')
+                    return value
+                lock_key = None
+
+            self._count(key, 'miss' if stale is None else 'refresh')
+            # Tokens from before compute(): an invalidation while it runs
+            # must retire this value, not be stamped onto it
+            tokens = self._tag_tokens(list(tags), create=True)
+            try:
+                start = time.perf_counter()
+                value = compute()
+                delta = time.perf_counter() - start
+                # Invalidated mid-compute: serve this caller, cache nothing
+                if not tags or self._tag_tokens(list(tags)) == tokens:
+                    self._store(full_key, value, timeout, tags, delta=delta, tokens=tokens)
+            finally:
+                if lock_key:
+                    self.shared.delete(lock_key)
+            return value
+
+    def _wait_for(self, full_key, wait):
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_STEP)
+            entry = self._shared_entry(full_key)
+            if entry is not None and time.time() < entry['expires']:
+                return pickle.loads(entry['value'])
+        return _MISSING
+
+    @contextmanager
+    def _flight(self, full_key, block):
+        """In-process single flight; yields whether this thread leads"""
+        with self._flights_lock:
+            flight = self._flights.setdefault(full_key, [threading.Lock(), 0])
+            flight[1] += 1
+        acquired = flight[0].acquire(blocking=block)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                flight[0].release()
+            with self._flights_lock:
+                flight[1] -= 1
+                if not flight[1]:
+                    del self._flights[full_key]
+
+
+tiered = TieredCache()
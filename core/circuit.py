@@ -0,0 +1,122 @@
+"""
+Circuit breaker for upstream calls.
+
+Outcomes are counted in short time buckets over a rolling window. Once
+enough calls have been seen and the share of failed or slow ones crosses
+the threshold, the circuit opens and callers get CircuitOpen at once
+instead of waiting out the upstream timeout. After open_seconds one
+worker is let through as a probe (half-open): success closes the circuit,
+failure opens it for another period.
+
+State lives in the cache, so with a shared cache backend every worker
+sees the same circuit; with the per-process default each worker trips
+its own. Updates are read-modify-write, so concurrent calls can lose a
+count now and then - fine for a failure-rate estimate. It reads the
+shared cache directly rather than through core.caching.tiered: a
+worker-local copy could keep calling a tripped upstream for up to
+CACHE_LOCAL_TIMEOUT.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from django.core.cache import cache
+
+logger = logging.getLogger('core')
+
+
+class CircuitOpen(Exception):
+    """The circuit is open; use the fallback without calling upstream"""
+
+
+class CircuitBreaker:
+
+    def __init__(self, name, failure_rate=0.5, min_calls=5, window=60, bucket_seconds=10,
+                 slow_call=None, open_seconds=30):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        self.slow_call = slow_call
+        self.open_seconds = open_seconds
+
+        self.state_key = f'circuit:{name}:state'
+        self.stats_key = f'circuit:{name}:stats'
+        self.probe_key = f'circuit:{name}:probe'
+
+    def state(self):
+        """'closed', 'open' or 'half_open'"""
+        state = cache.get(self.state_key)
+        if not state:
+            return 'closed'
+        if time.time() - state['opened_at'] < self.open_seconds:
+            return 'open'
+        return 'half_open'
+
+    def check(self):
+        """Raise CircuitOpen while open, before the caller spends anything on the call"""
+        if self.state() == 'open':
+            raise CircuitOpen(f'{self.name} circuit is open')
+
+    def _before_call(self):
+        """Return True if this call is the half-open probe; raise CircuitOpen to refuse it"""
+        state = cache.get(self.state_key)
+        if not state:
+            return False
+        if time.time() - state['opened_at'] < self.open_seconds:
+            raise CircuitOpen(f'{self.name} circuit is open')
+        # Exactly one probe at a time; it may run as long as a full open period
+        if not cache.add(self.probe_key, True, timeout=self.open_seconds):
+            raise CircuitOpen(f'{self.name} circuit is half-open, probe in flight')
+        logger.info(f"Circuit '{self.name}' half-open: probing upstream")
+        return True
+
+    def _open(self, reason):
+        cache.set(self.state_key, {'opened_at': time.time()}, timeout=None)
+        cache.delete(self.stats_key)
+        logger.warning(f"Circuit '{self.name}' opened ({reason}); failing fast for {self.open_seconds}s")
+
+    def _close(self):
+        cache.delete_many([self.state_key, self.stats_key, self.probe_key])
+        logger.info(f"Circuit '{self.name}' closed: upstream recovered")
+
+    def _record(self, failed, probe):
+        if probe:
+            if failed:
+                cache.delete(self.probe_key)
+                self._open('probe failed')
+            else:
+                self._close()
+            return
+
+        now = time.time()
+        bucket = int(now // self.bucket_seconds) * self.bucket_seconds
+        stats = cache.get(self.stats_key) or {}
+        stats = {b: counts for b, counts in stats.items() if b > now - self.window}
+        calls, failures = stats.get(bucket, (0, 0))
+        stats[bucket] = (calls + 1, failures + int(failed))
+        cache.set(self.stats_key, stats, timeout=self.window)
+
+        if failed:
+            total_calls = sum(c for c, _ in stats.values())
+            total_failures = sum(f for _, f in stats.values())
+            if total_calls >= self.min_calls and total_failures / total_calls >= self.failure_rate:
+                self._open(f'{total_failures}/{total_calls} calls failed or slow in {self.window}s')
+
+    @contextmanager
+    def guard(self):
+        """
+        Run an upstream call under the breaker. Raises CircuitOpen without
+        running the block while open; otherwise records the block's outcome
+        (an exception, or taking longer than slow_call seconds, is a failure).
+        """
+        probe = self._before_call()
+        start = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self._record(True, probe)
+            raise
+        else:
+            slow = self.slow_call is not None and time.monotonic() - start > self.slow_call
+            self._record(slow, probe)
@@ -0,0 +1,119 @@
+"""
+Heavy third-party clients, imported and built on first use.
+
+google.generativeai pulls in protobuf, grpc and the rest of the Google
+API stack (about 0.9 s of a worker's cold start), yet only the chat reply
+and goal-plan paths call it. swisseph is a C extension that only the astro
+pages need. Imported at module level, they made every gunicorn worker and
+every manage.py command pay for both before doing anything.
+
+    from core import clients
+
+    model = clients.get('gemini_model')   # None when Gemini is not configured
+    swe = clients.get('swisseph')         # None when the library is missing
+
+Each client is a factory registered under a name. The first get() runs the
+factory under that client's lock, double-checked so that concurrent first
+callers build it once and later calls take no lock at all. The result is
+kept for the life of the process, None included. A factory that raises
+keeps nothing and runs again on the next call.
+
+`python manage.py benchmark_imports` measures the cold start with
+python -X importtime.
+"""
+import logging
+import os
+import threading
+from django.conf import settings
+
+logger = logging.getLogger('core')
+
+_UNSET = object()
+
+
+class LazyClient:
+    """A factory's result, built once per process on first use"""
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self._value = _UNSET
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._value is not _UNSET
+
+    def get(self):
+        value = self._value
+        if value is _UNSET:
+            with self._lock:
+                value = self._value
+                if value is _UNSET:
+                    value = self._value = self.factory()
+        return value
+
+    def reset(self):
+        with self._lock:
+            self._value = _UNSET
+
+
+_registry = {}
+
+
+def register(name, factory):
+    """Register factory as the client `name` (replacing any previous one)"""
+    _registry[name] = LazyClient(name, factory)
+    return factory
+
+
+def get(name):
+    return _registry[name].get()
+
+
+def is_loaded(name):
+    return _registry[name].loaded
+
+
+def reset(*names):
+    """Forget built clients (all of them by default) so the next get() rebuilds"""
+    for name in names or list(_registry):
+        _registry[name].reset()
+
+
+# Built-in clients
+
+def _load_genai():
+    import google.generativeai as genai
+    credentials_path = settings.GOOGLE_APPLICATION_CREDENTIALS
+    if settings.GEMINI_API_KEY:
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        logger.info('Gemini configured with API key')
+    elif credentials_path and os.path.exists(credentials_path):
+        genai.configure()
+        logger.info('Gemini configured with service account')
+    return genai
+
+
+def _load_gemini_model():
+    from .llm import gemini_enabled, stub_model
+    if getattr(settings, 'GEMINI_STUB_LATENCY', None) is not None:
+        return stub_model()
+    if not gemini_enabled():
+        return None
+    return get('genai').GenerativeModel(settings.GEMINI_MODEL)
+
+
+def _load_swisseph():
+    from .metrics import TimedModule
+    try:
+        import swisseph
+    except ImportError:
+        logger.warning('swisseph not installed; astrology pages are disabled')
+        return None
+    return TimedModule(swisseph, 'swisseph')  # calls show up in Server-Timing
+
+
+register('genai', _load_genai)
+register('gemini_model', _load_gemini_model)
+register('swisseph', _load_swisseph)
@@ -1,9 +1,14 @@
 from django.utils import timezone
 from datetime import datetime
 from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 import hashlib
+from .caching import tiered
 from .models import DailyThought
 
+DAILY_THOUGHTS_TAG = 'daily_thoughts'
+DAILY_THOUGHTS_TIMEOUT = 60 * 60
+
 
 def user_profile(request):
     """Add user profile to context"""
@@ -44,8 +49,11 @@ def daily_inspiration(request):
     today = timezone.now()
     date_seed = today.strftime('%Y%m%d')
     
-    # Get daily thought
-    thoughts = list(DailyThought.objects.filter(is_active=True))
+    # Get daily thought (the active set is cached; it runs on every page)
+    thoughts = tiered.get_or_compute(
+        'context:daily_thoughts', lambda: list(DailyThought.objects.filter(is_active=True)),
+        timeout=DAILY_THOUGHTS_TIMEOUT, tags=[DAILY_THOUGHTS_TAG],
+    )
     
     if thoughts:
         hash_val = int(hashlib.md5(date_seed.encode()).hexdigest(), 16)
@@ -99,3 +107,13 @@ def daily_inspiration(request):
         'show_vivek_message': show_vivek_message,
         'current_date': today,
     }
+
+
+def _on_thought_change(sender, **kwargs):
+    tiered.invalidate_tags(DAILY_THOUGHTS_TAG)
+
+
+def connect_signals():
+    """Retire the cached thoughts when one changes (called from CoreConfig.ready)"""
+    post_save.connect(_on_thought_change, sender=DailyThought, dispatch_uid='daily_thoughts_save')
+    post_delete.connect(_on_thought_change, sender=DailyThought, dispatch_uid='daily_thoughts_delete')
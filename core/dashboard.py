@@ -0,0 +1,69 @@
+"""
+Dashboard counters, served from the tiered cache (core.caching).
+
+The four counts on the dashboard are cached per user under the
+user:<id>:counts tag. Saving or deleting a note, diary entry, goal or
+task retires them; bulk updates that change task status (goals.status,
+goals.board) send no signals and call invalidate_dashboard_counts()
+themselves.
+"""
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+from .caching import tiered
+
+COUNTS_TIMEOUT = 60 * 10
+
+
+def counts_tag(user_id):
+    return f'user:{user_id}:counts'
+
+
+def _count(user_id):
+    from diary.models import DiaryEntry
+    from goals.models import Goal, Task
+    from notes.models import Note
+    return {
+        'recent_notes': Note.objects.filter(user_id=user_id).count(),
+        'recent_diary': DiaryEntry.objects.filter(user_id=user_id).count(),
+        'active_goals': Goal.objects.filter(user_id=user_id, status='active').count(),
+        'pending_tasks': Task.objects.filter(goal__user_id=user_id, status='pending').count(),
+    }
+
+
+def dashboard_counts(user_id):
+    """{recent_notes, recent_diary, active_goals, pending_tasks} for the user"""
+    return tiered.get_or_compute(
+        f'dashboard:counts:{user_id}', lambda: _count(user_id),
+        timeout=COUNTS_TIMEOUT, tags=[counts_tag(user_id)],
+    )
+
+
+def invalidate_dashboard_counts(user_ids):
+    tags = [counts_tag(user_id) for user_id in set(user_ids)]
+    if tags:
+        tiered.invalidate_tags(*tags)
+
+
+def _on_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    user_id = getattr(instance, 'user_id', None)
+    if user_id is None:
+        # Task: its user is on the goal
+        goal_field = sender._meta.get_field('goal')
+        if goal_field.is_cached(instance):
+            user_id = instance.goal.user_id
+        else:
+            Goal = apps.get_model('goals', 'Goal')
+            user_id = Goal.objects.filter(pk=instance.goal_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate_dashboard_counts([user_id])
+
+
+def connect_signals():
+    """Retire cached counts when their rows change (called from CoreConfig.ready)"""
+    for label in ('notes.Note', 'diary.DiaryEntry', 'goals.Goal', 'goals.Task'):
+        model = apps.get_model(label)
+        uid = label.replace('.', '_').lower()
+        post_save.connect(_on_change, sender=model, dispatch_uid=f'dashboard_counts_save_{uid}')
+        post_delete.connect(_on_change, sender=model, dispatch_uid=f'dashboard_counts_delete_{uid}')
@@ -0,0 +1,291 @@
+"""
+Synthetic data at realistic volumes, for load tests and benchmarks.
+
+Everything is drawn from one random.Random(seed): ids, text, dates and
+moods. The same seed and end date give the same rows, so benchmark runs
+can be compared. Rows go in with bulk_create in batches. While
+generating, auto_now / auto_now_add are switched off so created and
+modified timestamps can be spread over the simulated history.
+
+bulk_create sends no signals. Rebuild what is derived from them
+afterwards: the sync change log (rebuild_changelog) and the retrieval
+index (build_retrieval_index). Goal completion is refreshed here.
+"""
+import math
+import random
+import re
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from html import unescape
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+WORDS = """
+brand campaign audience launch content strategy insight metric funnel
+growth story team meeting plan review feedback learning course book idea
+morning evening walk coffee family friend project deadline presentation
+client market research social media video newsletter design budget focus
+calm tired happy grateful anxious proud hopeful busy quiet progress
+""".split()
+
+TAG_NAMES = [
+    'career', 'ideas', 'reading', 'health', 'family', 'travel', 'finance', 'learning',
+    'marketing', 'branding', 'seo', 'social', 'content', 'research', 'meetings', 'goals',
+    'recipes', 'music', 'movies', 'gratitude', 'journal', 'work', 'personal', 'projects',
+    'quotes', 'shopping', 'fitness', 'mentors', 'courses', 'someday',
+]
+
+DEFAULT_VOLUMES = {
+    'users': 1,
+    'notes': 20000,
+    'diary_years': 10,
+    'goals': 8,
+    'tasks_per_goal': 200,
+    'milestones_per_goal': 8,
+    'messages': 5000,
+}
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """Let bulk_create keep the created/modified values set on each row"""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class FakeData:
+
+    def __init__(self, seed=0, end_date=None, batch_size=1000, stdout=None):
+        self.rng = random.Random(seed)
+        self.end_date = end_date or timezone.localdate()
+        self.batch_size = batch_size
+        self.stdout = stdout
+
+    # Building blocks
+
+    def uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def words(self, low, high):
+        return ' '.join(self.rng.choices(WORDS, k=self.rng.randint(low, high)))
+
+    def sentence(self):
+        text = self.words(6, 16)
+        return text[0].upper() + text[1:] + '.'
+
+    def paragraph(self, sentences=(2, 6)):
+        return ' '.join(self.sentence() for _ in range(self.rng.randint(*sentences)))
+
+    def html_content(self):
+        blocks = []
+        for _ in range(self.rng.randint(1, 5)):
+            kind = self.rng.random()
+            if kind < 0.6:
+                blocks.append(f'<p>{self.paragraph()}</p>')
+            elif kind < 0.8:
+                items = ''.join(f'<li>{self.words(2, 6)}</li>' for _ in range(self.rng.randint(2, 6)))
+                blocks.append(f'<ul>{items}</ul>')
+            else:
+                blocks.append(f'<p><strong>{self.words(2, 4)}</strong> {self.paragraph((1, 2))}</p>')
+        return ''.join(blocks)
+
+    def moment(self, day):
+        """A timezone-aware datetime at a random time on day"""
+        naive = datetime.combine(day, time(self.rng.randint(6, 23), self.rng.randint(0, 59), self.rng.randint(0, 59)))
+        return timezone.make_aware(naive)
+
+    def day_within(self, days_back):
+        return self.end_date - timedelta(days=self.rng.randint(0, days_back))
+
+    def strokes(self):
+        """Handwriting as the diary canvas stores it: [[{x, y}, ...], ...]"""
+        strokes = []
+        for _ in range(self.rng.randint(10, 60)):
+            x, y = self.rng.uniform(20, 580), self.rng.uniform(20, 380)
+            stroke = []
+            for _ in range(self.rng.randint(5, 40)):
+                x = min(max(x + self.rng.uniform(-6, 6), 0), 600)
+                y = min(max(y + self.rng.uniform(-6, 6), 0), 400)
+                stroke.append({'x': round(x, 1), 'y': round(y, 1)})
+            strokes.append(stroke)
+        return strokes
+
+    def bulk_create(self, model, rows):
+        model.objects.bulk_create(rows, batch_size=self.batch_size)
+        if self.stdout:
+            self.stdout.write(f'  {len(rows)} {model._meta.verbose_name_plural}')
+        return rows
+
+    # Per model
+
+    def create_user(self, index):
+        username = f'fake_user_{index}'
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            user = User.objects.create_user(username=username, password='fake-password', first_name=f'Fake {index}')
+        return user
+
+    def create_notes(self, user, count):
+        from notes.models import Note, Tag
+        tags = [Tag.objects.get_or_create(name=name)[0] for name in TAG_NAMES]
+        notes, links = [], []
+        for _ in range(count):
+            created = self.moment(self.day_within(365 * 5))
+            content = self.html_content()
+            note = Note(
+                id=self.uuid(),
+                user=user,
+                title=self.words(2, 7).capitalize(),
+                content=content,
+                content_plain=unescape(re.sub(r'<[^>]+>', '', content)),
+                is_pinned=self.rng.random() < 0.02,
+                created_at=created,
+                modified_at=created + timedelta(minutes=self.rng.randint(0, 60 * 24 * 30)),
+            )
+            notes.append(note)
+            for tag in self.rng.sample(tags, self.rng.randint(0, 4)):
+                links.append(Note.tags.through(note_id=note.id, tag_id=tag.id))
+        self.bulk_create(Note, notes)
+        self.bulk_create(Note.tags.through, links)
+
+    def create_diary(self, user, years):
+        from diary.models import DiaryEntry
+        entries, mood = [], 3.0
+        for offset in range(365 * years):
+            day = self.end_date - timedelta(days=offset)
+            if self.rng.random() > 0.8:
+                continue  # skipped days
+            # Moods drift rather than jump from day to day
+            mood = min(max(mood + self.rng.gauss(0, 0.7), 1), 5)
+            method = self.rng.choices(['type', 'voice', 'stylus'], weights=[7, 2, 1])[0]
+            content = '\n\n'.join(self.paragraph((3, 8)) for _ in range(self.rng.randint(1, 4)))
+            created = self.moment(day)
+            entries.append(DiaryEntry(
+                id=self.uuid(),
+                user=user,
+                entry_date=day,
+                content=content,
+                content_html=''.join(f'<p>{p}</p>' for p in content.split('\n\n')),
+                input_method=method,
+                voice_transcript=content if method == 'voice' else '',
+                voice_duration=len(content) // 15 if method == 'voice' else None,
+                handwriting_strokes=self.strokes() if method == 'stylus' else None,
+                handwriting_ocr_text=content if method == 'stylus' else '',
+                mood=round(mood),
+                mood_note=self.words(2, 6) if self.rng.random() < 0.3 else '',
+                created_at=created,
+                modified_at=created,
+            ))
+        self.bulk_create(DiaryEntry, entries)
+
+    def create_goals(self, user, count, tasks_per_goal, milestones_per_goal):
+        from goals.models import Goal, Milestone, Task
+        from goals.status import update_goal_completion
+        roles = [choice for choice, _ in Goal._meta.get_field('role_category').choices]
+        levels = [choice for choice, _ in Goal._meta.get_field('experience_level').choices]
+        departments = [choice for choice, _ in Task.DEPARTMENTS]
+
+        goals, tasks, milestones = [], [], []
+        for _ in range(count):
+            start = self.day_within(365 * 2)
+            horizon = self.rng.choice(['1year', '3year'])
+            target = start + timedelta(days=365 if horizon == '1year' else 365 * 3)
+            created = self.moment(start)
+            goal = Goal(
+                id=self.uuid(),
+                user=user,
+                title=f'Become a {self.words(1, 3)} lead',
+                description=self.paragraph(),
+                role_category=self.rng.choice(roles),
+                experience_level=self.rng.choice(levels),
+                time_horizon=horizon,
+                target_date=target,
+                status=self.rng.choices(['active', 'completed', 'paused'], weights=[8, 1, 1])[0],
+                created_at=created,
+                modified_at=created,
+            )
+            goals.append(goal)
+
+            span = max((target - start).days, 1)
+            for _ in range(tasks_per_goal):
+                due = start + timedelta(days=self.rng.randint(1, span))
+                task_created = self.moment(start + timedelta(days=self.rng.randint(0, min(30, span))))
+                done = due < self.end_date and self.rng.random() < 0.7
+                completed_at = self.moment(min(due, self.end_date)) if done else None
+                recurrence = self.rng.choices(['', 'daily', 'weekly', 'monthly', 'quarterly'], weights=[90, 2, 5, 2, 1])[0]
+                tasks.append(Task(
+                    id=self.uuid(),
+                    goal=goal,
+                    department=self.rng.choice(departments),
+                    title=self.words(3, 8).capitalize(),
+                    description=self.sentence(),
+                    due_date=due,
+                    status='done' if done else self.rng.choices(
+                        ['pending', 'in_progress', 'blocked'], weights=[6, 3, 1])[0],
+                    completion_percentage=100 if done else self.rng.choice([0, 0, 10, 25, 50, 75]),
+                    completed_at=completed_at,
+                    is_daily=recurrence == 'daily',
+                    is_weekly=recurrence == 'weekly',
+                    is_monthly=recurrence == 'monthly',
+                    is_quarterly=recurrence == 'quarterly',
+                    created_at=task_created,
+                    modified_at=completed_at or task_created,
+                ))
+            for index in range(milestones_per_goal):
+                milestone_date = start + timedelta(days=math.ceil(span * (index + 1) / milestones_per_goal))
+                milestones.append(Milestone(
+                    goal=goal,
+                    title=f'Milestone {index + 1}: {self.words(2, 4)}',
+                    target_date=milestone_date,
+                    is_achieved=milestone_date < self.end_date,
+                ))
+        self.bulk_create(Goal, goals)
+        self.bulk_create(Task, tasks)
+        self.bulk_create(Milestone, milestones)
+        update_goal_completion([goal.id for goal in goals])
+
+    def create_chat(self, user, count):
+        from ai_chat.models import AIConversation, AIMessage
+        moment = self.moment(self.end_date - timedelta(days=365))
+        conversation = AIConversation.objects.create(user=user, created_at=moment, updated_at=self.moment(self.end_date))
+        step = timedelta(days=365) / max(count, 1)
+        messages = []
+        for index in range(count):
+            moment += step
+            messages.append(AIMessage(
+                conversation=conversation,
+                sender='user' if index % 2 == 0 else 'ai',
+                content=self.sentence() if index % 2 == 0 else self.paragraph(),
+                timestamp=moment,
+            ))
+        self.bulk_create(AIMessage, messages)
+
+    def generate(self, volumes):
+        """Create volumes['users'] users, each with the given volumes of data"""
+        from ai_chat.models import AIConversation, AIMessage
+        from diary.models import DiaryEntry
+        from goals.models import Goal, Task
+        from notes.models import Note
+
+        users = []
+        with manual_timestamps(Note, DiaryEntry, Goal, Task, AIConversation, AIMessage):
+            for index in range(volumes['users']):
+                user = self.create_user(index)
+                if self.stdout:
+                    self.stdout.write(f'{user.username}:')
+                self.create_notes(user, volumes['notes'])
+                self.create_diary(user, volumes['diary_years'])
+                self.create_goals(user, volumes['goals'], volumes['tasks_per_goal'], volumes['milestones_per_goal'])
+                self.create_chat(user, volumes['messages'])
+                users.append(user)
+        return users
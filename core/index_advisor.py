@@ -0,0 +1,276 @@
+"""
+Index recommendations backed by query plans.
+
+Every page (see core.query_budgets) is rendered over a test database that
+holds fake data at realistic volume (core.fakedata), logged in as the
+first fake user and with detail pages pointing at that user's own rows,
+so the plans are those of an account with years of data. The SQL and
+parameters of each query are recorded and each distinct SELECT is then
+explained:
+
+* PostgreSQL  EXPLAIN (ANALYZE, FORMAT JSON); Seq Scan and Sort nodes
+* SQLite      EXPLAIN QUERY PLAN; SCAN <table> without an index and
+              USE TEMP B-TREE FOR ORDER BY
+
+Scans and sorts on tables with at least min_rows rows are findings. For
+each one a candidate index is built from the query's own predicates on
+that table: equality columns first, then one range column, else the
+ORDER BY columns (sorts only count when there is an equality filter
+to go with them). Candidates an existing index already covers (as a
+leading prefix) are dropped. The rest are grouped per model and printed
+as models.Index(...) lines with the pages and plan lines behind them.
+
+These are candidates, not verdicts: a scan can be the right plan for a
+query that reads most of a table, and LIKE '%...%' searches cannot use a
+B-tree at all. Read the evidence before adding an index to Meta.indexes.
+
+Driven by `python manage.py advise_indexes`.
+"""
+import json
+import re
+from collections import defaultdict
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Index
+from django.test import Client
+from django.utils import timezone
+from .query_budgets import page_paths, query_shape
+
+_WHERE_END = re.compile(r'\b(?:GROUP BY|ORDER BY|LIMIT|HAVING|UNION)\b')
+_SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS (\w+))?$')
+
+# Per-run caches, cleared by advise()
+_row_counts = {}
+_indexes = {}
+
+
+class QueryRecorder:
+    """connection.execute_wrapper hook keeping the SQL and params of each SELECT"""
+
+    def __init__(self):
+        self.page = None
+        self.queries = {}  # shape -> {'sql', 'params', 'pages'}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            shape = query_shape(sql)
+            entry = self.queries.setdefault(shape, {'sql': sql, 'params': params, 'pages': []})
+            if self.page not in entry['pages']:
+                entry['pages'].append(self.page)
+        return execute(sql, params, many, context)
+
+
+def user_fixtures(user):
+    """The fixtures core.query_budgets.page_paths expects, from user's own rows"""
+    from diary.models import DiaryEntry
+    from goals.models import Task
+    from notes.models import Note
+
+    task = Task.objects.filter(goal__user=user).select_related('goal').first()
+    return {
+        'user': user,
+        'goal': task.goal,
+        'task': task,
+        'note': Note.objects.filter(user=user).first(),
+        'entry': DiaryEntry.objects.filter(user=user).first(),
+        'today': timezone.localdate(),
+    }
+
+
+def record_pages(fixtures):
+    """Render every page as fixtures['user'] and return the QueryRecorder with its queries"""
+    paths, _ = page_paths(fixtures)
+    client = Client(raise_request_exception=False)
+    recorder = QueryRecorder()
+    for name, path in paths:
+        client.force_login(fixtures['user'])
+        recorder.page = name
+        with connection.execute_wrapper(recorder):
+            client.get(path)
+    return recorder
+
+
+# Plans
+
+def explain(sql, params):
+    """[(kind, table or None, plan line)] for scans and sorts in the query's plan"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN (ANALYZE, FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return list(_postgres_findings(plan[0]['Plan']))
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return list(_sqlite_findings(sql, [row[-1] for row in cursor.fetchall()]))
+    return []
+
+
+def _postgres_findings(node, parent_table=None):
+    table = node.get('Relation Name')
+    if node['Node Type'] == 'Seq Scan':
+        detail = f"Seq Scan on {table}"
+        if node.get('Filter'):
+            detail += f" Filter: {node['Filter']}"
+        detail += f" (actual rows {node.get('Actual Rows')}, removed {node.get('Rows Removed by Filter', 0)})"
+        yield 'scan', table, detail
+    elif node['Node Type'] == 'Sort':
+        yield 'sort', _first_relation(node), f"Sort Key: {', '.join(node.get('Sort Key', []))}"
+    for child in node.get('Plans', []):
+        yield from _postgres_findings(child, table or parent_table)
+
+
+def _first_relation(node):
+    if node.get('Relation Name'):
+        return node['Relation Name']
+    for child in node.get('Plans', []):
+        relation = _first_relation(child)
+        if relation:
+            return relation
+    return None
+
+
+def _sqlite_findings(sql, details):
+    aliases = _aliases(sql)
+    for detail in details:
+        match = _SQLITE_SCAN.match(detail)
+        if match:
+            name = match.group(1)
+            yield 'scan', aliases.get(name, name), detail
+        elif 'TEMP B-TREE FOR ORDER BY' in detail:
+            yield 'sort', _main_table(sql), detail
+
+
+def _aliases(sql):
+    """{alias: table} for the FROM / JOIN clauses in Django's SQL"""
+    return {alias: table for table, alias in re.findall(r'"(\w+)"\s+(?:AS\s+)?(U\d+|T\d+)\b', sql)}
+
+
+def _main_table(sql):
+    match = re.search(r'\bFROM\s+"(\w+)"', sql)
+    return match.group(1) if match else None
+
+
+# Candidates
+
+def candidate_columns(sql, table):
+    """
+    (equality, rest) columns of table to index for this query: the equality
+    columns, then one range column or else the ORDER BY columns ('-' for DESC)
+    """
+    refs = [re.escape(f'"{table}"')] + [re.escape(alias) for alias, name in _aliases(sql).items() if name == table]
+    column = rf'(?:{"|".join(refs)})\."(\w+)"'
+    where = ''
+    for part in re.split(r'\bWHERE\b', sql)[1:]:
+        where += ' ' + _WHERE_END.split(part)[0]
+
+    equality, ranged = [], []
+    for name, operator in re.findall(column + r'\s*(=|IN\b|IS\b|<=|>=|<|>|BETWEEN\b)', where):
+        target = equality if operator in ('=', 'IN', 'IS') else ranged
+        if name not in target:
+            target.append(name)
+    ranged = [name for name in ranged if name not in equality]
+    if ranged:
+        return equality, ranged[:1]
+
+    order = []
+    order_match = re.search(r'\bORDER BY\b(.*?)(?:\bLIMIT\b|$)', sql, re.S)
+    if order_match:
+        for name, descending in re.findall(column + r'(\s+DESC)?', order_match.group(1)):
+            if name not in equality:
+                order.append(f'-{name}' if descending else name)
+    return equality, order
+
+
+def existing_indexes(table):
+    """(columns, unique) for every index, unique constraint and the primary key on table"""
+    if table not in _indexes:
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        _indexes[table] = [
+            (c['columns'], c['unique'] or c['primary_key'])
+            for c in constraints.values() if c['index'] or c['unique'] or c['primary_key']
+        ]
+    return _indexes[table]
+
+
+def is_covered(table, equality, rest):
+    """
+    True when an existing index leads with the candidate's columns, or a
+    unique one is fully pinned by its equality columns (a handful of rows,
+    whatever the plan says about sorting them)
+    """
+    columns = equality + [name.lstrip('-') for name in rest]
+    for index_columns, unique in existing_indexes(table):
+        if index_columns[:len(columns)] == columns:
+            return True
+        if unique and set(index_columns) <= set(equality):
+            return True
+    return False
+
+
+def table_rows(table):
+    if table not in _row_counts:
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            _row_counts[table] = cursor.fetchone()[0]
+    return _row_counts[table]
+
+
+def index_definition(table, columns):
+    """(model label, 'models.Index(...)') for columns of the model behind table, or None"""
+    model = next((m for m in apps.get_models(include_auto_created=True) if m._meta.db_table == table), None)
+    if model is None:
+        return None
+    by_column = {field.column: field.name for field in model._meta.concrete_fields}
+    if not all(name.lstrip('-') in by_column for name in columns):
+        return None
+    fields = [('-' if name.startswith('-') else '') + by_column[name.lstrip('-')] for name in columns]
+    index = Index(fields=fields)
+    index.set_name_with_model(model)
+    return model._meta.label, f"models.Index(fields={fields!r}, name='{index.name}')"
+
+
+def advise(recorder, min_rows=1000):
+    """
+    Explain every recorded query and return (recommendations, unindexable):
+    recommendations maps (model label, index definition) to its evidence,
+    unindexable lists findings with no usable predicate (or a sort with no
+    equality filter on the sorted table).
+    """
+    _row_counts.clear()
+    _indexes.clear()
+    recommendations = defaultdict(lambda: {'pages': set(), 'plans': [], 'queries': 0, 'rows': 0})
+    unindexable = []
+    for entry in recorder.queries.values():
+        try:
+            findings = explain(entry['sql'], entry['params'])
+        except Exception:
+            continue
+        seen = set()
+        for kind, table, detail in findings:
+            if table is None or (table, kind) in seen:
+                continue
+            seen.add((table, kind))
+            rows = table_rows(table)
+            if rows < min_rows:
+                continue
+            equality, rest = candidate_columns(entry['sql'], table)
+            columns = equality + rest
+            if columns and is_covered(table, equality, rest):
+                continue
+            # An index only spares a sort when the filter can use it too
+            usable = columns and (kind == 'scan' or equality)
+            definition = index_definition(table, columns) if usable else None
+            if definition is None:
+                unindexable.append({'table': table, 'rows': rows, 'plan': detail,
+                                    'pages': entry['pages'], 'sql': entry['sql']})
+                continue
+            evidence = recommendations[definition]
+            evidence['pages'].update(entry['pages'])
+            evidence['queries'] += 1
+            evidence['rows'] = rows
+            if detail not in evidence['plans']:
+                evidence['plans'].append(detail)
+    return dict(recommendations), unindexable
@@ -0,0 +1,115 @@
+"""
+Guarded Gemini calls shared by ai_chat and goals.
+
+generate_content() fails fast while the circuit breaker is open, then
+waits for a rate limiter slot, and times only the upstream call itself
+(with a per-call deadline passed to the client) against the breaker. Callers
+catch LLMUnavailable and serve their fallback; any other exception is an
+upstream error and has already been counted by the breaker.
+
+The model comes from core.clients.get('gemini_model'), which imports the
+client on first use. With GEMINI_STUB_LATENCY set that is StubModel instead
+of the real client: it answers after a configurable delay and never leaves the
+machine. The load harness (core.loadtest) relies on it.
+"""
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+from django.conf import settings
+from .circuit import CircuitBreaker, CircuitOpen
+from .metrics import timed
+from .ratelimit import gemini_slot, RateLimited
+
+logger = logging.getLogger('core')
+
+# Either the breaker or the limiter refused the call
+LLMUnavailable = (CircuitOpen, RateLimited)
+
+gemini_breaker = CircuitBreaker(
+    'gemini',
+    failure_rate=getattr(settings, 'GEMINI_BREAKER_FAILURE_RATE', 0.5),
+    min_calls=getattr(settings, 'GEMINI_BREAKER_MIN_CALLS', 5),
+    window=getattr(settings, 'GEMINI_BREAKER_WINDOW', 60),
+    slow_call=getattr(settings, 'GEMINI_BREAKER_SLOW_CALL', 10),
+    open_seconds=getattr(settings, 'GEMINI_BREAKER_OPEN_SECONDS', 30),
+)
+
+
+def generate_content(model, prompt, user_id=None, timeout=None, queue_deadline=2, **kwargs):
+    """
+    Call model.generate_content(prompt) with the breaker, the limiter and a
+    deadline of `timeout` seconds (GEMINI_CALL_TIMEOUT by default).
+    Raises CircuitOpen or RateLimited when the call is refused.
+    """
+    timeout = timeout or getattr(settings, 'GEMINI_CALL_TIMEOUT', 20)
+    gemini_breaker.check()
+    with gemini_slot(user_id=user_id, deadline=queue_deadline):
+        with gemini_breaker.guard(), timed('gemini'):
+            return model.generate_content(prompt, request_options={'timeout': timeout}, **kwargs)
+
+
+STUB_TASKS = [
+    {'department': department, 'title': f'Stub {department} task', 'description': 'Planned by the Gemini stub.',
+     'priority': 'medium', 'timeframe': 'month 1'}
+    for department in ('strategy', 'finance', 'hr', 'operations', 'sales', 'strategy')
+]
+
+
+class StubModel:
+    """
+    Stand-in for genai.GenerativeModel with a configurable delay.
+
+    Each call sleeps `latency` seconds, give or take `jitter` (a fraction),
+    capped at the call's timeout, after which it raises TimeoutError the
+    way a real deadline would. Task-plan prompts get a JSON plan back and
+    everything else a short reply.
+    """
+
+    def __init__(self, latency, jitter=0.25):
+        self.latency = latency
+        self.jitter = jitter
+
+    def generate_content(self, prompt, request_options=None, **kwargs):
+        delay = self.latency * random.uniform(1 - self.jitter, 1 + self.jitter)
+        timeout = (request_options or {}).get('timeout')
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f'Stub Gemini call exceeded {timeout}s')
+        time.sleep(delay)
+        if '"department"' in prompt:
+            return SimpleNamespace(text=json.dumps(STUB_TASKS))
+        return SimpleNamespace(text='I hear you. Take the next small step on your goal today.')
+
+
+def stub_model():
+    """StubModel configured from GEMINI_STUB_LATENCY / GEMINI_STUB_JITTER"""
+    return StubModel(settings.GEMINI_STUB_LATENCY, getattr(settings, 'GEMINI_STUB_JITTER', 0.25))
+
+
+def gemini_enabled():
+    """Whether a Gemini model (real or stub) is configured, without importing the client"""
+    return getattr(settings, 'GEMINI_STUB_LATENCY', None) is not None or bool(settings.GEMINI_API_KEY)
+
+
+def configure_google_credentials():
+    """
+    Write GOOGLE_APPLICATION_CREDENTIALS_JSON to a temp file for the Google
+    libraries (Railway passes the service account as a variable). The
+    client itself is imported and configured on first use (core.clients).
+    """
+    credentials_json = settings.GOOGLE_CREDENTIALS_JSON
+    if not credentials_json:
+        return
+    try:
+        json.loads(credentials_json)
+    except json.JSONDecodeError as e:
+        logger.warning('Invalid GOOGLE_CREDENTIALS_JSON: %s', e)
+        return
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as creds_file:
+        creds_file.write(credentials_json)
+    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = settings.GOOGLE_APPLICATION_CREDENTIALS = creds_file.name
+    logger.info('Google credentials loaded from environment variable')
@@ -0,0 +1,245 @@
+"""
+Load harness: concurrent simulated users against a running server.
+
+Each virtual user is a thread with its own cookie jar. It logs in as one
+of the fake_user_* accounts (see generate_fake_data), then repeats
+journeys picked by weight with an exponential think time between them:
+
+* dashboard    GET /dashboard/
+* diary_write  GET the write page, then PATCH an autosave delta
+* note_search  GET /notes/?q=<word>
+* goal_board   GET /goals/board/
+* astro        GET the astro dashboard and one detail page
+* chat_send    POST a chat message (Gemini answers from the stub)
+
+Every HTTP request is timed under an endpoint label, so a journey that
+makes two requests reports two rows. Redirects are not followed; the
+expected status for each request decides whether it counts as an error.
+
+Run the server with GEMINI_STUB_LATENCY set so chat never reaches Google,
+and raise GEMINI_RATE_PER_MINUTE if the rate limiter should not turn chat
+into fallback replies. `python manage.py load_test --gunicorn ...` does
+both for a gunicorn it starts itself; compare worker counts and classes by
+running it once per configuration.
+"""
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from http.cookiejar import CookieJar
+from .fakedata import WORDS
+
+ASTRO_PAGES = ('/astro/houses/', '/astro/dasha/', '/astro/planet/moon/')
+CHAT_MESSAGES = (
+    'How am I doing on my goals this month?',
+    'I feel stuck at work, what should I focus on?',
+    'Give me one thing to do today.',
+    'What did I write about last week?',
+)
+
+# Journey name -> relative weight
+DEFAULT_MIX = {
+    'dashboard': 4,
+    'diary_write': 2,
+    'note_search': 3,
+    'goal_board': 2,
+    'astro': 1,
+    'chat_send': 1,
+}
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Stats:
+    """Thread-safe latency samples and error counts per endpoint label"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_kinds = defaultdict(lambda: defaultdict(int))
+
+    def record(self, label, seconds, error=None):
+        with self._lock:
+            self.samples[label].append(seconds)
+            if error is not None:
+                self.errors[label] += 1
+                self.error_kinds[label][error] += 1
+
+
+class Session:
+    """One virtual user's HTTP client: cookies, CSRF token and timing"""
+
+    def __init__(self, base_url, stats, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, label, method, path, data=None, json_body=None, expect=(200,)):
+        """Send one request and record it; returns (status, body) or (None, b'') on a network error"""
+        headers = {'Referer': self.base_url + '/'}
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            body = urllib.parse.urlencode(data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if method != 'GET':
+            headers['X-CSRFToken'] = self.csrf_token()
+
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                status, content = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, content = e.code, e.read()
+        except OSError as e:
+            self.stats.record(label, time.perf_counter() - start, type(e).__name__)
+            return None, b''
+        self.stats.record(label, time.perf_counter() - start, None if status in expect else str(status))
+        return status, content
+
+
+class VirtualUser:
+
+    def __init__(self, session, username, password, rng, think, mix):
+        self.session = session
+        self.username = username
+        self.password = password
+        self.rng = rng
+        self.think = think
+        self.journeys = list(mix)
+        self.weights = [mix[name] for name in self.journeys]
+        self.diary_version = 0
+        self.diary_length = 0
+
+    def login(self):
+        self.session.request('login_page', 'GET', '/')
+        status, _ = self.session.request('login', 'POST', '/', data={
+            'username': self.username,
+            'password': self.password,
+            'csrfmiddlewaretoken': self.session.csrf_token(),
+        }, expect=(302,))
+        return status == 302
+
+    def run(self, deadline):
+        while time.monotonic() < deadline:
+            journey = self.rng.choices(self.journeys, self.weights)[0]
+            getattr(self, journey)()
+            if self.think:
+                time.sleep(min(self.rng.expovariate(1 / self.think), max(deadline - time.monotonic(), 0)))
+
+    # Journeys
+
+    def dashboard(self):
+        self.session.request('dashboard', 'GET', '/dashboard/')
+
+    def diary_write(self):
+        self.session.request('diary_write_page', 'GET', '/diary/write/')
+        text = f' {self.rng.choice(WORDS)}'
+        for _ in range(2):
+            # Virtual users share accounts, so a conflict just means rebasing
+            status, content = self.session.request(
+                'diary_autosave', 'PATCH', '/diary/write/autosave/',
+                json_body={'version': self.diary_version, 'patches': {'content': [[self.diary_length, 0, text]]}},
+                expect=(200, 409),
+            )
+            if status not in (200, 409):
+                return
+            data = json.loads(content)
+            self.diary_version = data['version']
+            if status == 200:
+                self.diary_length += len(text)
+                return
+            self.diary_length = len(data['fields']['content'])
+
+    def note_search(self):
+        self.session.request('note_search', 'GET', '/notes/?' + urllib.parse.urlencode({'q': self.rng.choice(WORDS)}))
+
+    def goal_board(self):
+        self.session.request('goal_board', 'GET', '/goals/board/')
+
+    def astro(self):
+        self.session.request('astro_dashboard', 'GET', '/astro/')
+        self.session.request('astro_detail', 'GET', self.rng.choice(ASTRO_PAGES))
+
+    def chat_send(self):
+        self.session.request('chat_send', 'POST', '/ai-chat/send/', json_body={'message': self.rng.choice(CHAT_MESSAGES)})
+
+
+def run_load(base_url, users, duration, usernames, password='fake-password', think=1.0, ramp=0.0,
+             mix=None, seed=0, timeout=30):
+    """
+    Drive `users` virtual users for `duration` seconds, starting them evenly
+    over `ramp` seconds, with accounts assigned round-robin from usernames.
+    Returns (stats, wall-clock seconds of the run, usernames whose login failed).
+    """
+    stats = Stats()
+    mix = mix or DEFAULT_MIX
+    failed_logins = []
+    start = time.monotonic()
+    deadline = start + ramp + duration
+
+    def worker(index):
+        time.sleep(ramp * index / max(users, 1))
+        username = usernames[index % len(usernames)]
+        session = Session(base_url, stats, timeout)
+        user = VirtualUser(session, username, password, random.Random(seed * 1000 + index), think, mix)
+        if not user.login():
+            failed_logins.append(username)
+            return
+        user.run(deadline)
+
+    threads = [threading.Thread(target=worker, args=(i,), name=f'vu-{i}', daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats, time.monotonic() - start, failed_logins
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(stats, elapsed):
+    """[{endpoint, requests, rps, p50, p95, p99, max (ms), errors, error_rate}], total row last"""
+    def row(label, samples, errors):
+        samples = sorted(samples)
+        return {
+            'endpoint': label,
+            'requests': len(samples),
+            'rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            'p50': round(percentile(samples, 50) * 1000, 1),
+            'p95': round(percentile(samples, 95) * 1000, 1),
+            'p99': round(percentile(samples, 99) * 1000, 1),
+            'max': round(samples[-1] * 1000, 1) if samples else 0.0,
+            'errors': errors,
+            'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+            'error_kinds': dict(stats.error_kinds.get(label, {})),
+        }
+
+    rows = [row(label, stats.samples[label], stats.errors[label]) for label in sorted(stats.samples)]
+    every = [value for samples in stats.samples.values() for value in samples]
+    total = row('TOTAL', every, sum(stats.errors.values()))
+    total['error_kinds'] = {}
+    return rows + [total]
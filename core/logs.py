@@ -0,0 +1,211 @@
+"""
+Non-blocking, structured logging.
+
+Request threads never write to disk or the console. AsyncLogHandler is a
+QueueHandler: a record is filtered, has its message and traceback
+rendered, and is put on a bounded in-memory queue. A QueueListener thread
+per process drains the queue into the real handlers:
+
+* a size-rotated file (LOG_FILE_MAX_BYTES, LOG_FILE_BACKUPS)
+* the console, which is what Railway collects
+
+Both write one JSON object per line (JsonFormatter): time, level,
+logger, message, module, the request id and any extra= fields. Set
+LOG_FORMAT=text for the old human-readable lines in development.
+
+RequestIdFilter stamps each record with the id of the request it was
+logged under. core.middleware.RequestLogMiddleware assigns the id (from an
+incoming X-Request-ID header, or a new one), echoes it on the response and
+logs one core.requests line per request with its status and timings.
+
+SamplingFilter keeps only a fraction of INFO/DEBUG records from
+high-volume loggers (LOG_SAMPLING); warnings and errors are always kept.
+The decision is made per request id, so a sampled request keeps all of
+its lines.
+
+If the queue is full (a stuck disk or a log flood), records are dropped
+and counted rather than blocking the request. The listener starts in
+each process when logging is configured (gunicorn workers configure it
+after forking) and is flushed at exit.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+_request_id = ContextVar('request_id', default=None)
+
+# LogRecord attributes that are not extra= fields
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+def new_request_id():
+    return uuid.uuid4().hex
+
+
+def set_request_id(request_id):
+    """Bind request_id to the current context; returns a token for reset_request_id"""
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request's id (None outside requests)"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep `rate` of the INFO and DEBUG records from each logger named in
+    rates (a logger and its children). Warnings and above always pass.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = rates or {}
+
+    def _rate(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        # Same decision for every line of one request
+        key = getattr(record, 'request_id', None) or _request_id.get()
+        if key is None:
+            return random.random() < rate
+        return zlib.crc32(key.encode()) / 0xFFFFFFFF < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, extra= fields included"""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'request_id': getattr(record, 'request_id', None),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = record.stack_info
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler for a file several worker processes append to:
+    once another process has rotated the file, reopen the new one instead
+    of writing on into the renamed backup.
+    """
+
+    def shouldRollover(self, record):
+        if self.stream is not None:
+            try:
+                current = os.stat(self.baseFilename).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(self.stream.fileno()).st_ino:
+                self.stream.close()
+                self.stream = self._open()
+        return super().shouldRollover(record)
+
+
+class AsyncLogHandler(QueueHandler):
+    """
+    Queue in front of a rotating JSON file and the console, drained by a
+    background QueueListener (see module docstring).
+    """
+
+    def __init__(self, filename=None, max_bytes=10 * 1024 * 1024, backup_count=5, console=True,
+                 format='json', queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.dropped = self._reported = 0
+        formatter = JsonFormatter() if format == 'json' else logging.Formatter(
+            '[{levelname}] {asctime} {module} {request_id} {message}', style='{',
+        )
+        handlers = []
+        if filename:
+            file_handler = SharedRotatingFileHandler(
+                filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True,
+            )
+            handlers.append(file_handler)
+        if console:
+            handlers.append(logging.StreamHandler())
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        self.listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def prepare(self, record):
+        # Render what cannot wait for the listener thread: the message with
+        # its args and the traceback. extra= fields ride along untouched.
+        record = logging.makeLogRecord(vars(record))
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped != self._reported:
+            count, self._reported = self.dropped - self._reported, self.dropped
+            notice = logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f'Log queue was full; dropped {count} record(s)', 'request_id': None,
+            })
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                pass
+
+    def close(self):
+        listener, self.listener = getattr(self, 'listener', None), None
+        if listener is not None:
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+        super().close()
@@ -0,0 +1,93 @@
+"""
+Recommend indexes from the query plans of every page.
+
+Builds a test database with fake data at realistic volume, renders every
+page as fake_user_0 (detail pages on its own rows), EXPLAINs each distinct
+SELECT and prints candidate models.Index definitions for scans and sorts
+on large tables, with the pages and plan lines behind each (see
+core.index_advisor).
+Run it against PostgreSQL (DATABASE_URL) for EXPLAIN ANALYZE plans that
+match production; SQLite gives EXPLAIN QUERY PLAN.
+
+Usage:
+    python manage.py advise_indexes
+    python manage.py advise_indexes --scale 1 --min-rows 5000
+    python manage.py advise_indexes --json advice.json
+"""
+
+import json
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from core import index_advisor, query_budgets
+from core.fakedata import DEFAULT_VOLUMES, FakeData
+
+
+class Command(BaseCommand):
+    help = 'EXPLAINs every page\'s queries over realistic data and recommends indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.25,
+                            help='Fraction of the generate_fake_data default volumes to load (default 0.25)')
+        parser.add_argument('--min-rows', type=int, default=1000,
+                            help='Ignore scans and sorts on tables smaller than this (default 1000)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--verbose-sql', action='store_true', help='Show the SQL behind unindexable findings')
+        parser.add_argument('--json', dest='json_path', help='Also write the findings to this file')
+
+    def handle(self, *args, **options):
+        volumes = {
+            name: value if name in ('users', 'diary_years') else max(int(value * options['scale']), 1)
+            for name, value in DEFAULT_VOLUMES.items()
+        }
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            with override_settings(CACHES=query_budgets.ISOLATED_CACHES):
+                users = FakeData(seed=options['seed']).generate(volumes)
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                recorder = index_advisor.record_pages(index_advisor.user_fixtures(users[0]))
+                recommendations, unindexable = index_advisor.advise(recorder, options['min_rows'])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        self.stdout.write(
+            f'{len(recorder.queries)} distinct queries explained on {connection.vendor} '
+            f'(tables of {options["min_rows"]}+ rows)'
+        )
+        ranked = sorted(recommendations.items(), key=lambda item: (-len(item[1]['pages']), -item[1]['rows']))
+        for (label, definition), evidence in ranked:
+            self.stdout.write(self.style.SUCCESS(f'{label}: {definition}'))
+            self.stdout.write(
+                f"    {evidence['queries']} query shape(s), {evidence['rows']} rows, "
+                f"pages: {', '.join(sorted(evidence['pages']))}"
+            )
+            for plan in evidence['plans'][:3]:
+                self.stdout.write(f'    plan: {plan}')
+        if not recommendations:
+            self.stdout.write(self.style.SUCCESS('No missing indexes found'))
+
+        for finding in unindexable:
+            self.stdout.write(self.style.WARNING(
+                f"No B-tree candidate for {finding['table']} ({finding['rows']} rows) "
+                f"on {', '.join(finding['pages'])}: {finding['plan']}"
+            ))
+            if options['verbose_sql']:
+                self.stdout.write(f"    {finding['sql']}")
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({
+                    'vendor': connection.vendor,
+                    'recommendations': [
+                        {'model': label, 'index': definition, 'queries': evidence['queries'],
+                         'rows': evidence['rows'], 'pages': sorted(evidence['pages']), 'plans': evidence['plans']}
+                        for (label, definition), evidence in ranked
+                    ],
+                    'unindexable': unindexable,
+                }, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote findings to {options['json_path']}"))
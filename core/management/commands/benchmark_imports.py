@@ -0,0 +1,132 @@
+"""
+Measure a worker's cold start with python -X importtime.
+
+Each run is a fresh interpreter that does what a gunicorn worker does
+before its first request: load the WSGI application and the URLconf
+(which imports every app's views). The best of --repeat runs is reported
+with its wall-clock time, the total import time, the slowest top-level
+imports and whether the heavy clients core.clients defers
+(google.generativeai, swisseph) were imported anyway. With --first-use
+the same interpreter then builds those clients, to show the cost that
+moved to the first request that needs them.
+
+Usage:
+    python manage.py benchmark_imports
+    python manage.py benchmark_imports --repeat 5 --top 20 --first-use
+    python manage.py benchmark_imports --json startup.json
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Modules a fast start should not import
+HEAVY_MODULES = ('google.generativeai', 'swisseph', 'grpc', 'google.protobuf', 'IPython')
+
+FIRST_USE_MARKER = '-- first use --'
+
+PROBE = '''
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+result = {{'startup': time.perf_counter() - start}}
+if {first_use!r}:
+    from core import clients
+    sys.stderr.write({marker!r} + '\\n')
+    for name in ('genai', 'swisseph'):
+        start = time.perf_counter()
+        try:
+            clients.get(name)
+        except ImportError:
+            pass
+        result[name] = time.perf_counter() - start
+print(json.dumps(result))
+'''
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_importtime(lines):
+    """[(module, self us, cumulative us, depth)] from -X importtime output"""
+    modules = []
+    for line in lines:
+        match = _LINE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2)),
+                            (len(match.group(3)) - 1) // 2))
+    return modules
+
+
+def run_probe(first_use=False):
+    settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+    code = PROBE.format(settings_module=settings_module, first_use=first_use, marker=FIRST_USE_MARKER)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=settings.BASE_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise CommandError(f'Startup probe failed:\n{proc.stderr[-2000:]}')
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    startup_lines = proc.stderr.partition(FIRST_USE_MARKER)[0]
+    result['modules'] = parse_importtime(startup_lines.splitlines())
+    result['import_us'] = sum(self_us for _, self_us, _, _ in result['modules'])
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Measures worker cold-start time and the imports behind it with python -X importtime'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Runs to take the best of (default 3)')
+        parser.add_argument('--top', type=int, default=15, help='Slowest top-level imports to list (default 15)')
+        parser.add_argument('--first-use', action='store_true',
+                            help='Also time building the deferred clients after startup')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        runs = [run_probe(options['first_use']) for _ in range(max(options['repeat'], 1))]
+        best = min(runs, key=lambda run: run['startup'])
+
+        timings = ', '.join(f"{run['startup'] * 1000:.0f}" for run in runs)
+        self.stdout.write(
+            f"Startup (WSGI app + URLconf): {best['startup'] * 1000:.0f} ms wall, "
+            f"{best['import_us'] / 1000:.0f} ms importing {len(best['modules'])} modules "
+            f"(best of {len(runs)}; runs: {timings} ms)"
+        )
+
+        top_level = sorted((m for m in best['modules'] if m[3] == 0), key=lambda m: -m[2])
+        self.stdout.write("Slowest top-level imports (cumulative):")
+        for name, _, cumulative, _ in top_level[:options['top']]:
+            self.stdout.write(f'    {cumulative / 1000:8.1f} ms  {name}')
+
+        imported = {name: cumulative for name, _, cumulative, _ in best['modules']}
+        for name in HEAVY_MODULES:
+            if name in imported:
+                self.stdout.write(self.style.WARNING(f'{name} imported at startup ({imported[name] / 1000:.0f} ms)'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name} not imported at startup'))
+
+        if options['first_use']:
+            for name in ('genai', 'swisseph'):
+                self.stdout.write(f'First use of {name}: {best[name] * 1000:.0f} ms')
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({
+                    'runs': [run['startup'] for run in runs],
+                    'startup': best['startup'],
+                    'import_us': best['import_us'],
+                    'top_level': [{'module': name, 'cumulative_us': cumulative}
+                                  for name, _, cumulative, _ in top_level],
+                    'heavy_at_startup': {name: imported.get(name) for name in HEAVY_MODULES},
+                    'first_use': {name: best[name] for name in ('genai', 'swisseph') if name in best},
+                }, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['json_path']}"))
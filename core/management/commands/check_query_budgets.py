@@ -0,0 +1,80 @@
+"""
+Check every page's database query count against the committed baseline.
+
+Renders each named URL over a fresh test database seeded with a small,
+realistic data set (see core.query_budgets) and fails if any page runs
+more queries than core/query_budgets.json allows. Run it before merging
+changes to views, templates or context processors; after an intended
+change (or a fix that lowers a count), rewrite the baseline with --update.
+
+Usage:
+    python manage.py check_query_budgets
+    python manage.py check_query_budgets --report          # top offenders and repeated queries
+    python manage.py check_query_budgets --update          # rewrite the baseline
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from core import query_budgets
+
+
+class Command(BaseCommand):
+    help = 'Checks every page against its committed database query budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--update', action='store_true', help='Write the measured counts as the new baseline')
+        parser.add_argument('--report', action='store_true', help='Print the top offenders and their repeated queries')
+        parser.add_argument('--top', type=int, default=10, help='Pages to show in the report (default 10)')
+        parser.add_argument('--tolerance', type=int, default=0, help='Extra queries allowed over the baseline')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            with override_settings(CACHES=query_budgets.ISOLATED_CACHES):
+                fixtures = query_budgets.build_fixtures()
+                results, skipped = query_budgets.measure_all(fixtures)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        for name in skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped {name}: no arguments known for its URL'))
+
+        for name, result in sorted(results.items()):
+            if result['status'] >= 500:
+                self.stdout.write(self.style.WARNING(f"{name} ({result['path']}) returned {result['status']}"))
+
+        if options['report']:
+            self.report(results, options['top'])
+
+        if options['update']:
+            query_budgets.write_baseline(results)
+            self.stdout.write(self.style.SUCCESS(
+                f'Wrote budgets for {len(results)} pages to {query_budgets.BASELINE_PATH}'
+            ))
+            return
+
+        baseline = query_budgets.load_baseline()
+        for name in sorted(set(results) - set(baseline)):
+            if results[name]['status'] < 400:
+                self.stdout.write(self.style.WARNING(f'{name} has no budget yet; run with --update'))
+        failures = query_budgets.over_budget(results, baseline, options['tolerance'])
+        for name, queries, budget in failures:
+            self.stdout.write(self.style.ERROR(f'{name} ({results[name]["path"]}): {queries} queries, budget {budget}'))
+        if failures:
+            raise CommandError(f'{len(failures)} page(s) over their query budget')
+        self.stdout.write(self.style.SUCCESS(f'All {len(set(results) & set(baseline))} budgeted pages within their query budgets'))
+
+    def report(self, results, top):
+        ranked = sorted(results.items(), key=lambda item: (-item[1]['queries'], -item[1]['db_ms']))
+        self.stdout.write(f"{'queries':>7} {'db ms':>8} {'total ms':>9} {'status':>6}  page")
+        for name, result in ranked[:top]:
+            self.stdout.write(
+                f"{result['queries']:>7} {result['db_ms']:>8.2f} {result['ms']:>9.1f} {result['status']:>6}  "
+                f"{name} {result['path']}"
+            )
+            for shape, count in list(result['repeated'].items())[:3]:
+                self.stdout.write(f"{'':>9}x{count} {shape[:160]}")
@@ -0,0 +1,53 @@
+"""
+Generate synthetic users and data at realistic volumes (see core.fakedata).
+
+Users are named fake_user_0, fake_user_1, ... with password
+"fake-password". The same --seed and --end-date always produce the same
+rows. Existing fake users must be removed first (--replace) because their
+ids would collide.
+
+Usage:
+    python manage.py generate_fake_data
+    python manage.py generate_fake_data --users 3 --notes 50000 --seed 7
+    python manage.py generate_fake_data --replace --end-date 2026-01-01
+    python manage.py rebuild_changelog && python manage.py build_retrieval_index   # afterwards
+"""
+
+from datetime import date
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from core.fakedata import DEFAULT_VOLUMES, FakeData
+
+
+class Command(BaseCommand):
+    help = 'Generates deterministic fake users with notes, diary entries, goals, tasks and chat history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--end-date', type=date.fromisoformat, help='Last day of the history (default today)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--replace', action='store_true', help='Delete existing fake users first')
+        for name, default in DEFAULT_VOLUMES.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default, dest=name)
+
+    def handle(self, *args, **options):
+        existing = User.objects.filter(username__startswith='fake_user_')
+        if existing.exists():
+            if not options['replace']:
+                raise CommandError('Fake users already exist; rerun with --replace to regenerate them')
+            existing.delete()
+
+        generator = FakeData(
+            seed=options['seed'],
+            end_date=options['end_date'],
+            batch_size=options['batch_size'],
+            stdout=self.stdout,
+        )
+        with transaction.atomic():
+            users = generator.generate({name: options[name] for name in DEFAULT_VOLUMES})
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} fake user(s) from seed {options["seed"]}. '
+            'Run rebuild_changelog and build_retrieval_index to index them.'
+        ))
@@ -0,0 +1,144 @@
+"""
+Drive concurrent simulated users against a server and report latency.
+
+Point it at a running server (--url) that was started with
+GEMINI_STUB_LATENCY set, or let it start gunicorn itself with --gunicorn,
+passing the worker flags to compare. Seed accounts first with
+generate_fake_data; virtual users share the fake_user_* accounts
+round-robin. See core.loadtest for the journeys.
+
+Usage:
+    python manage.py generate_fake_data --users 4
+    python manage.py load_test --gunicorn "--workers 2" --users 20 --duration 60
+    python manage.py load_test --gunicorn "--workers 4 --worker-class gthread --threads 4" --users 20
+    python manage.py load_test --url http://127.0.0.1:8000 --users 10 --json results.json
+"""
+
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from core import loadtest
+
+
+class Command(BaseCommand):
+    help = 'Runs simulated user journeys concurrently and reports throughput and latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server (default: start one with --gunicorn)')
+        parser.add_argument('--gunicorn', metavar='ARGS', default=None,
+                            help='Start gunicorn with these extra arguments, e.g. "--workers 2"')
+        parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users (default 10)')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run after ramp-up (default 30)')
+        parser.add_argument('--ramp', type=float, default=5, help='Seconds over which users start (default 5)')
+        parser.add_argument('--think', type=float, default=1.0, help='Mean think time between journeys (default 1s)')
+        parser.add_argument('--gemini-latency', type=float, default=1.5,
+                            help='Stub Gemini delay for a gunicorn started here (default 1.5s)')
+        parser.add_argument('--accounts', type=int, default=None,
+                            help='Use fake_user_0..N-1 (default: every fake_user_* account)')
+        parser.add_argument('--password', default='fake-password')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--timeout', type=float, default=30, help='Per-request client timeout (default 30s)')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+
+    def handle(self, *args, **options):
+        if bool(options['url']) == (options['gunicorn'] is not None):
+            raise CommandError('Give either --url or --gunicorn')
+
+        usernames = self.usernames(options['accounts'])
+        server = None
+        url = options['url']
+        if url is None:
+            server, url = self.start_gunicorn(options['gunicorn'], options['gemini_latency'])
+        try:
+            self.stdout.write(
+                f"{options['users']} users for {options['duration']:g}s (+{options['ramp']:g}s ramp) "
+                f"against {url} as {len(usernames)} account(s)"
+            )
+            stats, elapsed, failed_logins = loadtest.run_load(
+                url, options['users'], options['duration'], usernames,
+                password=options['password'], think=options['think'], ramp=options['ramp'],
+                seed=options['seed'], timeout=options['timeout'],
+            )
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+        if failed_logins:
+            self.stdout.write(self.style.WARNING(
+                f'{len(failed_logins)} virtual user(s) could not log in: {", ".join(sorted(set(failed_logins)))}'
+            ))
+        rows = loadtest.summarize(stats, elapsed)
+        self.report(rows)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({
+                    'url': url,
+                    'gunicorn': options['gunicorn'],
+                    'users': options['users'],
+                    'duration': options['duration'],
+                    'elapsed': round(elapsed, 2),
+                    'endpoints': rows,
+                }, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['json_path']}"))
+
+    def usernames(self, accounts):
+        names = sorted(
+            User.objects.filter(username__startswith='fake_user_').values_list('username', flat=True),
+            key=lambda name: int(name.rsplit('_', 1)[1]) if name.rsplit('_', 1)[1].isdigit() else 0,
+        )
+        if accounts is not None:
+            names = names[:accounts]
+        if not names:
+            raise CommandError('No fake_user_* accounts; run generate_fake_data first')
+        return names
+
+    def start_gunicorn(self, extra_args, gemini_latency):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        env = dict(os.environ, GEMINI_STUB_LATENCY=str(gemini_latency))
+        env.setdefault('GEMINI_RATE_PER_MINUTE', '100000')
+        env.setdefault('GEMINI_USER_RATE_PER_MINUTE', '100000')
+        command = [
+            sys.executable, '-m', 'gunicorn', 'jaytipargal.wsgi:application',
+            '--bind', f'127.0.0.1:{port}', '--timeout', '120', *shlex.split(extra_args),
+        ]
+        self.stdout.write(' '.join(command))
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        url = f'http://127.0.0.1:{port}'
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited with status {server.returncode}')
+            try:
+                urllib.request.urlopen(url + '/health/', timeout=2).close()
+                return server, url
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError('gunicorn did not answer /health/ within 30s')
+
+    def report(self, rows):
+        self.stdout.write(
+            f"{'endpoint':<18} {'requests':>8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'max ms':>8} {'errors':>7} {'err %':>6}"
+        )
+        for row in rows:
+            line = (
+                f"{row['endpoint']:<18} {row['requests']:>8} {row['rps']:>7.2f} {row['p50']:>8.1f} "
+                f"{row['p95']:>8.1f} {row['p99']:>8.1f} {row['max']:>8.1f} {row['errors']:>7} "
+                f"{row['error_rate'] * 100:>6.2f}"
+            )
+            if row['error_kinds']:
+                line += '  ' + ', '.join(f'{kind} x{count}' for kind, count in sorted(row['error_kinds'].items()))
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
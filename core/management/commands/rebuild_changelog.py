@@ -0,0 +1,59 @@
+"""
+Seed the delta sync change log from existing rows.
+
+Rows written before the change log existed have no entry, so a client
+syncing from cursor 0 would not see them. This records a 'create' for
+every synced object that has no change log row yet.
+
+Usage:
+    python manage.py rebuild_changelog
+    python manage.py rebuild_changelog --if-empty   # no-op once seeded
+"""
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from core.models import ChangeLog
+from core.sync import SYNC_MODELS
+
+
+class Command(BaseCommand):
+    help = 'Seeds the delta sync change log with existing notes, diary entries, goals, tasks, milestones and chat messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-empty',
+            action='store_true',
+            help='Only seed when the change log has no rows yet',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk insert',
+        )
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and ChangeLog.objects.exists():
+            self.stdout.write('Change log already seeded. Skipping.')
+            return
+
+        batch_size = options['batch_size']
+        for kind, (label, user_path, _) in SYNC_MODELS.items():
+            model = apps.get_model(label)
+            logged = set(ChangeLog.objects.filter(kind=kind).values_list('object_pk', flat=True))
+
+            batch = []
+            created = 0
+            for pk, user_id in model.objects.values_list('pk', user_path).order_by('pk').iterator():
+                if str(pk) in logged:
+                    continue
+                batch.append(ChangeLog(user_id=user_id, kind=kind, object_pk=str(pk), action='create'))
+                if len(batch) >= batch_size:
+                    ChangeLog.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            if batch:
+                ChangeLog.objects.bulk_create(batch)
+                created += len(batch)
+
+            self.stdout.write(self.style.SUCCESS(f'{kind}: {created} change log rows added'))
@@ -0,0 +1,241 @@
+"""
+Request timing and in-process metrics.
+
+Each request gets a RequestTimings object in a context variable (set by
+core.middleware.ServerTimingMiddleware). Instrumented code adds its time
+to one of the request's phases:
+
+* db        every query on the default connection (execute_wrapper)
+* template  top-level template renders (TimedDjangoTemplates backend)
+* gemini    core.llm.generate_content's upstream call
+* swisseph  calls through the TimedModule wrapper (core.clients)
+
+The phases go out as a Server-Timing header (to staff, see
+core.middleware) and into histograms, which /metrics exposes in the
+Prometheus text format along with the tiered cache's counters. Phases can
+overlap: queries run lazily while a template renders count in both.
+
+Histograms live in the worker process. Each gunicorn worker keeps its own
+and a scrape sees whichever worker answers, so compare rates rather than
+absolute counts across scrapes.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template import TemplateDoesNotExist
+
+PHASES = ('db', 'template', 'gemini', 'swisseph')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestTimings:
+    __slots__ = ('start', 'durations', 'counts')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def add(self, phase, seconds):
+        self.durations[phase] += seconds
+        self.counts[phase] += 1
+
+
+_current = ContextVar('request_timings', default=None)
+
+
+def start_request():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_timings():
+    """The current request's RequestTimings, or None outside a timed request"""
+    return _current.get()
+
+
+@contextmanager
+def timed(phase):
+    """Add the block's wall time to the current request's phase"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start)
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrapper hook timing every query into 'db'"""
+    with timed('db'):
+        return execute(sql, params, many, context)
+
+
+class TimedModule:
+    """
+    Proxy for an extension module whose calls should count toward a phase.
+    Attribute lookups pass through; callables are timed.
+    """
+
+    def __init__(self, module, phase):
+        self._module = module
+        self._phase = phase
+        self._wrapped = {}
+
+    def __getattr__(self, name):
+        attr = getattr(self._module, name)
+        if not callable(attr):
+            return attr
+        wrapper = self._wrapped.get(name)
+        if wrapper is None:
+            phase = self._phase
+
+            def wrapper(*args, **kwargs):
+                with timed(phase):
+                    return attr(*args, **kwargs)
+
+            self._wrapped[name] = wrapper
+        return wrapper
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates count their render time toward 'template'"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, Prometheus style"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            prefix = f'{label_text},' if label_text else ''
+            running = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values[:-1]):
+                running += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {running}')
+            suffix = f'{{{label_text}}}' if label_text else ''
+            lines.append(f'{self.name}_sum{suffix} {values[-1]:.6f}')
+            lines.append(f'{self.name}_count{suffix} {running}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter per label set, Prometheus style"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values = defaultdict(int)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            label_text = ','.join(f'{name}="{_escape(label)}"' for name, label in zip(self.labelnames, labels))
+            lines.append(f'{self.name}{{{label_text}}} {value}' if label_text else f'{self.name} {value}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Time to produce the response', ('method', 'route', 'status'),
+)
+PHASE_DURATION = Histogram(
+    'http_request_phase_seconds', 'Time per request spent in each phase', ('phase',),
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries per request', (), buckets=QUERY_COUNT_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Tiered cache lookups by key namespace and result (core.caching)', ('namespace', 'result'),
+)
+REGISTRY = [REQUEST_DURATION, PHASE_DURATION, DB_QUERIES, CACHE_REQUESTS]
+
+
+def observe_request(timings, method, route, status):
+    """Fold one finished request into the histograms; returns its total seconds"""
+    total = time.perf_counter() - timings.start
+    REQUEST_DURATION.observe(total, method, route, f'{status // 100}xx')
+    for phase, seconds in timings.durations.items():
+        PHASE_DURATION.observe(seconds, phase)
+    DB_QUERIES.observe(timings.counts['db'])
+    return total
+
+
+def server_timing_header(timings, total):
+    """Server-Timing header value for one request"""
+    entries = []
+    for phase in PHASES:
+        if phase in timings.durations:
+            entry = f'{phase};dur={timings.durations[phase] * 1000:.1f}'
+            if phase == 'db':
+                entry += f';desc="{timings.counts[phase]} queries"'
+            entries.append(entry)
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+def render_metrics():
+    """All histograms in the Prometheus text exposition format"""
+    lines = []
+    for histogram in REGISTRY:
+        lines.extend(histogram.expose())
+    return '\n'.join(lines) + '\n'
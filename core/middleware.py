@@ -0,0 +1,107 @@
+"""
+Request middleware for the core app.
+"""
+import logging
+import re
+import time
+from django.conf import settings
+from django.db import connection
+from django.utils.functional import empty
+from . import logs, metrics
+
+request_logger = logging.getLogger('core.requests')
+
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+def loaded_user(request):
+    """request.user if the view already loaded it, else None; never costs a query"""
+    user = getattr(request, 'user', None)
+    if user is None or getattr(user, '_wrapped', None) is empty:
+        return None
+    return user
+
+
+class ServerTimingMiddleware:
+    """
+    Time each request by phase (see core.metrics) and record it in the
+    /metrics histograms. The Server-Timing header goes only to staff
+    (whose user the view already loaded) unless SERVER_TIMING_PUBLIC is set.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'SERVER_TIMING_ENABLED', True)
+        self.public = getattr(settings, 'SERVER_TIMING_PUBLIC', False)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        timings, token = metrics.start_request()
+        try:
+            with connection.execute_wrapper(metrics.db_execute_wrapper):
+                response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else 'unmatched'
+        total = metrics.observe_request(timings, request.method, route, response.status_code)
+        user = loaded_user(request)
+        if self.public or (user is not None and user.is_staff):
+            response['Server-Timing'] = metrics.server_timing_header(timings, total)
+        return response
+
+
+class RequestLogMiddleware:
+    """
+    Give each request an id (an incoming X-Request-ID or a new one) that
+    every log record made while handling it carries (core.logs), echo it
+    in the X-Request-ID response header, and log one core.requests line
+    with the status and timings. Server errors and requests slower than
+    LOG_SLOW_REQUEST_MS log as warnings, so sampling never drops them.
+    Sits inside ServerTimingMiddleware to read the request's phase timings.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'LOG_SLOW_REQUEST_MS', 1000)
+
+    def __call__(self, request):
+        incoming = request.headers.get('X-Request-ID', '')
+        request_id = incoming if _VALID_REQUEST_ID.match(incoming) else logs.new_request_id()
+        token = logs.set_request_id(request_id)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.log(request, response, duration_ms)
+        finally:
+            logs.reset_request_id(token)
+        response['X-Request-ID'] = request_id
+        return response
+
+    def log(self, request, response, duration_ms):
+        timings = metrics.current_timings()
+        match = getattr(request, 'resolver_match', None)
+        level = logging.WARNING if response.status_code >= 500 or duration_ms >= self.slow_ms else logging.INFO
+        request_logger.log(
+            level, '%s %s %s %.1fms', request.method, request.path, response.status_code, duration_ms,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'route': match.route if match else None,
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 1),
+                'db_ms': round(timings.durations['db'] * 1000, 1) if timings else None,
+                'db_queries': timings.counts['db'] if timings else None,
+                'user_id': self.loaded_user_id(request),
+            },
+        )
+
+    @staticmethod
+    def loaded_user_id(request):
+        """The user's id if the view already loaded the user; never costs a query"""
+        user = loaded_user(request)
+        return user.pk if user is not None else None
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:25
+
+from django.db import migrations, models
+
+# ChangeLog ids are handed out at insert but become visible at commit, so
+# on PostgreSQL a long transaction can commit a lower id after a client
+# has read past it. Rows instead get seq at commit, under a transaction
+# advisory lock held until the commit completes: seq becomes visible in
+# order. Existing rows keep their id as seq, so stored cursors stay valid.
+CREATE_SQL = [
+    'CREATE SEQUENCE core_changelog_commit_seq',
+    "SELECT setval('core_changelog_commit_seq', COALESCE((SELECT MAX(id) FROM core_changelog), 0) + 1, false)",
+    'UPDATE core_changelog SET seq = id',
+    """
+    CREATE FUNCTION core_changelog_assign_seq() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock(hashtext('core_changelog_commit_seq'));
+        UPDATE core_changelog SET seq = nextval('core_changelog_commit_seq') WHERE id = NEW.id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE CONSTRAINT TRIGGER core_changelog_commit_seq
+    AFTER INSERT ON core_changelog
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE PROCEDURE core_changelog_assign_seq()
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS core_changelog_commit_seq ON core_changelog',
+    'DROP FUNCTION IF EXISTS core_changelog_assign_seq()',
+    'DROP SEQUENCE IF EXISTS core_changelog_commit_seq',
+]
+
+
+def create_commit_seq(apps, schema_editor):
+    # SQLite takes one writer at a time, so ids already commit in order
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in CREATE_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_commit_seq(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_profilereport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelog',
+            name='seq',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['user', 'seq'], name='core_change_user_id_9e6e3f_idx'),
+        ),
+        migrations.RunPython(create_commit_seq, drop_commit_seq),
+    ]
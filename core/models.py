@@ -78,3 +78,79 @@ class DailyFlower(models.Model):
     
     def __str__(self):
         return self.name
+
+
+class SyncOperation(models.Model):
+    """Idempotency record for an operation replayed by the offline sync endpoint"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_operations')
+    key = models.CharField(max_length=64)
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['user', 'key']
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.key}"
+
+
+class ChangeLog(models.Model):
+    """
+    Per-user change feed for delta sync. The cursor is the auto-increment id
+    on SQLite and seq, numbered in commit order, on PostgreSQL (core.sync)
+    """
+    ACTION_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='change_log')
+    kind = models.CharField(max_length=20)
+    object_pk = models.CharField(max_length=64)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True)
+    # Set at commit by a PostgreSQL trigger (migration 0006); null elsewhere
+    seq = models.BigIntegerField(null=True, editable=False)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+            models.Index(fields=['user', 'seq']),
+            models.Index(fields=['user', 'kind', 'object_pk']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.pk} {self.action} {self.kind} {self.object_pk}"
+
+
+class RateLimitBucket(models.Model):
+    """Token bucket shared by every worker (see core.ratelimit)"""
+    key = models.CharField(max_length=100, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.FloatField()  # Unix time of the last refill
+    
+    def __str__(self):
+        return f"{self.key}: {self.tokens:.1f} tokens"
+
+
+class ProfileReport(models.Model):
+    """One request profiled on demand by a staff user (see core.profiling)"""
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='profile_reports')
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    mode = models.CharField(max_length=20)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    query_ms = models.FloatField()
+    queries = models.JSONField(default=list)  # [{sql, ms, origin: [frames]}]
+    stats = models.TextField(blank=True)  # pstats output (cprofile mode)
+    collapsed = models.TextField(blank=True)  # collapsed stacks (sample modes)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,393 @@
+"""
+Batch replay of writes queued by the browser while offline.
+
+static/js/offline-sync.js stores diary, note, task and board mutations
+in IndexedDB and posts them here in one request once the connection
+returns:
+
+    {"operations": [
+        {"id": "<idempotency key>", "type": "note", "action": "update",
+         "pk": "<uuid>", "data": {...}, "base_modified_at": "<iso datetime>"},
+        ...
+    ]}
+
+All operations run in one transaction, each inside its own savepoint so
+one bad operation does not roll back the rest. Every outcome is stored
+under its idempotency key, so a batch that is retried after a dropped
+response is answered from the stored results instead of re-applied.
+A row whose modified_at is newer than the base the client edited is
+reported as a conflict together with the server copy. Board moves carry
+no base: like a drag made online, the last one wins.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .autosave import normalize_newlines
+from .models import SyncOperation
+
+MAX_BATCH_OPERATIONS = 200
+
+# How long after midnight an entry queued offline yesterday may still land
+DIARY_GRACE = timedelta(hours=getattr(settings, 'OFFLINE_DIARY_GRACE_HOURS', 6))
+
+
+class OperationError(ValueError):
+    """An operation that can never be applied (bad payload, unknown row)"""
+
+
+class OperationConflict(Exception):
+    """The row changed on the server after the client's base version"""
+
+    def __init__(self, instance):
+        super().__init__('conflict')
+        self.instance = instance
+
+
+def _parse(parser, value, name):
+    """parser(value), with malformed and impossible values (2024-02-30) as OperationError"""
+    try:
+        parsed = parser(value)
+    except (ValueError, TypeError):
+        parsed = None
+    if parsed is None:
+        raise OperationError(f'Invalid {name}')
+    return parsed
+
+
+def _parse_base(op):
+    value = op.get('base_modified_at')
+    if not value:
+        return None
+    parsed = _parse(parse_datetime, value, 'base_modified_at')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _check_conflict(instance, base):
+    if base is not None and instance.modified_at > base:
+        raise OperationConflict(instance)
+
+
+def _get_owned(queryset, op):
+    if not op.get('pk'):
+        raise OperationError('Missing pk')
+    try:
+        instance = queryset.select_for_update().filter(pk=op['pk']).first()
+    except (ValueError, TypeError, ValidationError):
+        raise OperationError('Invalid pk')
+    if instance is None:
+        raise OperationError('Not found')
+    return instance
+
+
+def _serialize_diary(entry):
+    return {
+        'pk': str(entry.pk),
+        'entry_date': entry.entry_date.isoformat(),
+        'content': entry.content,
+        'mood': entry.mood,
+        'mood_note': entry.mood_note,
+        'modified_at': entry.modified_at.isoformat(),
+    }
+
+
+def _serialize_note(note):
+    return {
+        'pk': str(note.pk),
+        'title': note.title,
+        'content': note.content,
+        'tags': [t.name for t in note.tags.all()],
+        'modified_at': note.modified_at.isoformat(),
+    }
+
+
+def _serialize_task(task):
+    return {
+        'pk': str(task.pk),
+        'goal': str(task.goal_id),
+        'title': task.title,
+        'status': task.status,
+        'completion_percentage': task.completion_percentage,
+        'modified_at': task.modified_at.isoformat(),
+    }
+
+
+def _data(op):
+    data = op.get('data')
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise OperationError('data must be an object')
+    return data
+
+
+def _text(data, field):
+    """A string field of data, line breaks normalized; null counts as empty"""
+    value = data[field]
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise OperationError(f'{field} must be a string')
+    return normalize_newlines(value)
+
+
+def _int(data, field):
+    value = data[field]
+    if isinstance(value, bool):
+        raise OperationError(f'Invalid {field}')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise OperationError(f'Invalid {field}')
+
+
+def _tag_names(data):
+    from notes.models import Tag
+
+    names = data['tags'] or []
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise OperationError('tags must be a list of strings')
+    names = [name.strip().lower() for name in names if name.strip()]
+    max_length = Tag._meta.get_field('name').max_length
+    if any(len(name) > max_length for name in names):
+        raise OperationError(f'Tags are at most {max_length} characters')
+    return names
+
+
+def _validate(instance, fields):
+    """
+    Model field validation (choices, max_length, blank) of the fields an
+    operation set, so bad values are this operation's error rather than a
+    database error for the whole batch
+    """
+    exclude = {field.name for field in instance._meta.concrete_fields} - set(fields)
+    try:
+        instance.full_clean(exclude=exclude, validate_unique=False, validate_constraints=False)
+    except ValidationError as e:
+        raise OperationError('; '.join(
+            f"{field}: {' '.join(messages)}" for field, messages in e.message_dict.items()
+        ))
+
+
+def _set_note_tags(note, tag_names):
+    from notes.models import Tag
+    note.tags.clear()
+    for tag_name in tag_names:
+        tag, _ = Tag.objects.get_or_create(name=tag_name)
+        note.tags.add(tag)
+
+
+DIARY_FIELDS = ['content', 'content_html', 'input_method', 'voice_transcript',
+                'handwriting_ocr_text', 'mood_note', 'prompt_used']
+
+
+def apply_diary(user, op):
+    """
+    Upsert the entry for the day it was written.
+    Entries stay same-day only: entry_date must be today, or yesterday during
+    the first DIARY_GRACE of today (an entry written offline late at night).
+    The window is the server's clock; client timestamps are not trusted.
+    """
+    from diary.models import DiaryEntry
+
+    if op.get('action') != 'save':
+        raise OperationError('Diary supports only the save action')
+    data = _data(op)
+    now = timezone.now()
+    today = now.date()
+    entry_date = _parse(parse_date, data['entry_date'], 'entry_date') if data.get('entry_date') else today
+    if not (now - DIARY_GRACE).date() <= entry_date <= today:
+        raise OperationError('Diary entries can only be written for the day they were written')
+
+    base = _parse_base(op)
+    entry = DiaryEntry.objects.select_for_update().filter(user=user, entry_date=entry_date).first()
+    if entry is None:
+        entry = DiaryEntry(user=user, entry_date=entry_date, input_method='type')
+    elif base is None and (entry.content or entry.mood):
+        # Client never saw the server copy; don't overwrite it blindly
+        raise OperationConflict(entry)
+    else:
+        _check_conflict(entry, base)
+
+    changed = [field for field in DIARY_FIELDS if field in data]
+    for field in changed:
+        setattr(entry, field, _text(data, field))
+    if data.get('mood'):
+        entry.mood = _int(data, 'mood')
+        changed.append('mood')
+    _validate(entry, changed)
+    entry.version += 1
+    entry.save()
+    return entry, _serialize_diary(entry)
+
+
+def apply_note(user, op):
+    """Create, update or delete a note"""
+    from notes.models import Note
+
+    action = op.get('action')
+    data = _data(op)
+    changed = [field for field in ('title', 'content') if field in data]
+    tag_names = _tag_names(data) if 'tags' in data else None
+
+    if action == 'create':
+        note = Note(user=user)
+        for field in changed:
+            setattr(note, field, _text(data, field))
+        _validate(note, changed)
+        note.save()
+        _set_note_tags(note, tag_names or [])
+        return note, _serialize_note(note)
+
+    note = _get_owned(Note.objects.filter(user=user), op)
+    _check_conflict(note, _parse_base(op))
+
+    if action == 'delete':
+        note.delete()
+        return None, {'pk': op['pk'], 'deleted': True}
+    if action != 'update':
+        raise OperationError(f'Unknown note action: {action}')
+
+    for field in changed:
+        setattr(note, field, _text(data, field))
+    if 'is_pinned' in data:
+        note.is_pinned = bool(data['is_pinned'])
+    _validate(note, changed)
+    note.version += 1
+    note.save()
+    if tag_names is not None:
+        _set_note_tags(note, tag_names)
+    return note, _serialize_note(note)
+
+
+def apply_task(user, op):
+    """Create, update (status/progress) or delete a task"""
+    from goals.models import Goal, Task
+
+    action = op.get('action')
+    data = _data(op)
+
+    if action == 'create':
+        try:
+            goal = Goal.objects.filter(user=user, pk=data.get('goal')).first()
+        except (ValueError, TypeError, ValidationError):
+            goal = None
+        if goal is None:
+            raise OperationError('Goal not found')
+        if not data.get('title') or not data.get('due_date'):
+            raise OperationError('Task needs a title and due_date')
+        task = Task(
+            goal=goal,
+            title=_text(data, 'title'),
+            description=_text(data, 'description') if 'description' in data else '',
+            department=data.get('department', 'strategy'),
+            due_date=_parse(parse_date, data['due_date'], 'due_date'),
+        )
+        _validate(task, ['title', 'description', 'department', 'due_date'])
+        task.save()
+        return task, _serialize_task(task)
+
+    task = _get_owned(Task.objects.filter(goal__user=user), op)
+    _check_conflict(task, _parse_base(op))
+
+    if action == 'delete':
+        task.delete()
+        return None, {'pk': op['pk'], 'deleted': True}
+    if action != 'update':
+        raise OperationError(f'Unknown task action: {action}')
+
+    changed = []
+    if 'status' in data:
+        task.status = data['status']
+        changed.append('status')
+    if 'completion_percentage' in data:
+        task.completion_percentage = _int(data, 'completion_percentage')
+        if not 0 <= task.completion_percentage <= 100:
+            raise OperationError('completion_percentage must be between 0 and 100')
+    if task.status == 'done':
+        task.completion_percentage = 100
+        task.completed_at = task.completed_at or timezone.now()
+    else:
+        task.completed_at = None
+    if task.status == 'blocked' and 'blocked_reason' in data:
+        task.blocked_reason = _text(data, 'blocked_reason')
+    _validate(task, changed)
+    task.save()
+    return task, _serialize_task(task)
+
+
+def apply_board(user, op):
+    """Replay a batch of kanban moves, as goals.views.board_update does"""
+    from goals.board import apply_moves, BoardError
+
+    if op.get('action') != 'move':
+        raise OperationError('Board supports only the move action')
+    try:
+        return None, apply_moves(user, _data(op).get('moves'))
+    except BoardError as e:
+        raise OperationError(str(e))
+
+
+HANDLERS = {
+    'diary': apply_diary,
+    'note': apply_note,
+    'task': apply_task,
+    'board': apply_board,
+}
+
+CONFLICT_SERIALIZERS = {
+    'diary': _serialize_diary,
+    'note': _serialize_note,
+    'task': _serialize_task,
+}
+
+
+def apply_operation(user, op):
+    """Apply one operation inside a savepoint and return its result dict"""
+    op_type = op.get('type')
+    handler = HANDLERS.get(op_type) if isinstance(op_type, str) else None
+    if handler is None:
+        return {'status': 'error', 'error': f'Unknown type: {op_type}'}
+
+    try:
+        with transaction.atomic():
+            _, record = handler(user, op)
+        return {'status': 'applied', 'record': record}
+    except OperationConflict as conflict:
+        return {'status': 'conflict', 'record': CONFLICT_SERIALIZERS[op_type](conflict.instance)}
+    except OperationError as e:
+        return {'status': 'error', 'error': str(e)}
+
+
+def apply_batch(user, operations):
+    """
+    Apply a batch of queued operations in one transaction.
+    Returns one result per operation, in order, each tagged with its key.
+    """
+    keys = [op.get('id') for op in operations]
+    if any(not isinstance(key, str) or not key or len(key) > 64 for key in keys):
+        raise OperationError('Every operation needs an id (max 64 characters)')
+    if len(set(keys)) != len(keys):
+        raise OperationError('Duplicate operation ids in batch')
+
+    results = []
+    with transaction.atomic():
+        seen = dict(
+            SyncOperation.objects.filter(user=user, key__in=keys).values_list('key', 'result')
+        )
+        records = []
+        for op in operations:
+            key = op['id']
+            if key in seen:
+                results.append(dict(seen[key], id=key, duplicate=True))
+                continue
+            result = apply_operation(user, op)
+            records.append(SyncOperation(user=user, key=key, result=result))
+            results.append(dict(result, id=key))
+        SyncOperation.objects.bulk_create(records)
+
+    return results
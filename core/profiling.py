@@ -0,0 +1,175 @@
+"""
+On-demand request profiling for staff.
+
+A staff user adds ?_profile=<mode> to a URL, or sends an X-Profile: <mode>
+header, and that one request runs under a profiler:
+
+* cprofile   deterministic cProfile; the report holds pstats output
+             sorted by cumulative time
+* sample     a sampling thread records the request thread's stack every
+             PROFILE_SAMPLE_INTERVAL seconds, as collapsed stacks
+* collapsed  like sample, but the response is the collapsed-stack file
+             itself (feed it to flamegraph.pl or speedscope)
+
+Every SQL statement is captured with its duration and the project frames
+that issued it. Reports are stored as ProfileReport rows for the admin.
+The response carries X-Profile-Report with the admin URL.
+
+For everyone else the middleware does one dict lookup per request.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.urls import reverse
+from . import metrics, middleware
+
+MODES = ('cprofile', 'sample', 'collapsed')
+MAX_QUERIES = 2000
+MAX_REPORTS = 100
+STACK_DEPTH = 3
+
+PROJECT_ROOT = str(settings.BASE_DIR)
+SITE_DIRS = ('site-packages', 'dist-packages', f'{os.sep}lib{os.sep}python')
+INSTRUMENTATION_FILES = {__file__, metrics.__file__, middleware.__file__}
+
+
+def _is_project_frame(filename):
+    return filename.startswith(PROJECT_ROOT) and not any(d in filename for d in SITE_DIRS)
+
+
+def _origin():
+    """Innermost project frames of the current stack, outermost first"""
+    frames = [
+        f'{os.path.relpath(frame.filename, PROJECT_ROOT)}:{frame.lineno} {frame.name}'
+        for frame in traceback.extract_stack()[:-3]
+        if _is_project_frame(frame.filename) and frame.filename not in INSTRUMENTATION_FILES
+    ]
+    return frames[-STACK_DEPTH:]
+
+
+class QueryCapture:
+    """connection.execute_wrapper hook recording SQL, duration and origin"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append({
+                    'sql': sql,
+                    'ms': round((time.perf_counter() - start) * 1000, 3),
+                    'origin': _origin(),
+                })
+
+
+class StackSampler:
+    """Samples one thread's stack on a background thread into collapsed-stack counts"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+
+def requested_mode(request):
+    mode = request.GET.get('_profile') or request.headers.get('X-Profile')
+    if not mode:
+        return None
+    mode = 'cprofile' if mode in ('1', 'true') else mode
+    return mode if mode in MODES else None
+
+
+class ProfilingMiddleware:
+    """Profile single requests for staff users on demand (see module docstring)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.interval = getattr(settings, 'PROFILE_SAMPLE_INTERVAL', 0.005)
+
+    def __call__(self, request):
+        if '_profile' not in request.GET and 'X-Profile' not in request.headers:
+            return self.get_response(request)
+        mode = requested_mode(request)
+        user = getattr(request, 'user', None)
+        if mode is None or not (user and user.is_staff):
+            return self.get_response(request)
+        return self.profile(request, mode)
+
+    def profile(self, request, mode):
+        from .models import ProfileReport
+
+        capture = QueryCapture()
+        profiler = stats = sampler = None
+        start = time.perf_counter()
+        with connection.execute_wrapper(capture):
+            if mode == 'cprofile':
+                profiler = cProfile.Profile()
+                response = profiler.runcall(self.get_response, request)
+            else:
+                with StackSampler(threading.get_ident(), self.interval) as sampler:
+                    response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        if profiler is not None:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(80)
+            stats = out.getvalue()
+
+        report = ProfileReport.objects.create(
+            user=request.user,
+            method=request.method,
+            path=request.get_full_path()[:500],
+            mode=mode,
+            status_code=response.status_code,
+            duration_ms=round(duration * 1000, 1),
+            query_count=len(capture.queries),
+            query_ms=round(sum(q['ms'] for q in capture.queries), 1),
+            queries=capture.queries,
+            stats=stats or '',
+            collapsed=sampler.collapsed() if sampler else '',
+        )
+        stale = ProfileReport.objects.order_by('-created_at').values_list('pk', flat=True)[MAX_REPORTS:]
+        ProfileReport.objects.filter(pk__in=list(stale)).delete()
+
+        if mode == 'collapsed':
+            response = HttpResponse(report.collapsed, content_type='text/plain; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="profile-{report.pk}.folded"'
+        response['X-Profile-Report'] = reverse('admin:core_profilereport_change', args=[report.pk])
+        return response
@@ -0,0 +1,201 @@
+"""
+Database query budgets for every page.
+
+Each named URL in the project (admin aside) is rendered with GET as a
+logged-in user over a small, realistic data set, with the cache cleared
+first. The queries it runs are counted and timed. The counts are kept in
+a committed baseline (core/query_budgets.json, URL name -> queries), and a view that runs more
+queries than its baseline is a regression. Pages that answer a GET with
+an error (4xx/5xx: POST-only endpoints, broken pages) get no budget, since
+their count says nothing about the page itself. Queries repeated with
+different literals, the N+1 shape, are grouped so the report can show
+what is behind a high count.
+
+Runs happen under ISOLATED_CACHES (override_settings), so clearing the
+cache between pages, and the invalidations fixtures trigger, never touch
+the shared cache the site is serving from.
+
+Driven by `python manage.py check_query_budgets`, and by core.tests in
+`manage.py test`, which CI runs.
+"""
+import json
+import re
+import time
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from .caching import tiered
+
+# A private in-process cache for measurement runs
+ISOLATED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-budgets'},
+}
+
+BASELINE_PATH = settings.BASE_DIR / 'core' / 'query_budgets.json'
+SKIP_NAMESPACES = {'admin'}
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|\b[0-9a-f]{32}\b")
+
+
+def query_shape(sql):
+    """SQL with literals replaced, so N+1 repeats of one query compare equal"""
+    return _LITERALS.sub('?', sql)
+
+
+def build_fixtures(username='budget_user'):
+    """A user with a few weeks of notes, diary entries, goals, tasks and chat"""
+    from ai_chat.models import AIConversation, AIMessage
+    from diary.models import DiaryEntry
+    from goals.models import Goal, Milestone, Task
+    from notes.models import Note, Tag
+
+    user = User.objects.create_user(username=username, password='budget-password')
+    today = timezone.localdate()
+
+    tags = [Tag.objects.get_or_create(name=name)[0] for name in ('career', 'ideas', 'reading', 'health')]
+    notes = []
+    for i in range(12):
+        note = Note.objects.create(user=user, title=f'Note {i}', content=f'<p>Thoughts on topic {i}</p>')
+        note.tags.set(tags[i % 3:i % 3 + 2])
+        notes.append(note)
+
+    entries = [
+        DiaryEntry.objects.create(
+            user=user,
+            entry_date=today - timedelta(days=i),
+            content=f'Day {i}: worked on the plan and felt fine.',
+            mood=[4, 3, 2][i % 3],
+        )
+        for i in range(14)
+    ]
+
+    goals, tasks = [], []
+    for i, horizon in enumerate(('1year', '3year')):
+        goal = Goal.objects.create(
+            user=user,
+            title=f'Become a marketing lead {i}',
+            role_category='digital_marketing',
+            experience_level='mid',
+            time_horizon=horizon,
+            target_date=today + timedelta(days=365 * (i + 1)),
+        )
+        goals.append(goal)
+        for j in range(8):
+            tasks.append(Task.objects.create(
+                goal=goal,
+                title=f'Task {j}',
+                due_date=today + timedelta(days=7 * j - 7),
+                status=['pending', 'in_progress', 'done', 'blocked'][j % 4],
+                is_weekly=j == 0,
+            ))
+        Milestone.objects.create(goal=goal, title='Q1', target_date=today + timedelta(days=90))
+
+    conversation = AIConversation.objects.create(user=user)
+    for i in range(10):
+        AIMessage.objects.create(conversation=conversation, sender='user' if i % 2 == 0 else 'ai', content=f'Message {i}')
+
+    return {'user': user, 'goal': goals[0], 'task': tasks[1], 'note': notes[0], 'entry': entries[0], 'today': today}
+
+
+# URL name -> kwargs for patterns that take arguments
+def _url_kwargs(fixtures):
+    goal, task, note, entry = fixtures['goal'], fixtures['task'], fixtures['note'], fixtures['entry']
+    by_goal = {'pk': goal.pk}
+    by_task = {'pk': task.pk}
+    by_note = {'pk': note.pk}
+    return {
+        'goal_detail': by_goal, 'goal_edit': by_goal, 'goal_delete': by_goal,
+        'regenerate_ai_tasks': by_goal, 'goal_analytics': by_goal,
+        'task_create': {'goal_pk': goal.pk},
+        'task_update': by_task, 'task_delete': by_task, 'occurrence_update': by_task,
+        'note_detail': by_note, 'note_edit': by_note, 'note_autosave': by_note, 'note_delete': by_note,
+        'diary_write_date': {'date': fixtures['today'].isoformat()},
+        'diary_entry_detail': {'pk': entry.pk},
+        'planet_detail': {'planet': 'sun'},
+    }
+
+
+def iter_url_names(patterns=None, namespace=None):
+    """Yield the name of every URL pattern, namespaced where included under one"""
+    for pattern in patterns if patterns is not None else get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace in SKIP_NAMESPACES:
+                continue
+            inner = ':'.join(filter(None, [namespace, pattern.namespace])) or None
+            yield from iter_url_names(pattern.url_patterns, inner)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield f'{namespace}:{pattern.name}' if namespace else pattern.name
+
+
+def measure(client, path):
+    """Queries, their total time and repeated query shapes for one GET"""
+    tiered.clear()
+    with CaptureQueriesContext(connection) as captured:
+        start = time.perf_counter()
+        response = client.get(path)
+        elapsed = time.perf_counter() - start
+    shapes = Counter(query_shape(query['sql']) for query in captured.captured_queries)
+    return {
+        'path': path,
+        'status': response.status_code,
+        'queries': len(captured.captured_queries),
+        'db_ms': round(sum(float(query['time']) for query in captured.captured_queries) * 1000, 2),
+        'ms': round(elapsed * 1000, 1),
+        'repeated': {shape: count for shape, count in shapes.most_common() if count > 1},
+    }
+
+
+def page_paths(fixtures):
+    """[(url name, path)] for every page, plus the names that could not be reversed"""
+    kwargs = _url_kwargs(fixtures)
+    paths, skipped = [], []
+    for name in iter_url_names():
+        try:
+            paths.append((name, reverse(name, kwargs=kwargs.get(name))))
+        except Exception:
+            skipped.append(name)
+    return paths, skipped
+
+
+def measure_all(fixtures):
+    """{url name: measurement} for every page, plus the names that could not be reversed"""
+    paths, skipped = page_paths(fixtures)
+    # A page that errors still gets a count; its status shows in the report
+    client = Client(raise_request_exception=False)
+    results = {}
+    for name, path in paths:
+        # Fresh login each time, since some pages (logout) end the session
+        client.force_login(fixtures['user'])
+        results[name] = measure(client, path)
+    return results, skipped
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_baseline(results, path=BASELINE_PATH):
+    # Counts only: paths hold fixture ids that change every run
+    baseline = {name: result['queries'] for name, result in results.items() if result['status'] < 400}
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def over_budget(results, baseline, tolerance=0):
+    """[(name, queries, budget)] for pages over their baseline count"""
+    return [
+        (name, result['queries'], baseline[name])
+        for name, result in sorted(results.items())
+        if name in baseline and result['queries'] > baseline[name] + tolerance
+    ]
@@ -0,0 +1,152 @@
+"""
+Limits on outbound Gemini calls.
+
+Three gates stand in front of every call:
+
+* a per-user token bucket, so one user's burst cannot spend everybody's
+  quota (GEMINI_USER_RATE_PER_MINUTE / GEMINI_USER_BURST)
+* a global token bucket shared by all gunicorn workers through the
+  RateLimitBucket table (GEMINI_RATE_PER_MINUTE / GEMINI_BURST)
+* a per-process semaphore capping in-flight calls, so upstream I/O
+  cannot pin every thread of a worker (GEMINI_MAX_CONCURRENT_CALLS)
+
+Taking a token is a single conditional UPDATE that refills and spends in
+one statement, so it is atomic across workers without row locks. A
+caller waits for a token or a slot only until its deadline; after that
+it gets RateLimited and should answer with its fallback right away.
+
+    try:
+        with gemini_slot(user_id=user.pk, deadline=2):
+            response = gemini_model.generate_content(prompt)
+    except RateLimited:
+        return fallback()
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Least
+from .models import RateLimitBucket
+
+logger = logging.getLogger('core')
+
+GLOBAL_BUCKET = 'gemini'
+MAX_WAIT_STEP = 0.25  # seconds between retries while queued
+
+
+class RateLimited(Exception):
+    """No token or call slot became free before the caller's deadline"""
+
+
+def _settings():
+    return {
+        'concurrency': getattr(settings, 'GEMINI_MAX_CONCURRENT_CALLS', 4),
+        'rate': getattr(settings, 'GEMINI_RATE_PER_MINUTE', 30) / 60.0,
+        'burst': getattr(settings, 'GEMINI_BURST', 10),
+        'user_rate': getattr(settings, 'GEMINI_USER_RATE_PER_MINUTE', 10) / 60.0,
+        'user_burst': getattr(settings, 'GEMINI_USER_BURST', 4),
+    }
+
+
+def take_token(key, rate, burst, now=None):
+    """
+    Try to spend one token from a bucket.
+    Returns 0 on success, otherwise the seconds until a token is due.
+    """
+    now = time.time() if now is None else now
+    refilled = Least(Value(float(burst)), F('tokens') + (Value(now) - F('updated_at')) * Value(rate))
+    updated = RateLimitBucket.objects.filter(
+        key=key,
+        tokens__gte=Value(1.0) - (Value(now) - F('updated_at')) * Value(rate),
+    ).update(tokens=refilled - Value(1.0), updated_at=Value(now))
+    if updated:
+        return 0
+
+    bucket = RateLimitBucket.objects.filter(key=key).values('tokens', 'updated_at').first()
+    if bucket is None:
+        try:
+            with transaction.atomic():
+                RateLimitBucket.objects.create(key=key, tokens=burst - 1, updated_at=now)
+            return 0
+        except IntegrityError:
+            # Another worker created it first
+            return take_token(key, rate, burst, now)
+
+    tokens = min(burst, bucket['tokens'] + (now - bucket['updated_at']) * rate)
+    return max((1 - tokens) / rate, 0.01) if rate > 0 else float('inf')
+
+
+def refund_token(key, burst):
+    """Give back a token taken for a call that never happened"""
+    RateLimitBucket.objects.filter(key=key).update(
+        tokens=Least(Value(float(burst)), F('tokens') + Value(1.0))
+    )
+
+
+class _ProcessSlots:
+    """Semaphore for in-flight calls in this process, sized from settings on first use"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._semaphore = None
+
+    @property
+    def semaphore(self):
+        if self._semaphore is None:
+            with self._lock:
+                if self._semaphore is None:
+                    self._semaphore = threading.BoundedSemaphore(_settings()['concurrency'])
+        return self._semaphore
+
+
+_slots = _ProcessSlots()
+
+
+def _wait_for_token(key, rate, burst, deadline_at):
+    while True:
+        wait = take_token(key, rate, burst)
+        if wait == 0:
+            return True
+        remaining = deadline_at - time.monotonic()
+        if wait > remaining:
+            # The next token comes after the deadline; don't queue for nothing
+            return False
+        time.sleep(min(wait, MAX_WAIT_STEP, remaining))
+
+
+@contextmanager
+def gemini_slot(user_id=None, deadline=2.0):
+    """
+    Hold a Gemini call slot for the duration of the block.
+    Raises RateLimited if the user's bucket, the shared bucket or this
+    process's concurrency cap doesn't admit the call within `deadline` seconds.
+    """
+    config = _settings()
+    deadline_at = time.monotonic() + deadline
+    user_key = f'gemini:user:{user_id}' if user_id is not None else None
+
+    # A user over their own limit is refused at once rather than queued
+    if user_key and take_token(user_key, config['user_rate'], config['user_burst']) != 0:
+        raise RateLimited(f'user {user_id} is over the Gemini rate limit')
+
+    if not _wait_for_token(GLOBAL_BUCKET, config['rate'], config['burst'], deadline_at):
+        if user_key:
+            refund_token(user_key, config['user_burst'])
+        logger.warning('Gemini shared rate limit reached; serving fallback')
+        raise RateLimited('shared Gemini rate limit reached')
+
+    remaining = max(deadline_at - time.monotonic(), 0)
+    if not _slots.semaphore.acquire(timeout=remaining):
+        refund_token(GLOBAL_BUCKET, config['burst'])
+        if user_key:
+            refund_token(user_key, config['user_burst'])
+        logger.warning('All Gemini call slots busy in this worker; serving fallback')
+        raise RateLimited('no free Gemini call slot')
+
+    try:
+        yield
+    finally:
+        _slots.semaphore.release()
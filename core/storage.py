@@ -0,0 +1,57 @@
+"""
+Static files storage that also writes the service worker's precache manifest.
+
+After WhiteNoise hashes and compresses the collected files, the hashed
+names of the files matching PWA_PRECACHE_PATTERNS are written to
+precache-manifest.js, which sw.js imports. Because each URL carries its
+content hash, the worker only downloads the assets that changed in a
+deploy, and the manifest's bytes change exactly when an asset does,
+which is what triggers the browser's service worker update.
+"""
+import hashlib
+import json
+from fnmatch import fnmatch
+from urllib.parse import quote, urljoin
+from django.conf import settings
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+PRECACHE_MANIFEST_NAME = 'precache-manifest.js'
+
+
+class PrecacheManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+        if not kwargs.get('dry_run'):
+            self.save_precache_manifest()
+
+    def get_precache_entries(self):
+        """Return [{url, revision}] for every hashed file the worker should precache"""
+        patterns = getattr(settings, 'PWA_PRECACHE_PATTERNS', ['css/*', 'js/*'])
+        exclude = getattr(settings, 'PWA_PRECACHE_EXCLUDE', ['js/sw.js'])
+
+        entries = []
+        for name, hashed_name in sorted(self.hashed_files.items()):
+            if name == PRECACHE_MANIFEST_NAME or name.endswith('.map'):
+                continue
+            if not any(fnmatch(name, p) for p in patterns) or any(fnmatch(name, p) for p in exclude):
+                continue
+            revision = hashed_name.rsplit('.', 2)[-2] if hashed_name.count('.') >= 2 else hashed_name
+            entries.append({
+                'url': urljoin(self.base_url, quote(hashed_name)),
+                'revision': revision,
+            })
+        return entries
+
+    def save_precache_manifest(self):
+        entries = self.get_precache_entries()
+        version = hashlib.md5(json.dumps(entries, sort_keys=True).encode()).hexdigest()[:12]
+        manifest = {'version': version, 'entries': entries}
+        content = (
+            '// Generated by collectstatic (core.storage) - do not edit\n'
+            f'self.__PRECACHE_MANIFEST = {json.dumps(manifest, indent=2)};\n'
+        )
+        if self.exists(PRECACHE_MANIFEST_NAME):
+            self.delete(PRECACHE_MANIFEST_NAME)
+        self._save(PRECACHE_MANIFEST_NAME, ContentFile(content.encode()))
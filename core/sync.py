@@ -0,0 +1,185 @@
+"""
+Delta sync for the PWA: a per-user change log fed by model signals.
+
+Every save or delete of a synced model writes a ChangeLog row. Older rows
+for the same object are dropped on write, so the log holds at most one row
+per object (deletes stay as tombstones) and a client that was away for a
+week reads only the objects that changed.
+
+The cursor must only ever become visible in increasing order, or a client
+that has read past a value misses the rows committed below it later. On
+SQLite writers take turns, so the auto-increment id will do. On PostgreSQL
+ids are handed out at insert but appear at commit, so a long transaction
+(a status sweep, an offline batch) could commit a lower id after a client
+has moved on; there the cursor is seq, numbered at commit in commit order
+(migration core 0006). Until its transaction commits a row has no seq and
+is not served.
+"""
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from .models import ChangeLog
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+
+# kind -> (model label, path from the model to its owning user id, synced fields)
+SYNC_MODELS = {
+    'note': ('notes.Note', 'user_id',
+             ['id', 'title', 'content', 'is_pinned', 'created_at', 'modified_at']),
+    'diary': ('diary.DiaryEntry', 'user_id',
+              ['id', 'entry_date', 'content', 'content_html', 'input_method',
+               'mood', 'mood_note', 'prompt_used', 'created_at', 'modified_at']),
+    'goal': ('goals.Goal', 'user_id',
+             ['id', 'title', 'description', 'role_category', 'experience_level',
+              'time_horizon', 'target_date', 'status', 'completion_percentage',
+              'created_at', 'modified_at']),
+    'task': ('goals.Task', 'goal__user_id',
+             ['id', 'goal_id', 'department', 'title', 'description', 'due_date',
+              'status', 'completion_percentage', 'board_position', 'is_daily', 'is_weekly',
+              'is_monthly', 'is_quarterly', 'completed_at', 'created_at', 'modified_at']),
+    'milestone': ('goals.Milestone', 'goal__user_id',
+                  ['id', 'goal_id', 'title', 'description', 'target_date',
+                   'is_achieved', 'achieved_at']),
+    'task_occurrence': ('goals.TaskOccurrence', 'task__goal__user_id',
+                        ['id', 'task_id', 'date', 'status', 'moved_to',
+                         'completed_at', 'modified_at']),
+    'ai_message': ('ai_chat.AIMessage', 'conversation__user_id',
+                   ['id', 'conversation_id', 'sender', 'content', 'timestamp']),
+}
+
+
+def get_owner_id(instance, kind):
+    """Resolve the owning user id, following FKs already cached on the instance"""
+    path = SYNC_MODELS[kind][1]
+    obj = instance
+    *relations, attr = path.split('__')
+    for relation in relations:
+        obj = getattr(obj, relation)
+    return getattr(obj, attr)
+
+
+def record_change(kind, instance, action):
+    """Append a change for one object, replacing any older row for it"""
+    try:
+        user_id = get_owner_id(instance, kind)
+    except Exception:
+        # Parent already gone (cascade) - the parent's own tombstone covers it
+        return
+    object_pk = str(instance.pk)
+    ChangeLog.objects.filter(user_id=user_id, kind=kind, object_pk=object_pk).delete()
+    ChangeLog.objects.create(user_id=user_id, kind=kind, object_pk=object_pk, action=action)
+
+
+def record_changes(kind, rows, action='update', batch_size=500):
+    """
+    Record changes for rows updated in bulk (queryset.update() sends no
+    signals). rows is a list of (user_id, object pk) pairs.
+    """
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        ChangeLog.objects.filter(
+            user_id__in={user_id for user_id, _ in batch},
+            kind=kind,
+            object_pk__in=[str(pk) for _, pk in batch],
+        ).delete()
+        ChangeLog.objects.bulk_create([
+            ChangeLog(user_id=user_id, kind=kind, object_pk=str(pk), action=action)
+            for user_id, pk in batch
+        ])
+
+
+def _make_receivers(kind):
+    def on_save(sender, instance, created, raw=False, **kwargs):
+        if not raw:
+            record_change(kind, instance, 'create' if created else 'update')
+
+    def on_delete(sender, instance, origin=None, **kwargs):
+        # Deleting the account drops its whole change log; don't write tombstones into it
+        if getattr(origin, 'model', type(origin)) is User:
+            return
+        record_change(kind, instance, 'delete')
+
+    return on_save, on_delete
+
+
+def _on_note_tags_changed(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        record_change('note', instance, 'update')
+
+
+def connect_signals():
+    """Hook the change log up to every synced model (called from CoreConfig.ready)"""
+    for kind, (label, _, _) in SYNC_MODELS.items():
+        on_save, on_delete = _make_receivers(kind)
+        model = apps.get_model(label)
+        post_save.connect(on_save, sender=model, weak=False, dispatch_uid=f'changelog_save_{kind}')
+        post_delete.connect(on_delete, sender=model, weak=False, dispatch_uid=f'changelog_delete_{kind}')
+
+    Note = apps.get_model('notes.Note')
+    m2m_changed.connect(_on_note_tags_changed, sender=Note.tags.through, dispatch_uid='changelog_note_tags')
+
+
+def _fetch_records(user, kind, pks):
+    label, user_path, fields = SYNC_MODELS[kind]
+    model = apps.get_model(label)
+    rows = model.objects.filter(pk__in=pks, **{user_path: user.pk}).values(*fields)
+    records = {str(row['id']): row for row in rows}
+
+    if kind == 'note' and records:
+        for row in records.values():
+            row['tags'] = []
+        through = model.tags.through.objects.filter(note_id__in=list(records))
+        for note_id, tag_name in through.values_list('note_id', 'tag__name'):
+            records[str(note_id)]['tags'].append(tag_name)
+
+    return records
+
+
+def cursor_field():
+    """The ChangeLog column that orders the feed (see the module docstring)"""
+    return 'seq' if connection.vendor == 'postgresql' else 'id'
+
+
+def get_changes(user, since=0, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return changes after the cursor, one keyset page at a time.
+    Objects appear once, in their current state; rows that no longer exist
+    are reported as deleted. Clients should upsert both created and updated
+    records, since compaction can turn a create into a later update.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    cursor = cursor_field()
+    page = list(
+        ChangeLog.objects.filter(user=user, **{f'{cursor}__gt': since})
+        .order_by(cursor)
+        .values_list(cursor, 'kind', 'object_pk', 'action')[:limit + 1]
+    )
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    latest = {}
+    for change_id, kind, object_pk, action in page:
+        created = action == 'create' or latest.get((kind, object_pk)) == 'create'
+        latest[(kind, object_pk)] = 'create' if created and action != 'delete' else action
+
+    changes = {kind: {'created': [], 'updated': [], 'deleted': []} for kind in SYNC_MODELS}
+    for kind in SYNC_MODELS:
+        live = [pk for (k, pk), action in latest.items() if k == kind and action != 'delete']
+        records = _fetch_records(user, kind, live) if live else {}
+        for (k, pk), action in latest.items():
+            if k != kind:
+                continue
+            if action == 'delete' or pk not in records:
+                changes[kind]['deleted'].append(pk)
+            elif action == 'create':
+                changes[kind]['created'].append(records[pk])
+            else:
+                changes[kind]['updated'].append(records[pk])
+
+    return {
+        'changes': {kind: c for kind, c in changes.items() if any(c.values())},
+        'cursor': page[-1][0] if page else since,
+        'has_more': has_more,
+    }
@@ -1,3 +1,118 @@
-from django.test import TestCase
+import json
+from datetime import date
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from goals.models import Goal, Task
+from notes.models import Note
+from core import query_budgets
 
-# Create your tests here.
+
+# Plain static storage: the manifest one needs collectstatic once DEBUG is off
+@override_settings(
+    CACHES=query_budgets.ISOLATED_CACHES,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+)
+class QueryBudgetTests(TransactionTestCase):
+    """
+    Every page against core/query_budgets.json, as check_query_budgets does.
+    TransactionTestCase so views' atomic blocks are not counted as savepoints.
+    """
+
+    def test_pages_match_their_query_budgets(self):
+        # Rendering every page is the slow part, so it happens once for all checks
+        baseline = query_budgets.load_baseline()
+        results, _ = query_budgets.measure_all(query_budgets.build_fixtures())
+
+        with self.subTest('within budget'):
+            failures = query_budgets.over_budget(results, baseline)
+            self.assertEqual(failures, [], 'Pages over their query budget: (name, queries, budget)')
+
+        with self.subTest('budgeted pages render'):
+            broken = {
+                name: result['status'] for name, result in results.items()
+                if name in baseline and result['status'] >= 400
+            }
+            self.assertEqual(broken, {}, 'Budgeted pages returning errors; fix them or drop their budget')
+
+        with self.subTest('working pages have a budget'):
+            missing = [name for name, result in results.items() if result['status'] < 400 and name not in baseline]
+            self.assertEqual(missing, [], 'Pages without a budget; run check_query_budgets --update')
+
+
+class OfflineBoardSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planner', password='pw')
+        self.client.force_login(self.user)
+        goal = Goal.objects.create(user=self.user, title='Launch', target_date=date(2030, 1, 1))
+        self.task = Task.objects.create(goal=goal, title='Draft', due_date=date(2030, 1, 1))
+
+    def sync(self, *operations):
+        response = self.client.post(reverse('offline_sync'), json.dumps({'operations': list(operations)}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_queued_board_moves_are_replayed(self):
+        [result] = self.sync({'id': 'move-1', 'type': 'board', 'action': 'move',
+                              'data': {'moves': [{'id': str(self.task.pk), 'status': 'done', 'position': 0}]}})
+
+        self.assertEqual(result['status'], 'applied')
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'done')
+        self.assertEqual(self.task.completion_percentage, 100)
+
+    def test_malformed_board_moves_are_an_error_for_that_operation_only(self):
+        results = self.sync(
+            {'id': 'move-1', 'type': 'board', 'action': 'move', 'data': {'moves': [{'id': 'nope'}]}},
+            {'id': 'move-2', 'type': 'board', 'action': 'move',
+             'data': {'moves': [{'id': str(self.task.pk), 'status': 'in_progress'}]}},
+        )
+
+        self.assertEqual([r['status'] for r in results], ['error', 'applied'])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'in_progress')
+
+
+class OfflineSyncValidationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('writer', password='pw')
+        self.client.force_login(self.user)
+        self.note = Note.objects.create(user=self.user, title='Plan', content='')
+
+    def sync(self, *operations):
+        response = self.client.post(reverse('offline_sync'), json.dumps({'operations': list(operations)}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def update(self, key, data):
+        return {'id': key, 'type': 'note', 'action': 'update', 'pk': str(self.note.pk), 'data': data}
+
+    def test_malformed_operations_fail_alone(self):
+        results = self.sync(
+            self.update('tags', {'tags': [1]}),
+            self.update('list', ['title']),
+            {'id': 'type', 'type': ['note'], 'action': 'create'},
+            self.update('title', {'title': 'x' * 201}),
+            {'id': 'mood', 'type': 'diary', 'action': 'save', 'data': {'mood': 99}},
+            self.update('good', {'title': 'Plan B'}),
+        )
+
+        self.assertEqual([r['status'] for r in results], ['error'] * 5 + ['applied'])
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.title, 'Plan B')
+
+    def test_invalid_task_values_are_rejected(self):
+        goal = Goal.objects.create(user=self.user, title='Launch', target_date=date(2030, 1, 1))
+        task = Task.objects.create(goal=goal, title='Draft', due_date=date(2030, 1, 1))
+
+        results = self.sync(
+            {'id': 'status', 'type': 'task', 'action': 'update', 'pk': str(task.pk), 'data': {'status': 'nope'}},
+            {'id': 'percent', 'type': 'task', 'action': 'update', 'pk': str(task.pk),
+             'data': {'completion_percentage': 250}},
+        )
+
+        self.assertEqual([r['status'] for r in results], ['error', 'error'])
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.completion_percentage), ('pending', 0))
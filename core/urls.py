@@ -15,6 +15,18 @@ urlpatterns = [
     # Birthday API
     path('api/birthday-seen/', views.birthday_seen, name='birthday_seen'),
     
+    # Offline write replay
+    path('api/offline-sync/', views.offline_sync, name='offline_sync'),
+    
+    # Delta sync for the PWA caches
+    path('api/sync/', views.sync_changes, name='sync_changes'),
+    
+    # Service worker (served from the root for full scope)
+    path('sw.js', views.service_worker, name='service_worker'),
+    
     # Health check for Railway deployment
     path('health/', views.health_check, name='health_check'),
+    
+    # Prometheus scrape target (request timing histograms)
+    path('metrics', views.metrics, name='metrics'),
 ]
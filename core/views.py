@@ -1,16 +1,23 @@
 import random
 import hashlib
+import hmac
+import json
 from datetime import datetime
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, HttpResponse, Http404
+from django.contrib.staticfiles import finders
 from django.views.decorators.http import require_POST
 from django.contrib.auth.forms import PasswordChangeForm
 from django.utils import timezone
 import pytz
+from .dashboard import dashboard_counts
 from .models import DailyThought, UserProfile
+from .offline_sync import MAX_BATCH_OPERATIONS, OperationError, apply_batch
+from .sync import DEFAULT_PAGE_SIZE, get_changes
 
 
 def get_daily_content():
@@ -136,15 +143,8 @@ def logout_view(request):
 @login_required
 def dashboard(request):
     """Main dashboard with navigation to all modules"""
-    from notes.models import Note
-    from diary.models import DiaryEntry
-    from goals.models import Goal, Task
-    from datetime import datetime
-    
-    recent_notes = Note.objects.filter(user=request.user).count()
-    recent_diary = DiaryEntry.objects.filter(user=request.user).count()
-    active_goals = Goal.objects.filter(user=request.user, status='active').count()
-    pending_tasks = Task.objects.filter(goal__user=request.user, status='pending').count()
+    # Note, diary, goal and task counts, cached until one of them changes
+    counts = dashboard_counts(request.user.pk)
     
     # Check if today is February 6 (Jayti's Birthday) in Indian Standard Time (IST)
     # Using IST ensures the birthday message appears at midnight India time, not UTC
@@ -160,10 +160,7 @@ def dashboard(request):
     show_vivek_message = is_birthday
     
     context = {
-        'recent_notes': recent_notes,
-        'recent_diary': recent_diary,
-        'active_goals': active_goals,
-        'pending_tasks': pending_tasks,
+        **counts,
         'show_vivek_message': show_vivek_message,
         'is_birthday': is_birthday,
         'jayti_age': jayti_age,
@@ -219,13 +216,81 @@ def birthday_seen(request):
         return JsonResponse({'success': False}, status=400)
 
 
+@login_required
+@require_POST
+def offline_sync(request):
+    """Replay a batch of writes queued while offline (JSON)"""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not all(isinstance(op, dict) for op in operations):
+        return JsonResponse({'error': 'operations must be a list of objects'}, status=400)
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return JsonResponse({'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'}, status=400)
+    
+    try:
+        results = apply_batch(request.user, operations)
+    except OperationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({'results': results})
+
+
+@login_required
+def sync_changes(request):
+    """Delta sync: records created, updated or deleted after ?since=<cursor> (JSON)"""
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'since and limit must be integers'}, status=400)
+    
+    return JsonResponse(get_changes(request.user, since=since, limit=limit))
+
+
+def service_worker(request):
+    """
+    Serve static/js/sw.js from the site root so its scope covers every page.
+    The worker itself stays uncached; the assets it precaches are versioned
+    by precache-manifest.js.
+    """
+    path = finders.find('js/sw.js')
+    if not path:
+        raise Http404('Service worker not found')
+    with open(path, 'rb') as f:
+        response = HttpResponse(f.read(), content_type='application/javascript')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
 def health_check(request):
     """
     Health check endpoint for Railway deployment.
     Simple check - returns 200 OK if Django is running.
     """
+    from .llm import gemini_breaker
     return JsonResponse({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'message': 'Django is running'
+        'message': 'Django is running',
+        'gemini_circuit': gemini_breaker.state(),
     }, status=200)
+
+
+def metrics(request):
+    """
+    Request timing histograms for Prometheus (text exposition format).
+    Served to "Authorization: Bearer <METRICS_TOKEN>" or a staff session.
+    """
+    from .metrics import render_metrics
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    # Constant-time, so response timing does not leak how much of a guess matched
+    authorized = token and hmac.compare_digest(
+        request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()
+    )
+    if not (authorized or request.user.is_staff):
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('diary', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiaryPrompt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question', models.CharField(max_length=300)),
+                ('category', models.CharField(choices=[('self_awareness', 'Self-Awareness'), ('relationships', 'Relationships'), ('professional', 'Professional Growth'), ('gratitude', 'Gratitude'), ('challenges', 'Challenge Processing'), ('general', 'General')], max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Diary Prompts',
+            },
+        ),
+        migrations.CreateModel(
+            name='MoodSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('avg_mood', models.FloatField()),
+                ('entry_count', models.IntegerField()),
+                ('dominant_theme', models.CharField(blank=True, max_length=100)),
+            ],
+            options={
+                'verbose_name_plural': 'Mood Summaries',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='diaryentry',
+            options={'ordering': ['-entry_date'], 'verbose_name_plural': 'Diary Entries'},
+        ),
+        migrations.AlterUniqueTogether(
+            name='diaryentry',
+            unique_together={('user', 'entry_date')},
+        ),
+        migrations.AddIndex(
+            model_name='diaryentry',
+            index=models.Index(fields=['user', '-entry_date'], name='diary_diary_user_id_3e0a8b_idx'),
+        ),
+        migrations.AddField(
+            model_name='moodsummary',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mood_summaries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='moodsummary',
+            unique_together={('user', 'week_start')},
+        ),
+    ]
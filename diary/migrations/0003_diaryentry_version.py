@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diary', '0002_prompts_and_mood_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diaryentry',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
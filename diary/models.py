@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 import uuid
 
 
@@ -47,6 +49,9 @@ class DiaryEntry(models.Model):
     # Prompt response
     prompt_used = models.CharField(max_length=300, blank=True)
     
+    # Bumped on every save; autosave patches must name the version they edit
+    version = models.PositiveIntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
     
@@ -89,6 +94,12 @@ class DiaryPrompt(models.Model):
         return self.question[:50]
 
 
+@receiver([post_save, post_delete], sender=DiaryPrompt)
+def invalidate_prompt_rotation(sender, **kwargs):
+    from .prompts import invalidate_active_prompts
+    invalidate_active_prompts()
+
+
 class MoodSummary(models.Model):
     """Aggregated mood data for analytics"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mood_summaries')
@@ -0,0 +1,79 @@
+"""
+Daily reflection prompt rotation.
+
+Active prompt ids are cached so the write page never loads the whole
+DiaryPrompt table. Each user walks a deterministic cycle through the
+prompts, one per day, with categories interleaved so consecutive days
+rotate between themes and no prompt repeats until the cycle wraps.
+"""
+import hashlib
+import random
+from core.caching import tiered
+from .models import DiaryPrompt
+
+ACTIVE_PROMPTS_CACHE_KEY = 'diary:active_prompt_ids'
+ACTIVE_PROMPTS_CACHE_TIMEOUT = 60 * 60  # 1 hour
+
+
+def get_active_prompt_ids():
+    """Return cached (id, category) pairs for every active prompt"""
+    return tiered.get_or_compute(
+        ACTIVE_PROMPTS_CACHE_KEY,
+        lambda: list(DiaryPrompt.objects.filter(is_active=True).order_by('pk').values_list('pk', 'category')),
+        timeout=ACTIVE_PROMPTS_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_active_prompts():
+    """Drop the cached prompt ids (called when a prompt is saved or deleted)"""
+    tiered.delete(ACTIVE_PROMPTS_CACHE_KEY)
+
+
+def build_rotation(user_id, prompt_ids):
+    """
+    Build a user's prompt cycle.
+    Prompts are shuffled within their category with a per-user seed and the
+    categories are then interleaved round-robin, so the same category does
+    not come up on consecutive days while others still have prompts left.
+    """
+    seed = int(hashlib.md5(str(user_id).encode()).hexdigest(), 16)
+    rng = random.Random(seed)
+
+    by_category = {}
+    for pk, category in prompt_ids:
+        by_category.setdefault(category, []).append(pk)
+
+    categories = sorted(by_category)
+    rng.shuffle(categories)
+    queues = []
+    for category in categories:
+        queue = by_category[category]
+        rng.shuffle(queue)
+        queues.append(queue)
+
+    rotation = []
+    for i in range(max((len(q) for q in queues), default=0)):
+        for queue in queues:
+            if i < len(queue):
+                rotation.append(queue[i])
+    return rotation
+
+
+def get_daily_prompt_id(user, day):
+    """Pick the prompt id for a user on a given day, or None if there are no prompts"""
+    rotation = build_rotation(user.pk, get_active_prompt_ids())
+    if not rotation:
+        return None
+    return rotation[day.toordinal() % len(rotation)]
+
+
+def get_daily_prompt(user, day):
+    """Return the DiaryPrompt for a user on a given day, fetching only that row"""
+    prompt_id = get_daily_prompt_id(user, day)
+    if prompt_id is None:
+        return None
+    prompt = DiaryPrompt.objects.filter(pk=prompt_id, is_active=True).first()
+    if prompt is None:
+        # Cached ids are stale (prompt removed in another worker)
+        invalidate_active_prompts()
+    return prompt
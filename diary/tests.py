@@ -1,3 +1,48 @@
+import json
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from core.autosave import autosave_instance
+from .models import DiaryEntry
 
-# Create your tests here.
+
+class DiaryAutosaveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('writer', password='pw')
+        self.client.force_login(self.user)
+
+    def test_patch_after_form_save_applies_to_multiline_text(self):
+        self.client.post(reverse('diary_write'), {
+            'input_method': 'type',
+            'content': 'Morning walk.\r\nCalled mum.\r\nEarly night.',
+        })
+        entry = DiaryEntry.objects.get(user=self.user, entry_date=timezone.now().date())
+        self.assertEqual(entry.content, 'Morning walk.\nCalled mum.\nEarly night.')
+
+        # Replace 'Called mum.' as counted in the browser's LF textarea
+        response = self.client.patch(
+            reverse('diary_autosave'),
+            json.dumps({'version': entry.version, 'patches': {'content': [[14, 11, 'Called dad.']]}}),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        entry.refresh_from_db()
+        self.assertEqual(entry.content, 'Morning walk.\nCalled dad.\nEarly night.')
+
+    def test_first_save_racing_another_returns_a_conflict(self):
+        today = timezone.now().date()
+
+        def create():
+            # The other tab's first save lands between our lookup and insert
+            DiaryEntry.objects.create(user=self.user, entry_date=today, content='From the other tab', version=1)
+            return DiaryEntry(user=self.user, entry_date=today, input_method='type')
+
+        response = autosave_instance(
+            DiaryEntry.objects.all(), {'user': self.user, 'entry_date': today}, 0,
+            {'content': [[0, 0, 'Mine']]}, fields=['content'], create=create,
+        )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.content)['fields'], {'content': 'From the other tab'})
@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.diary_overview, name='diary_overview'),
     path('write/', views.diary_write, name='diary_write'),
+    path('write/autosave/', views.diary_autosave, name='diary_autosave'),
     path('write/<str:date>/', views.diary_write, name='diary_write_date'),
     path('entry/<uuid:pk>/', views.diary_entry_detail, name='diary_entry_detail'),
     path('calendar/', views.diary_calendar, name='diary_calendar'),
@@ -3,11 +3,12 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponseForbidden
 from django.utils import timezone
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_http_methods
 from datetime import datetime, timedelta
 import json
-import random
-from .models import DiaryEntry, DiaryPrompt
+from core.autosave import PatchError, normalize_newlines, parse_autosave_request, autosave_instance
+from .models import DiaryEntry
+from .prompts import get_daily_prompt
 
 
 @login_required
@@ -69,19 +70,12 @@ def diary_write(request, date=None):
         messages.error(request, 'You can only write diary entries for today. Past entries are read-only.')
         return redirect('diary_overview')
     
-    # Get or create entry
-    entry, created = DiaryEntry.objects.get_or_create(
-        user=request.user,
-        entry_date=today,
-        defaults={'input_method': 'type'}
-    )
-    
-    # Get random prompt
-    prompts = DiaryPrompt.objects.filter(is_active=True)
-    if prompts:
-        daily_prompt = random.choice(prompts)
-    else:
-        daily_prompt = None
+    # Entry rows are only created on the first real save, so browsing
+    # the write page never writes to the database
+    entry = DiaryEntry.objects.filter(user=request.user, entry_date=today).first()
+    is_new_entry = entry is None
+    if is_new_entry:
+        entry = DiaryEntry(user=request.user, entry_date=today, input_method='type')
     
     if request.method == 'POST':
         # Handle different input methods
@@ -89,41 +83,63 @@ def diary_write(request, date=None):
         entry.input_method = input_method
         
         if input_method == 'type':
-            entry.content = request.POST.get('content', '')
-            entry.content_html = request.POST.get('content_html', '')
+            entry.content = normalize_newlines(request.POST.get('content', ''))
+            entry.content_html = normalize_newlines(request.POST.get('content_html', ''))
         elif input_method == 'voice':
-            entry.voice_transcript = request.POST.get('voice_transcript', '')
+            entry.voice_transcript = normalize_newlines(request.POST.get('voice_transcript', ''))
             entry.content = entry.voice_transcript
             if request.POST.get('voice_duration'):
                 entry.voice_duration = int(request.POST.get('voice_duration'))
         elif input_method == 'stylus':
             entry.handwriting_strokes = json.loads(request.POST.get('handwriting_strokes', '[]'))
-            entry.handwriting_ocr_text = request.POST.get('handwriting_ocr_text', '')
+            entry.handwriting_ocr_text = normalize_newlines(request.POST.get('handwriting_ocr_text', ''))
             entry.content = entry.handwriting_ocr_text
         
         # Mood tracking
         mood = request.POST.get('mood')
         if mood:
             entry.mood = int(mood)
-        entry.mood_note = request.POST.get('mood_note', '')
+        entry.mood_note = normalize_newlines(request.POST.get('mood_note', ''))
         
         # Prompt
         if request.POST.get('prompt_used'):
             entry.prompt_used = request.POST.get('prompt_used')
         
+        entry.version += 1
         entry.save()
         messages.success(request, 'Diary entry saved. Thank you for taking this time for yourself.')
         return redirect('diary_entry_detail', pk=entry.pk)
     
     context = {
         'entry': entry,
+        'is_new_entry': is_new_entry,
         'today': today,
-        'daily_prompt': daily_prompt,
+        'daily_prompt': get_daily_prompt(request.user, today),
         'is_editable': True,
     }
     return render(request, 'diary/diary_write.html', context)
 
 
+@login_required
+@require_http_methods(['PATCH'])
+def diary_autosave(request):
+    """Apply debounced editor patches to today's entry (JSON)"""
+    today = timezone.now().date()
+    try:
+        base_version, patches = parse_autosave_request(request)
+    except PatchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return autosave_instance(
+        DiaryEntry.objects.all(),
+        {'user': request.user, 'entry_date': today},
+        base_version,
+        patches,
+        fields=['content', 'content_html', 'mood_note'],
+        create=lambda: DiaryEntry(user=request.user, entry_date=today, input_method='type'),
+    )
+
+
 @login_required
 def diary_entry_detail(request, pk):
     """View a diary entry"""
@@ -0,0 +1,137 @@
+"""
+Goal progress over time: burndown, velocity and forecast.
+
+For each goal, a daily series runs from the day the goal (or its first task)
+was created up to today. It holds the number of tasks that existed and
+the number done by each day, taken from Task.created_at and, for tasks
+whose status is done, completed_at (the same tasks Goal.completion_percentage
+counts).
+The running totals come from a COUNT(*) OVER (ORDER BY day) window over
+the goal's tasks. Databases without window functions fall back to
+counting in Python.
+
+Velocity is tasks completed per week over the last VELOCITY_DAYS. The
+forecast date is when the remaining tasks are done at that pace.
+
+Series are cached per goal and day in the tiered cache (core.caching)
+under the goal:<id>:analytics tag, which is retired when one of the
+goal's tasks is saved or deleted, so chart requests rarely touch the task
+table. They are returned as compact JSON: parallel arrays of counts
+indexed by day offset from `start`.
+"""
+import math
+from collections import Counter
+from datetime import timedelta
+from itertools import accumulate
+from django.db import connection
+from django.db.models import Count, F, Window
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from core.caching import tiered
+from .models import Task
+
+CACHE_TIMEOUT = 60 * 60 * 24
+VELOCITY_DAYS = 28
+
+
+def analytics_tag(goal_id):
+    return f'goal:{goal_id}:analytics'
+
+
+def invalidate_analytics(goal_ids):
+    tags = [analytics_tag(goal_id) for goal_id in set(goal_ids)]
+    if tags:
+        tiered.invalidate_tags(*tags)
+
+
+def _running_counts(tasks, field):
+    """[(day, tasks with field on or before day)] for each day with at least one"""
+    tasks = tasks.filter(**{f'{field}__isnull': False})
+    if connection.features.supports_over_clause:
+        return list(
+            tasks.annotate(day=TruncDate(field))
+            .annotate(running=Window(Count('pk'), order_by=F('day').asc()))
+            .values_list('day', 'running')
+            .distinct()
+            .order_by('day')
+        )
+    counts = Counter(timezone.localdate(value) for value in tasks.values_list(field, flat=True))
+    days = sorted(counts)
+    return list(zip(days, accumulate(counts[day] for day in days)))
+
+
+def _daily(running, start, days):
+    """Expand [(day, running count)] into one value per day from start"""
+    series, value, points = [], 0, iter(running)
+    point = next(points, None)
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        while point is not None and point[0] <= day:
+            value = point[1]
+            point = next(points, None)
+        series.append(value)
+    return series
+
+
+def compute_analytics(goal, today=None):
+    """Burndown series, velocity and forecast for one goal"""
+    today = today or timezone.localdate()
+    tasks = Task.objects.filter(goal=goal).order_by()
+    created = _running_counts(tasks, 'created_at')
+    completed = _running_counts(tasks.filter(status='done'), 'completed_at')
+
+    start = min([timezone.localdate(goal.created_at)] + [day for day, _ in created[:1]])
+    days = max((today - start).days + 1, 1)
+    total = _daily(created, start, days)
+    done = _daily(completed, start, days)
+    remaining = total[-1] - done[-1]
+
+    window_start = max(days - 1 - VELOCITY_DAYS, 0)
+    window_days = max(days - 1 - window_start, 1)
+    velocity = (done[-1] - done[window_start]) * 7 / window_days
+
+    if remaining == 0:
+        forecast = today if total[-1] else None
+    elif velocity > 0:
+        forecast = today + timedelta(days=math.ceil(remaining * 7 / velocity))
+    else:
+        forecast = None
+
+    return {
+        'goal': str(goal.pk),
+        'as_of': today.isoformat(),
+        'start': start.isoformat(),
+        'total': total,
+        'done': done,
+        'remaining': [t - d for t, d in zip(total, done)],
+        'velocity': round(velocity, 2),  # tasks per week
+        'forecast': forecast.isoformat() if forecast else None,
+        'target_date': goal.target_date.isoformat(),
+        'on_track': forecast is not None and forecast <= goal.target_date,
+    }
+
+
+def get_analytics(goals):
+    """Analytics for each goal, in order, from the cache where still current"""
+    today = timezone.localdate()
+    # The day is in the key: yesterday's series is never served
+    return [
+        tiered.get_or_compute(
+            f'goals:analytics:{goal.pk}:{today.isoformat()}',
+            lambda goal=goal: compute_analytics(goal, today),
+            timeout=CACHE_TIMEOUT, tags=[analytics_tag(goal.pk)],
+        )
+        for goal in goals
+    ]
+
+
+def _task_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_analytics([instance.goal_id])
+
+
+def connect_signals():
+    from django.db.models.signals import post_delete, post_save
+    post_save.connect(_task_changed, sender=Task, dispatch_uid='goals_analytics_task_save')
+    post_delete.connect(_task_changed, sender=Task, dispatch_uid='goals_analytics_task_delete')
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class GoalsConfig(AppConfig):
     name = 'goals'
+
+    def ready(self):
+        from . import analytics, status
+        analytics.connect_signals()
+        status.connect_signals()
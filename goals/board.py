@@ -0,0 +1,119 @@
+"""
+Batched kanban mutations for the goal board.
+
+The board sends the cards whose column or index changed since its last
+flush as batches of at most MAX_BOARD_MOVES moves:
+{"id": <task>, "status": <column>, "position": <index in column>}, with
+either key optional. The batch is applied in one transaction: one
+SELECT ... FOR UPDATE loads and locks the tasks (a concurrent edit waits
+rather than being overwritten), one bulk_update writes them, and goal
+completion is then recomputed with the set-based update from goals.status.
+The response holds only the changed cards and the affected goals'
+percentages, not a re-rendered board.
+"""
+import uuid
+from django.db import transaction
+from django.utils import timezone
+from core.dashboard import invalidate_dashboard_counts
+from core.sync import record_changes
+from .analytics import invalidate_analytics
+from .models import Goal, Task
+from .status import update_goal_completion
+
+MAX_BOARD_MOVES = 200
+STATUSES = {status for status, _ in Task.STATUS_CHOICES}
+CARD_FIELDS = ['status', 'board_position', 'completion_percentage', 'completed_at', 'modified_at']
+
+
+class BoardError(Exception):
+    """The batch is malformed; nothing was applied"""
+
+
+def _parse_moves(moves):
+    if not isinstance(moves, list) or not all(isinstance(move, dict) for move in moves):
+        raise BoardError('moves must be a list of objects')
+    if len(moves) > MAX_BOARD_MOVES:
+        raise BoardError(f'At most {MAX_BOARD_MOVES} moves per batch')
+
+    # Later moves of the same card win
+    parsed = {}
+    for move in moves:
+        try:
+            task_id = str(uuid.UUID(str(move.get('id'))))
+        except ValueError:
+            raise BoardError(f"Invalid task id: {move.get('id')}")
+        status = move.get('status')
+        position = move.get('position')
+        if status is not None and status not in STATUSES:
+            raise BoardError(f'Unknown status: {status}')
+        if position is not None and (not isinstance(position, int) or isinstance(position, bool) or position < 0):
+            raise BoardError('position must be a non-negative integer')
+        change = parsed.setdefault(task_id, {})
+        if status is not None:
+            change['status'] = status
+        if position is not None:
+            change['board_position'] = position
+    return parsed
+
+
+def card_data(task):
+    return {
+        'id': str(task.pk),
+        'goal_id': str(task.goal_id),
+        'status': task.status,
+        'position': task.board_position,
+        'completion_percentage': task.completion_percentage,
+        'modified_at': task.modified_at.isoformat(),
+    }
+
+
+def apply_moves(user, moves):
+    """Apply a batch of board moves; returns {'cards': [...], 'goals': {id: percentage}}"""
+    changes = _parse_moves(moves)
+    now = timezone.now()
+    changed = []
+    with transaction.atomic():
+        # Locked from read to write: a concurrent task_update or status sweep
+        # waits instead of being overwritten with what we read
+        tasks = {
+            str(task.pk): task
+            for task in Task.objects.select_for_update()
+            .filter(pk__in=list(changes), goal__user=user).only('pk', 'goal_id', *CARD_FIELDS)
+        } if changes else {}
+        missing = set(changes) - set(tasks)
+        if missing:
+            raise BoardError(f'Unknown task: {sorted(missing)[0]}')
+
+        for task_id, change in changes.items():
+            task = tasks[task_id]
+            status = change.get('status', task.status)
+            if status != task.status:
+                if status == 'done':
+                    # Same as completing it through task_update
+                    task.completion_percentage = 100
+                    task.completed_at = now
+                elif task.status == 'done':
+                    # Reopened: no longer complete
+                    task.completion_percentage = 0
+                    task.completed_at = None
+                task.status = status
+            elif change.get('board_position', task.board_position) == task.board_position:
+                continue
+            task.board_position = change.get('board_position', task.board_position)
+            task.modified_at = now
+            changed.append(task)
+
+        goal_ids = {task.goal_id for task in changed}
+        if changed:
+            Task.objects.bulk_update(changed, CARD_FIELDS)
+            # bulk_update sends no signals
+            record_changes('task', [(user.pk, task.pk) for task in changed])
+            update_goal_completion(goal_ids)
+            invalidate_analytics(goal_ids)
+            invalidate_dashboard_counts([user.pk])
+
+    goals = Goal.objects.filter(pk__in=goal_ids).values_list('pk', 'completion_percentage') if goal_ids else []
+    return {
+        'cards': [card_data(task) for task in changed],
+        'goals': {str(pk): percentage for pk, percentage in goals},
+    }
@@ -0,0 +1,179 @@
+"""
+Goal decomposition template library.
+
+Every plan Gemini produces is kept as a template under the goal's user
+and (role_category, experience_level, time_horizon), with the normalised
+keywords of its title. Plans carry the user's own titles and descriptions,
+so a library is private to its user. A new goal with the same key whose
+title keywords
+are similar enough (Jaccard >= TEMPLATE_MIN_SIMILARITY) gets a copy of
+that plan straight from the database, with due dates shifted to today and
+the horizon milestones from the built-in rules, so only novel goals wait
+on the LLM. The copy is a couple of bulk inserts: the per-row signals
+(change log, goal completion, analytics, dashboard counts) are replaced by
+one call each, as in goals.board.
+"""
+import re
+from datetime import datetime, timedelta
+from django.db.models import F
+from django.utils import timezone
+from core.dashboard import invalidate_dashboard_counts
+from core.sync import record_changes
+from .analytics import invalidate_analytics
+from .models import DecompositionTemplate, Milestone, Task
+from .status import update_goal_completion
+
+TEMPLATE_MIN_SIMILARITY = 0.6
+MAX_TEMPLATES_PER_KEY = 20
+
+STOPWORDS = frozenset("""
+a an and as at be become by for from get in into my of on or the to with
+""".split())
+
+# Built-in milestone plan per time horizon: (title, days from start)
+HORIZON_MILESTONES = {
+    '1year': [
+        ('Q1: Foundation Building', 90),
+        ('Q2: Skill Expansion', 180),
+        ('Q3: Project Leadership', 270),
+        ('Q4: Consolidation', 365),
+    ],
+    '3year': [
+        ('Year 1: Specialization', 365),
+        ('Year 2: Leadership', 730),
+        ('Year 3: Strategic Impact', 1095),
+    ],
+}
+DEFAULT_MILESTONES = [
+    ('Phase 1: Foundation', 180),
+    ('Phase 2: Growth', 365),
+]
+
+
+def _stem(word):
+    for suffix in ('ing', 'ed', 's'):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def title_keywords(title):
+    """Normalised keyword set for a goal title"""
+    words = re.findall(r'\w+', (title or '').lower())
+    return frozenset(_stem(w) for w in words if w not in STOPWORDS and not w.isdigit())
+
+
+def similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def create_milestones(goal, start=None):
+    """Create the built-in milestones for the goal's time horizon, capped at its target date"""
+    start = start or timezone.now().date()
+    # target_date is still the posted string on a goal created this request
+    target = datetime.strptime(str(goal.target_date), '%Y-%m-%d').date()
+    days_to_target = (target - start).days
+    milestones = Milestone.objects.bulk_create([
+        Milestone(goal=goal, title=title, target_date=start + timedelta(days=min(days, days_to_target)))
+        for title, days in HORIZON_MILESTONES.get(goal.time_horizon, DEFAULT_MILESTONES)
+    ])
+    # bulk_create sends no signals
+    record_changes('milestone', [(goal.user_id, milestone.pk) for milestone in milestones], action='create')
+    return milestones
+
+
+def find_template(goal):
+    """Best template for the goal, or None if nothing is similar enough"""
+    keywords = title_keywords(goal.title)
+    if not keywords:
+        return None
+    candidates = DecompositionTemplate.objects.filter(
+        user_id=goal.user_id,
+        role_category=goal.role_category,
+        experience_level=goal.experience_level,
+        time_horizon=goal.time_horizon,
+    ).only('id', 'title_keywords', 'tasks')
+
+    best, best_score = None, 0.0
+    for template in candidates:
+        score = similarity(keywords, frozenset(template.title_keywords.split()))
+        if score > best_score:
+            best, best_score = template, score
+    return best if best_score >= TEMPLATE_MIN_SIMILARITY else None
+
+
+def create_tasks_from_template(goal):
+    """
+    Create the goal's tasks and milestones from a matching template.
+    Returns the tasks, or None when the goal needs a fresh plan.
+    """
+    template = find_template(goal)
+    if template is None:
+        return None
+
+    today = timezone.now().date()
+    tasks = Task.objects.bulk_create([
+        Task(
+            goal=goal,
+            department=spec['department'],
+            title=spec['title'],
+            description=spec['description'],
+            due_date=today + timedelta(days=spec['offset_days']),
+            is_weekly=spec['is_weekly'],
+            is_monthly=spec['is_monthly'],
+            status='pending',
+        )
+        for spec in template.tasks
+    ])
+    # bulk_create sends no signals
+    record_changes('task', [(goal.user_id, task.pk) for task in tasks], action='create')
+    update_goal_completion([goal.pk])
+    invalidate_analytics([goal.pk])
+    invalidate_dashboard_counts([goal.user_id])
+    create_milestones(goal, today)
+    DecompositionTemplate.objects.filter(pk=template.pk).update(
+        use_count=F('use_count') + 1, last_used_at=timezone.now()
+    )
+    return tasks
+
+
+def record_template(goal, tasks, start=None):
+    """
+    Store a generated plan so similar goals can reuse it. Due dates are
+    kept relative to `start`, the day the plan was made (default today).
+    """
+    keywords = title_keywords(goal.title)
+    if not keywords or not tasks:
+        return None
+
+    start = start or timezone.now().date()
+    specs = [{
+        'department': task.department,
+        'title': task.title,
+        'description': task.description,
+        'offset_days': max((task.due_date - start).days, 1),
+        'is_weekly': task.is_weekly,
+        'is_monthly': task.is_monthly,
+    } for task in tasks]
+
+    key = dict(
+        user_id=goal.user_id,
+        role_category=goal.role_category,
+        experience_level=goal.experience_level,
+        time_horizon=goal.time_horizon,
+    )
+    template, _ = DecompositionTemplate.objects.update_or_create(
+        title_keywords=' '.join(sorted(keywords))[:300],
+        defaults={'tasks': specs},
+        **key,
+    )
+
+    # Keep the library small per key; least used (then oldest) templates go
+    # first. The one just recorded has use_count 0 but is always kept.
+    stale = DecompositionTemplate.objects.filter(**key).exclude(pk=template.pk).order_by(
+        '-use_count', '-created_at'
+    ).values_list('pk', flat=True)[MAX_TEMPLATES_PER_KEY - 1:]
+    DecompositionTemplate.objects.filter(pk__in=list(stale)).delete()
+    return template
@@ -0,0 +1,41 @@
+"""
+Seed the goal decomposition template library from existing goals.
+
+Goals planned by Gemini before the library existed hold the same kind of
+plans it stores. This records a template for every goal whose tasks came
+from the AI planner (the rule-based fallback tasks are skipped), with due
+dates taken relative to the day the goal was created. Each template goes
+into its goal owner's library.
+
+Usage:
+    python manage.py build_goal_templates
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from goals.decomposition import record_template
+from goals.models import Goal, Task
+
+FALLBACK_TITLE_SUFFIX = 'assessment and planning'
+
+
+class Command(BaseCommand):
+    help = 'Builds goal decomposition templates from goals planned by Gemini'
+
+    def handle(self, *args, **options):
+        goals = Goal.objects.order_by('created_at').prefetch_related(
+            Prefetch('tasks', queryset=Task.objects.order_by('due_date', 'created_at'))
+        )
+
+        recorded = skipped = 0
+        for goal in goals.iterator(chunk_size=200):
+            tasks = list(goal.tasks.all())
+            if not tasks or any(t.title.endswith(FALLBACK_TITLE_SUFFIX) for t in tasks):
+                skipped += 1
+                continue
+            if record_template(goal, tasks[:8], start=goal.created_at.date()):
+                recorded += 1
+            else:
+                skipped += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{recorded} templates recorded, {skipped} goals skipped'))
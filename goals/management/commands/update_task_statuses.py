@@ -0,0 +1,60 @@
+"""
+Mark tasks overdue / at risk.
+
+Meant to run periodically: once a day is enough for due dates, more often
+is cheap since each pass only writes the rows that change. On Railway,
+railway_startup.sh keeps it running with --loop next to gunicorn (every
+TASK_STATUS_INTERVAL seconds, default 3600). In --loop mode a failed pass
+is logged and retried on the next one instead of ending the process.
+
+Goal completion is kept current by the task save/delete signals and is not
+affected by these transitions. --repair-goals recomputes it for every goal
+once, to fix figures written before that (or by raw SQL).
+
+Usage:
+    python manage.py update_task_statuses
+    python manage.py update_task_statuses --loop 3600
+    python manage.py update_task_statuses --repair-goals
+"""
+
+import logging
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from goals.status import refresh_task_statuses, update_goal_completion
+
+logger = logging.getLogger('goals')
+
+
+class Command(BaseCommand):
+    help = 'Marks overdue and at-risk tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=int, metavar='SECONDS',
+                            help='Keep running, one pass every SECONDS')
+        parser.add_argument('--repair-goals', action='store_true',
+                            help='Also recompute every goal\'s completion percentage once')
+
+    def run_pass(self):
+        start = time.perf_counter()
+        counts = refresh_task_statuses()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['overdue']} overdue, {counts['at_risk']} at risk, "
+            f"{counts['reopened']} reopened in {elapsed:.0f} ms"
+        ))
+
+    def handle(self, *args, **options):
+        if options['repair_goals']:
+            self.stdout.write(f'{update_goal_completion()} goals repaired')
+        if not options['loop']:
+            self.run_pass()
+            return
+        while True:
+            # Drop a connection the database closed while we slept
+            close_old_connections()
+            try:
+                self.run_pass()
+            except Exception:
+                logger.exception('Task status pass failed; retrying in %s s', options['loop'])
+            time.sleep(options['loop'])
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def rename_completed_status(apps, schema_editor):
+    # 0001 used 'completed'; the model now calls it 'done'
+    Task = apps.get_model('goals', 'Task')
+    Task.objects.filter(status='completed').update(status='done')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='goal',
+            options={'ordering': ['-created_at']},
+        ),
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['due_date', 'created_at']},
+        ),
+        migrations.RenameField(
+            model_name='task',
+            old_name='target_date',
+            new_name='due_date',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='blocked_reason',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='is_daily',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='is_monthly',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='is_quarterly',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='is_weekly',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='department',
+            field=models.CharField(choices=[('finance', 'Finance'), ('hr', 'HR'), ('sales', 'Sales'), ('operations', 'Operations'), ('strategy', 'Strategy')], default='strategy', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('done', 'Done'), ('blocked', 'Blocked'), ('at_risk', 'At Risk'), ('overdue', 'Overdue')], default='pending', max_length=20),
+        ),
+        migrations.RunPython(rename_completed_status, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='Milestone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('target_date', models.DateField()),
+                ('is_achieved', models.BooleanField(default=False)),
+                ('achieved_at', models.DateTimeField(blank=True, null=True)),
+                ('goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='milestones', to='goals.goal')),
+            ],
+            options={
+                'ordering': ['target_date'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0002_sync_task_fields_and_milestones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DecompositionTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role_category', models.CharField(max_length=50)),
+                ('experience_level', models.CharField(max_length=20)),
+                ('time_horizon', models.CharField(max_length=10)),
+                ('title_keywords', models.CharField(max_length=300)),
+                ('tasks', models.JSONField()),
+                ('use_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['role_category', 'experience_level', 'time_horizon'], name='goals_decom_role_ca_f7efc9_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0003_decompositiontemplate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'due_date'], name='goals_task_status_dee24e_idx'),
+        ),
+    ]
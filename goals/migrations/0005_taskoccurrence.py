@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0004_task_status_due_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('done', 'Done'), ('skipped', 'Skipped'), ('moved', 'Moved')], max_length=20)),
+                ('moved_to', models.DateField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='goals.task')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['task', 'moved_to'], name='goals_tasko_task_id_428da6_idx')],
+                'unique_together': {('task', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0005_taskoccurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='board_position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
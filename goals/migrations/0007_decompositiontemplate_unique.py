@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:30
+
+from django.db import migrations, models
+
+
+def drop_duplicate_templates(apps, schema_editor):
+    # Racing update_or_create calls could store a key twice; keep the most
+    # used (then newest) copy
+    DecompositionTemplate = apps.get_model('goals', 'DecompositionTemplate')
+    seen = set()
+    duplicates = []
+    rows = DecompositionTemplate.objects.order_by('-use_count', '-created_at').values_list(
+        'pk', 'role_category', 'experience_level', 'time_horizon', 'title_keywords'
+    )
+    for pk, *key in rows.iterator():
+        key = tuple(key)
+        if key in seen:
+            duplicates.append(pk)
+        seen.add(key)
+    DecompositionTemplate.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0006_task_board_position'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_templates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='decompositiontemplate',
+            constraint=models.UniqueConstraint(fields=('role_category', 'experience_level', 'time_horizon', 'title_keywords'), name='unique_decomposition_template'),
+        ),
+        migrations.RemoveIndex(
+            model_name='decompositiontemplate',
+            name='goals_decom_role_ca_f7efc9_idx',
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def drop_shared_templates(apps, schema_editor):
+    # Shared templates hold other users' task text and carry no owner;
+    # `manage.py build_goal_templates` rebuilds per-user libraries
+    apps.get_model('goals', 'DecompositionTemplate').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('goals', '0007_decompositiontemplate_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_shared_templates, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='decompositiontemplate',
+            name='unique_decomposition_template',
+        ),
+        migrations.AddField(
+            model_name='decompositiontemplate',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='decomposition_templates', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='decompositiontemplate',
+            constraint=models.UniqueConstraint(fields=('user', 'role_category', 'experience_level', 'time_horizon', 'title_keywords'), name='unique_decomposition_template'),
+        ),
+    ]
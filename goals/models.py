@@ -97,6 +97,7 @@ class Task(models.Model):
     due_date = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     completion_percentage = models.IntegerField(default=0)
+    board_position = models.PositiveIntegerField(default=0)  # order within its board column
     
     # Tracking
     blocked_reason = models.TextField(blank=True)
@@ -107,11 +108,47 @@ class Task(models.Model):
     
     class Meta:
         ordering = ['due_date', 'created_at']
+        indexes = [
+            # Periodic overdue / at-risk sweeps (goals.status)
+            models.Index(fields=['status', 'due_date']),
+        ]
     
     def __str__(self):
         return self.title
 
 
+class TaskOccurrence(models.Model):
+    """
+    One occurrence of a recurring task that differs from its schedule:
+    completed, skipped or moved. Untouched occurrences have no row
+    (see goals.recurrence).
+    """
+    STATUS_CHOICES = [
+        ('done', 'Done'),
+        ('skipped', 'Skipped'),
+        ('moved', 'Moved'),
+    ]
+    
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='occurrences')
+    date = models.DateField()  # scheduled date of the occurrence
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    moved_to = models.DateField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    modified_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['date']
+        unique_together = ['task', 'date']
+        indexes = [
+            models.Index(fields=['task', 'moved_to']),
+        ]
+    
+    def __str__(self):
+        return f"{self.task.title} on {self.date}: {self.status}"
+
+
 class Milestone(models.Model):
     """Key milestones within goals"""
     goal = models.ForeignKey(Goal, on_delete=models.CASCADE, related_name='milestones')
@@ -126,3 +163,34 @@ class Milestone(models.Model):
     
     def __str__(self):
         return self.title
+
+
+class DecompositionTemplate(models.Model):
+    """
+    A reusable task plan for one user's goals of one (role, level, horizon)
+    whose titles share these keywords (see goals.decomposition)
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='decomposition_templates')
+    role_category = models.CharField(max_length=50)
+    experience_level = models.CharField(max_length=20)
+    time_horizon = models.CharField(max_length=10)
+    title_keywords = models.CharField(max_length=300)  # sorted, space separated
+    
+    # [{department, title, description, offset_days, is_weekly, is_monthly}]
+    tasks = models.JSONField()
+    
+    use_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        # Also serves find_template's (user, role, level, horizon) lookups
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'role_category', 'experience_level', 'time_horizon', 'title_keywords'],
+                name='unique_decomposition_template',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.role_category}/{self.experience_level}/{self.time_horizon}: {self.title_keywords}"
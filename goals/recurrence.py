@@ -0,0 +1,156 @@
+"""
+Recurring tasks, expanded lazily.
+
+A task flagged is_daily / is_weekly / is_monthly / is_quarterly is one Task
+row. Its due_date anchors the series, which runs until the goal's target
+date. Occurrences are generated on demand for the requested window only.
+The generator jumps straight to the first date in the window, so a
+year-long daily habit costs nothing outside the days asked for. Only
+occurrences that differ from the schedule (done, skipped or moved) are
+stored, as TaskOccurrence rows.
+
+agenda(user, start, end) makes two queries: the user's tasks that can
+appear in the window, then the stored occurrences for the recurring ones
+in the window. Its cost is O(tasks + occurrences in the window).
+"""
+import calendar
+from collections import namedtuple
+from datetime import timedelta
+from django.db.models import Q
+from django.utils import timezone
+from .models import Task, TaskOccurrence
+
+# Most frequent flag wins when several are set: (frequency, days, months)
+FREQUENCIES = [
+    ('daily', 1, 0),
+    ('weekly', 7, 0),
+    ('monthly', 0, 1),
+    ('quarterly', 0, 3),
+]
+
+RECURRING = Q(is_daily=True) | Q(is_weekly=True) | Q(is_monthly=True) | Q(is_quarterly=True)
+
+# One agenda entry. date is when it shows up; scheduled_date is the series
+# date it stands for (they differ for a moved occurrence).
+Occurrence = namedtuple('Occurrence', 'task date scheduled_date status recurring')
+
+
+def frequency(task):
+    """'daily', 'weekly', 'monthly', 'quarterly' or None"""
+    for name, _, _ in FREQUENCIES:
+        if getattr(task, f'is_{name}'):
+            return name
+    return None
+
+
+def _add_months(day, months, anchor_day):
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    # Anchored on the 31st: the 30th in April, the 28th/29th in February
+    return day.replace(year=year, month=month, day=min(anchor_day, calendar.monthrange(year, month)[1]))
+
+
+def occurrences(task, start, end):
+    """
+    Yield the scheduled dates of a task in [start, end]. A non-recurring
+    task has one occurrence, its due date.
+    """
+    anchor = task.due_date
+    name = frequency(task)
+    if name is None:
+        if start <= anchor <= end:
+            yield anchor
+        return
+
+    _, days, months = next(f for f in FREQUENCIES if f[0] == name)
+    until = min(end, task.goal.target_date) if task.goal.target_date else end
+    if until < anchor:
+        return
+
+    if days:
+        # First step on or after start, without walking the series from the anchor
+        step = max(0, -(-(start - anchor).days // days))
+        day = anchor + timedelta(days=step * days)
+        while day <= until:
+            yield day
+            day += timedelta(days=days)
+    else:
+        step = max(0, ((start.year - anchor.year) * 12 + start.month - anchor.month) // months)
+        day = _add_months(anchor, step * months, anchor.day)
+        while day < start:
+            step += 1
+            day = _add_months(anchor, step * months, anchor.day)
+        while day <= until:
+            yield day
+            step += 1
+            day = _add_months(anchor, step * months, anchor.day)
+
+
+def agenda(user, start, end):
+    """Occurrences of the user's active-goal tasks in [start, end], by date"""
+    tasks = list(
+        Task.objects.filter(goal__user=user, goal__status='active')
+        .filter(
+            # Recurring series that have started and not yet ended...
+            RECURRING & Q(due_date__lte=end, goal__target_date__gte=start) & ~Q(status='done')
+            # ...and one-off tasks due in the window
+            | ~RECURRING & Q(due_date__gte=start, due_date__lte=end)
+        )
+        .select_related('goal')
+    )
+
+    recurring = [task for task in tasks if frequency(task)]
+    stored = {}
+    if recurring:
+        rows = TaskOccurrence.objects.filter(task__in=recurring).filter(
+            Q(date__gte=start, date__lte=end) | Q(moved_to__gte=start, moved_to__lte=end)
+        )
+        stored = {(row.task_id, row.date): row for row in rows}
+
+    entries = []
+    for task in tasks:
+        if not frequency(task):
+            entries.append(Occurrence(task, task.due_date, task.due_date, task.status, False))
+            continue
+        for day in occurrences(task, start, end):
+            row = stored.pop((task.pk, day), None)
+            if row is None:
+                entries.append(Occurrence(task, day, day, 'pending', True))
+            elif row.status != 'moved':
+                entries.append(Occurrence(task, day, day, row.status, True))
+            elif start <= row.moved_to <= end:
+                entries.append(Occurrence(task, row.moved_to, day, row.status, True))
+
+    # Occurrences moved into the window from a date outside it
+    for row in stored.values():
+        if row.status == 'moved' and start <= row.moved_to <= end:
+            task = next(t for t in recurring if t.pk == row.task_id)
+            entries.append(Occurrence(task, row.moved_to, row.date, row.status, True))
+
+    entries.sort(key=lambda entry: (entry.date, entry.task.title))
+    return entries
+
+
+def is_scheduled(task, day):
+    """True if the task's series has an occurrence on day"""
+    return next(occurrences(task, day, day), None) == day
+
+
+def set_occurrence(task, day, status, moved_to=None):
+    """
+    Record one occurrence as done, skipped or moved to another date;
+    status 'pending' drops the exception and returns it to the schedule.
+    """
+    if status == 'pending':
+        TaskOccurrence.objects.filter(task=task, date=day).delete()
+        return None
+    occurrence, _ = TaskOccurrence.objects.update_or_create(
+        task=task,
+        date=day,
+        defaults={
+            'status': status,
+            'moved_to': moved_to if status == 'moved' else None,
+            'completed_at': timezone.now() if status == 'done' else None,
+        },
+    )
+    return occurrence
@@ -0,0 +1,132 @@
+"""
+Derived task and goal state, kept current with set-based updates.
+
+refresh_task_statuses() moves open tasks to 'overdue' once their due date
+has passed and to 'at_risk' when they are due within AT_RISK_DAYS with
+little progress, and moves them back when a due date is pushed out or
+progress catches up. Recurring tasks are left alone: their due_date only
+anchors the series (goals.recurrence). Each transition is one UPDATE ... WHERE over the
+(status, due_date) index, so a sweep only touches the rows that change.
+These flips are derived from the date, not edits: they leave modified_at
+alone, since offline writes (core.offline_sync) treat a newer modified_at
+as someone else's edit and would report a conflict for every queued change
+to a task the sweep touched.
+
+update_goal_completion() recomputes Goal.completion_percentage from its
+done/total task counts in one UPDATE with a correlated subquery, so views
+read the stored figure instead of counting on every request. It runs for
+the task's goal whenever a task is saved or deleted. The sweep's
+transitions never change a goal's done/total count, so it does not run
+there; `update_task_statuses --repair-goals` recomputes every goal once.
+
+Bulk updates send no signals, so changed rows are fed to the sync change
+log and the dashboard counters explicitly.
+"""
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from core.dashboard import invalidate_dashboard_counts
+from core.sync import record_changes
+from .models import Goal, Task
+from .recurrence import RECURRING
+
+AT_RISK_DAYS = 3
+AT_RISK_MAX_PROGRESS = 50  # at or above this, a task due soon is on track
+
+OPEN_STATUSES = ['pending', 'in_progress']
+
+
+def _transition(queryset, status):
+    """Set status on every row of queryset; return the changed (user_id, pk) pairs"""
+    rows = list(queryset.values_list('goal__user_id', 'pk'))
+    if rows:
+        queryset.update(status=status)
+        record_changes('task', rows)
+        invalidate_dashboard_counts(user_id for user_id, _ in rows)
+    return rows
+
+
+def refresh_task_statuses(today=None):
+    """Apply overdue / at-risk transitions; returns counts per transition"""
+    today = today or timezone.localdate()
+    at_risk_until = today + timedelta(days=AT_RISK_DAYS)
+    reopened_status = Case(
+        When(completion_percentage__gt=0, then=Value('in_progress')),
+        default=Value('pending'),
+    )
+    counts = {}
+
+    with transaction.atomic():
+        # Due date pushed out (or progress caught up) since the last sweep
+        revert = (
+            Q(status__in=['overdue', 'at_risk']) & RECURRING
+            | Q(status='overdue', due_date__gte=today)
+            | Q(status='at_risk', due_date__gte=today) & (
+                Q(due_date__gt=at_risk_until) | Q(completion_percentage__gte=AT_RISK_MAX_PROGRESS)
+            )
+        )
+        reverted = Task.objects.filter(revert)
+        rows = list(reverted.values_list('goal__user_id', 'pk'))
+        if rows:
+            reverted.update(status=reopened_status)
+            record_changes('task', rows)
+            invalidate_dashboard_counts(user_id for user_id, _ in rows)
+        counts['reopened'] = len(rows)
+
+        counts['overdue'] = len(_transition(
+            Task.objects.filter(status__in=OPEN_STATUSES + ['at_risk'], due_date__lt=today)
+            .exclude(RECURRING),
+            'overdue',
+        ))
+        counts['at_risk'] = len(_transition(
+            Task.objects.filter(
+                status__in=OPEN_STATUSES,
+                due_date__gte=today,
+                due_date__lte=at_risk_until,
+                completion_percentage__lt=AT_RISK_MAX_PROGRESS,
+            ).exclude(RECURRING),
+            'at_risk',
+        ))
+    return counts
+
+
+def update_goal_completion(goal_ids=None):
+    """
+    Store each goal's done/total task percentage. Only goals whose figure
+    changes are written. Returns the number of goals updated.
+    """
+    percentage = Subquery(
+        Task.objects.filter(goal=OuterRef('pk'))
+        .values('goal')
+        .annotate(pct=Count('pk', filter=Q(status='done')) * 100 / Count('pk'))
+        .values('pct'),
+        output_field=IntegerField(),
+    )
+    goals = Goal.objects.annotate(new_pct=Coalesce(percentage, 0))
+    if goal_ids is not None:
+        goals = goals.filter(pk__in=goal_ids)
+    rows = list(goals.exclude(completion_percentage=F('new_pct')).values_list('user_id', 'pk'))
+    if rows:
+        Goal.objects.filter(pk__in=[pk for _, pk in rows]).update(
+            completion_percentage=Coalesce(percentage, 0),
+            modified_at=timezone.now(),
+        )
+        record_changes('goal', rows)
+    return len(rows)
+
+
+def _task_changed(sender, instance, raw=False, origin=None, **kwargs):
+    if raw:
+        return
+    # Deleted along with its goal or user: nothing left to update
+    if origin is not None and getattr(origin, 'model', type(origin)) is not Task:
+        return
+    update_goal_completion([instance.goal_id])
+
+
+def connect_signals():
+    from django.db.models.signals import post_delete, post_save
+    post_save.connect(_task_changed, sender=Task, dispatch_uid='goals_completion_task_save')
+    post_delete.connect(_task_changed, sender=Task, dispatch_uid='goals_completion_task_delete')
@@ -1,3 +1,75 @@
+from datetime import date, timedelta
+from django.contrib.auth.models import User
 from django.test import TestCase
+from core.models import ChangeLog
+from core.offline_sync import apply_batch
+from .decomposition import MAX_TEMPLATES_PER_KEY, create_tasks_from_template, record_template
+from .models import DecompositionTemplate, Goal, Task
+from .status import refresh_task_statuses
 
-# Create your tests here.
+
+class RecordTemplateTests(TestCase):
+    key = dict(role_category='engineering', experience_level='mid', time_horizon='1year')
+
+    def test_new_template_survives_a_full_library(self):
+        user = User.objects.create_user('recorder')
+        for i in range(MAX_TEMPLATES_PER_KEY):
+            DecompositionTemplate.objects.create(
+                user=user, title_keywords=f'topic{i}', tasks=[], use_count=5, **self.key)
+        start = date(2030, 1, 1)
+        goal = Goal(user=user, title='Learn rust', **self.key)
+        tasks = [Task(title='Read the book', due_date=start + timedelta(days=30))]
+
+        template = record_template(goal, tasks, start=start)
+
+        self.assertTrue(DecompositionTemplate.objects.filter(pk=template.pk).exists())
+        self.assertEqual(DecompositionTemplate.objects.filter(user=user, **self.key).count(), MAX_TEMPLATES_PER_KEY)
+
+    def test_copied_plan_reaches_delta_sync(self):
+        user = User.objects.create_user('copier')
+        goal = Goal.objects.create(user=user, title='Learn rust', target_date=date(2030, 1, 1), **self.key)
+        spec = dict(department='Study', description='', offset_days=7, is_weekly=False, is_monthly=False)
+        DecompositionTemplate.objects.create(
+            user=user, title_keywords='learn rust', tasks=[dict(spec, title='Read'), dict(spec, title='Build')], **self.key)
+
+        with self.assertNumQueries(9):
+            tasks = create_tasks_from_template(goal)
+
+        self.assertEqual(len(tasks), 2)
+        logged = set(ChangeLog.objects.filter(user=user, kind='task').values_list('object_pk', flat=True))
+        self.assertEqual(logged, {str(task.pk) for task in tasks})
+        self.assertTrue(ChangeLog.objects.filter(user=user, kind='milestone').exists())
+
+    def test_plans_are_not_shared_between_users(self):
+        owner, other = User.objects.create_user('owner'), User.objects.create_user('other')
+        start = date(2030, 1, 1)
+        tasks = [Task(title='Pitch to Acme Corp', due_date=start + timedelta(days=30))]
+        record_template(Goal(user=owner, title='Learn rust', **self.key), tasks, start=start)
+
+        goal = Goal.objects.create(user=other, title='Learn rust', target_date=date(2031, 1, 1), **self.key)
+
+        self.assertIsNone(create_tasks_from_template(goal))
+        self.assertFalse(goal.tasks.exists())
+
+
+class StatusSweepTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planner')
+        goal = Goal.objects.create(user=self.user, title='Launch', target_date=date(2030, 1, 1))
+        self.task = Task.objects.create(goal=goal, title='Draft', due_date=date(2020, 1, 1))
+
+    def test_overdue_flip_keeps_modified_at_and_offline_edits_apply(self):
+        base = self.task.modified_at
+        logged = ChangeLog.objects.get(kind='task', object_pk=str(self.task.pk)).pk
+
+        self.assertEqual(refresh_task_statuses()['overdue'], 1)
+
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.status, self.task.modified_at), ('overdue', base))
+        # Still delivered to delta sync
+        self.assertGreater(ChangeLog.objects.get(kind='task', object_pk=str(self.task.pk)).pk, logged)
+        [result] = apply_batch(self.user, [{
+            'id': 'progress', 'type': 'task', 'action': 'update', 'pk': str(self.task.pk),
+            'data': {'completion_percentage': 40}, 'base_modified_at': base.isoformat(),
+        }])
+        self.assertEqual(result['status'], 'applied')
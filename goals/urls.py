@@ -8,6 +8,10 @@ urlpatterns = [
     path('<uuid:pk>/edit/', views.goal_edit, name='goal_edit'),
     path('<uuid:pk>/delete/', views.goal_delete, name='goal_delete'),
     
+    # Progress analytics (JSON)
+    path('analytics/', views.goals_analytics, name='goals_analytics'),
+    path('<uuid:pk>/analytics/', views.goal_analytics, name='goal_analytics'),
+    
     # Task management
     path('<uuid:goal_pk>/task/create/', views.task_create, name='task_create'),
     path('task/<uuid:pk>/update/', views.task_update, name='task_update'),
@@ -15,6 +19,11 @@ urlpatterns = [
     
     # Board view
     path('board/', views.goal_board, name='goal_board'),
+    path('board/update/', views.board_update, name='board_update'),
+    
+    # Agenda with recurring tasks expanded
+    path('agenda/', views.task_agenda, name='task_agenda'),
+    path('task/<uuid:pk>/occurrence/', views.occurrence_update, name='occurrence_update'),
     
     # AI Task regeneration
     path('<uuid:pk>/regenerate-tasks/', views.regenerate_ai_tasks, name='regenerate_ai_tasks'),
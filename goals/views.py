@@ -1,21 +1,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.utils import timezone
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
-import google.generativeai as genai
+from urllib.parse import urlencode
+import json
 import logging
-from .models import Goal, Task, Milestone
+from core import clients
+from core.llm import gemini_enabled, generate_content, LLMUnavailable
+from .models import Goal, Task
+from .analytics import get_analytics
+from .board import apply_moves, BoardError, MAX_BOARD_MOVES
+from .decomposition import create_milestones, create_tasks_from_template, record_template
+from .recurrence import agenda, frequency, is_scheduled, set_occurrence
 
 logger = logging.getLogger('goals')
 
-# Configure Gemini API
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-    gemini_model = genai.GenerativeModel(settings.GEMINI_MODEL)
-else:
-    gemini_model = None
+# Seconds a goal request may queue for a Gemini slot before using fallback
+# tasks; the plan itself gets GEMINI_PLAN_TIMEOUT
+GEMINI_QUEUE_DEADLINE = 5
+
+# The Gemini client itself is imported on first use (core.clients)
+if not gemini_enabled():
     logger.warning("Gemini API key not configured. AI task generation will not work.")
 
 
@@ -67,8 +78,18 @@ def goal_create(request):
     return render(request, 'goals/goal_form.html')
 
 
-def generate_ai_tasks(goal):
-    """Generate tasks using Gemini AI based on goal details"""
+def generate_ai_tasks(goal, use_library=True):
+    """
+    Generate tasks using Gemini AI based on goal details.
+    Goals similar to one planned before reuse that plan from the template
+    library instead of calling Gemini (use_library=False forces a new plan).
+    """
+    if use_library:
+        tasks = create_tasks_from_template(goal)
+        if tasks:
+            return tasks
+    
+    gemini_model = clients.get('gemini_model')
     if not gemini_model:
         return None
     
@@ -112,13 +133,24 @@ Format as JSON-like structure:
 Be specific, practical, and motivational. Focus on measurable outcomes."""
 
     try:
-        response = gemini_model.generate_content(prompt)
+        response = generate_content(
+            gemini_model,
+            prompt,
+            user_id=goal.user_id,
+            timeout=getattr(settings, 'GEMINI_PLAN_TIMEOUT', None),
+            queue_deadline=GEMINI_QUEUE_DEADLINE,
+        )
         ai_content = response.text
         
         # Parse the AI response and create tasks
         tasks = parse_ai_response_to_tasks(ai_content, goal)
+        if tasks:
+            record_template(goal, tasks)
         return tasks
         
+    except LLMUnavailable as e:
+        logger.info(f"Gemini call skipped, using fallback tasks: {e}")
+        return None
     except Exception as e:
         logger.error(f"Gemini API error: {e}")
         return None
@@ -220,37 +252,10 @@ def parse_manual_task_extraction(ai_content):
 
 def create_decomposed_tasks(goal):
     """Create initial task decomposition for a goal (fallback method)"""
-    from datetime import datetime
-    target = datetime.strptime(str(goal.target_date), '%Y-%m-%d').date()
     today = timezone.now().date()
     
     # Create milestone-based tasks based on time horizon
-    if goal.time_horizon == '1year':
-        milestones = [
-            ('Q1: Foundation Building', 90),
-            ('Q2: Skill Expansion', 180),
-            ('Q3: Project Leadership', 270),
-            ('Q4: Consolidation', 365),
-        ]
-    elif goal.time_horizon == '3year':
-        milestones = [
-            ('Year 1: Specialization', 365),
-            ('Year 2: Leadership', 730),
-            ('Year 3: Strategic Impact', 1095),
-        ]
-    else:
-        milestones = [
-            ('Phase 1: Foundation', 180),
-            ('Phase 2: Growth', 365),
-        ]
-    
-    for title, days in milestones:
-        milestone_date = today + timedelta(days=min(days, (target - today).days))
-        Milestone.objects.create(
-            goal=goal,
-            title=title,
-            target_date=milestone_date
-        )
+    create_milestones(goal, today)
     
     # Create some initial tasks
     departments = ['strategy', 'hr', 'operations']
@@ -281,11 +286,7 @@ def goal_detail(request, pk):
         'overdue': tasks.filter(status='overdue'),
     }
     
-    # Calculate progress
-    if tasks:
-        completed = tasks.filter(status='done').count()
-        goal.completion_percentage = int((completed / tasks.count()) * 100)
-        goal.save()
+    # goal.completion_percentage is kept current by goals.status on task changes
     
     context = {
         'goal': goal,
@@ -365,6 +366,8 @@ def task_update(request, pk):
         if task.status == 'done':
             task.completion_percentage = 100
             task.completed_at = timezone.now()
+        else:
+            task.completed_at = None
         
         if task.status == 'blocked':
             task.blocked_reason = request.POST.get('blocked_reason', '')
@@ -395,20 +398,120 @@ def goal_board(request):
     """Kanban-style board view"""
     goals = Goal.objects.filter(user=request.user, status='active')
     
-    # Get all tasks grouped by status
-    tasks = Task.objects.filter(goal__user=request.user)
+    # All tasks in one query, grouped by status in Python
+    tasks = list(
+        Task.objects.filter(goal__user=request.user)
+        .select_related('goal')
+        .order_by('board_position', 'due_date', 'created_at')
+    )
+    columns = {status: [] for status, _ in Task.STATUS_CHOICES}
+    for task in tasks:
+        columns[task.status].append(task)
     
     context = {
         'goals': goals,
         'tasks': tasks,
-        'tasks_done': tasks.filter(status='done'),
-        'tasks_in_progress': tasks.filter(status='in_progress'),
-        'tasks_pending': tasks.filter(status='pending'),
-        'tasks_blocked': tasks.filter(status='blocked'),
+        'today': timezone.now().date(),
+        'max_board_moves': MAX_BOARD_MOVES,
+        **{f'tasks_{status}': column for status, column in columns.items()},
     }
     return render(request, 'goals/goal_board.html', context)
 
 
+@login_required
+@require_POST
+def board_update(request):
+    """Apply a batch of kanban moves and reorders (JSON)"""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    
+    try:
+        result = apply_moves(request.user, data.get('moves') if isinstance(data, dict) else None)
+    except BoardError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(result)
+
+
+@login_required
+def goal_analytics(request, pk):
+    """Burndown series, velocity and forecast for one goal (JSON)"""
+    goal = get_object_or_404(Goal, pk=pk, user=request.user)
+    return JsonResponse(get_analytics([goal])[0])
+
+
+@login_required
+def goals_analytics(request):
+    """Burndown series, velocity and forecast for every active goal (JSON)"""
+    goals = Goal.objects.filter(user=request.user, status='active')
+    return JsonResponse({'goals': get_analytics(goals)})
+
+
+AGENDA_DEFAULT_DAYS = 7
+AGENDA_MAX_DAYS = 92
+
+
+def _parse_day(value):
+    """parse_date() with impossible dates (2024-02-30) treated like malformed ones: None"""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+@login_required
+def task_agenda(request):
+    """Task occurrences, recurring ones expanded, for a date window"""
+    today = timezone.now().date()
+    start = _parse_day(request.GET.get('start')) or today
+    try:
+        days = int(request.GET.get('days', AGENDA_DEFAULT_DAYS))
+    except ValueError:
+        days = AGENDA_DEFAULT_DAYS
+    end = _parse_day(request.GET.get('end')) or start + timedelta(days=max(days, 1) - 1)
+    end = min(max(end, start), start + timedelta(days=AGENDA_MAX_DAYS - 1))
+    
+    context = {
+        'entries': agenda(request.user, start, end),
+        'start': start,
+        'end': end,
+        'today': today,
+        'previous_start': start - timedelta(days=(end - start).days + 1),
+        'next_start': end + timedelta(days=1),
+        'days': (end - start).days + 1,
+    }
+    return render(request, 'goals/agenda.html', context)
+
+
+@login_required
+def occurrence_update(request, pk):
+    """Mark one occurrence of a recurring task done, skipped, moved or pending again"""
+    task = get_object_or_404(Task.objects.select_related('goal'), pk=pk, goal__user=request.user)
+    
+    if request.method == 'POST':
+        if frequency(task) is None:
+            return HttpResponseBadRequest('Only recurring tasks have occurrences')
+        day = _parse_day(request.POST.get('date'))
+        status = request.POST.get('status')
+        moved_to = _parse_day(request.POST.get('moved_to'))
+        if (request.POST.get('date') and day is None) or (request.POST.get('moved_to') and moved_to is None):
+            return HttpResponseBadRequest('Invalid date')
+        
+        if not day or not is_scheduled(task, day):
+            messages.error(request, 'That date is not part of this task\'s schedule.')
+        elif status not in ('done', 'skipped', 'moved', 'pending') or (status == 'moved' and not moved_to):
+            messages.error(request, 'Invalid occurrence update.')
+        else:
+            set_occurrence(task, day, status, moved_to)
+            messages.success(request, 'Task updated successfully.')
+    
+    # Back to the agenda window the form was posted from
+    window = urlencode({key: request.POST[key] for key in ('start', 'end') if request.POST.get(key)})
+    return redirect(f"{reverse('task_agenda')}?{window}" if window else reverse('task_agenda'))
+
+
 @login_required
 def regenerate_ai_tasks(request, pk):
     """Regenerate AI tasks for an existing goal"""
@@ -419,7 +522,7 @@ def regenerate_ai_tasks(request, pk):
         goal.tasks.all().delete()
         
         try:
-            ai_tasks = generate_ai_tasks(goal)
+            ai_tasks = generate_ai_tasks(goal, use_library=False)
             if ai_tasks:
                 messages.success(request, f'{len(ai_tasks)} new AI-generated tasks have been created.')
             else:
@@ -78,6 +78,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',  # Server-Timing header and /metrics
+    'core.middleware.RequestLogMiddleware',  # X-Request-ID and one JSON log line per request
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files on cloud
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -86,13 +88,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.profiling.ProfilingMiddleware',  # ?_profile=cprofile|sample|collapsed, staff only
 ]
 
 ROOT_URLCONF = 'jaytipargal.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.TimedDjangoTemplates',  # DjangoTemplates with render timing
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -144,6 +147,34 @@ DATABASES = {
     'default': get_database_config()
 }
 
+# Cache shared by every gunicorn worker: Redis when REDIS_URL is set (needs
+# the redis package), files on local disk otherwise. core.caching puts a
+# small per-process LRU in front of it.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHE_DIR = Path(os.environ.get('CACHE_DIR', BASE_DIR / 'data' / 'cache'))
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        CACHE_DIR = Path('/tmp') / 'jaytipargal' / 'cache'
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(CACHE_DIR),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', '1000'))
+CACHE_LOCAL_TIMEOUT = float(os.environ.get('CACHE_LOCAL_TIMEOUT', '5'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -174,7 +205,12 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 # WhiteNoise for serving static files in production
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# (also writes the service worker's precache-manifest.js on collectstatic)
+STATICFILES_STORAGE = 'core.storage.PrecacheManifestStaticFilesStorage'
+
+# Static files the service worker precaches (matched against collected names)
+PWA_PRECACHE_PATTERNS = ['css/*', 'js/*']
+PWA_PRECACHE_EXCLUDE = ['js/sw.js']
 
 # Ensure WhiteNoise middleware is properly configured
 WHITENOISE_USE_FINDERS = True
@@ -217,6 +253,41 @@ JAYTI_BIRTH_DETAILS = {
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
 GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-pro')
 
+# Gemini call limits (core.ratelimit): in-flight calls per worker process,
+# a token bucket shared by all workers, and a smaller bucket per user
+GEMINI_MAX_CONCURRENT_CALLS = int(os.environ.get('GEMINI_MAX_CONCURRENT_CALLS', '4'))
+GEMINI_RATE_PER_MINUTE = float(os.environ.get('GEMINI_RATE_PER_MINUTE', '30'))
+GEMINI_BURST = float(os.environ.get('GEMINI_BURST', '10'))
+GEMINI_USER_RATE_PER_MINUTE = float(os.environ.get('GEMINI_USER_RATE_PER_MINUTE', '10'))
+GEMINI_USER_BURST = float(os.environ.get('GEMINI_USER_BURST', '4'))
+
+# Gemini circuit breaker (core.circuit): opens when at least half of the
+# last minute's calls (min 5) failed or took over GEMINI_BREAKER_SLOW_CALL
+# seconds, then probes again after GEMINI_BREAKER_OPEN_SECONDS
+GEMINI_CALL_TIMEOUT = float(os.environ.get('GEMINI_CALL_TIMEOUT', '20'))
+# Per-caller deadlines (fall back to GEMINI_CALL_TIMEOUT when unset): chat
+# replies are interactive, goal plans are longer and worth waiting for
+GEMINI_CHAT_TIMEOUT = float(os.environ.get('GEMINI_CHAT_TIMEOUT', '15'))
+GEMINI_PLAN_TIMEOUT = float(os.environ.get('GEMINI_PLAN_TIMEOUT', '30'))
+GEMINI_BREAKER_FAILURE_RATE = float(os.environ.get('GEMINI_BREAKER_FAILURE_RATE', '0.5'))
+GEMINI_BREAKER_MIN_CALLS = int(os.environ.get('GEMINI_BREAKER_MIN_CALLS', '5'))
+GEMINI_BREAKER_WINDOW = int(os.environ.get('GEMINI_BREAKER_WINDOW', '60'))
+GEMINI_BREAKER_SLOW_CALL = float(os.environ.get('GEMINI_BREAKER_SLOW_CALL', '10'))
+GEMINI_BREAKER_OPEN_SECONDS = int(os.environ.get('GEMINI_BREAKER_OPEN_SECONDS', '30'))
+
+# Load testing only: answer Gemini calls from core.llm.StubModel after this
+# many seconds (give or take GEMINI_STUB_JITTER) instead of calling Google
+GEMINI_STUB_LATENCY = float(os.environ['GEMINI_STUB_LATENCY']) if os.environ.get('GEMINI_STUB_LATENCY') else None
+GEMINI_STUB_JITTER = float(os.environ.get('GEMINI_STUB_JITTER', '0.25'))
+
+# Per-request timing and the Prometheus /metrics endpoint. /metrics is served
+# to staff sessions and to "Authorization: Bearer <METRICS_TOKEN>" scrapers.
+# The Server-Timing header goes to staff only unless SERVER_TIMING_PUBLIC is set.
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'True').lower() == 'true'
+SERVER_TIMING_PUBLIC = os.environ.get('SERVER_TIMING_PUBLIC', 'False').lower() == 'true'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', '0.005'))
+
 # Google Service Account Credentials (for Gemini/Vertex AI)
 # Option 1: JSON content directly in environment variable
 GOOGLE_CREDENTIALS_JSON = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS_JSON', '')
@@ -224,113 +295,88 @@ GOOGLE_CREDENTIALS_JSON = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS_JSON',
 # Option 2: Path to credentials file
 GOOGLE_APPLICATION_CREDENTIALS = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS', '')
 
-# Handle Google credentials for Railway deployment
-import tempfile
-import json
+# The credentials are written out at startup by
+# core.llm.configure_google_credentials (called from CoreConfig.ready);
+# Gemini itself is imported and configured on first use (core.clients)
 
-if GOOGLE_CREDENTIALS_JSON:
-    # Write JSON credentials to temp file for Google libraries
-    try:
-        # Validate JSON first
-        json.loads(GOOGLE_CREDENTIALS_JSON)
-        
-        # Create temp file
-        creds_file = tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False)
-        creds_file.write(GOOGLE_CREDENTIALS_JSON)
-        creds_file.close()
-        
-        # Set path for Google libraries
-        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = creds_file.name
-        GOOGLE_APPLICATION_CREDENTIALS = creds_file.name
-        
-        print(f"✓ Google credentials loaded from environment variable")
-    except json.JSONDecodeError as e:
-        print(f"⚠️ Invalid GOOGLE_CREDENTIALS_JSON: {e}")
-
-# Configure Gemini with service account if available
+# Logging: JSON lines written off the request thread (core.logs). Records
+# go on a queue; a background listener writes the rotating file and the
+# console. LOG_SAMPLING keeps a fraction of INFO records from busy loggers.
+LOGS_DIR = BASE_DIR / 'logs'
 try:
-    if GOOGLE_APPLICATION_CREDENTIALS or GOOGLE_CREDENTIALS_JSON:
-        import google.generativeai as genai
-        
-        # If using service account, configure accordingly
-        if GOOGLE_APPLICATION_CREDENTIALS and os.path.exists(GOOGLE_APPLICATION_CREDENTIALS):
-            # For Vertex AI / Service account authentication
-            genai.configure()
-            print("✓ Gemini configured with service account")
-        elif GEMINI_API_KEY:
-            # Standard API key authentication
-            genai.configure(api_key=GEMINI_API_KEY)
-            print("✓ Gemini configured with API key")
-except ImportError:
-    print("⚠️ google-generativeai not installed")
-except Exception as e:
-    print(f"⚠️ Gemini configuration error: {e}")
-
-# Logging configuration - Enhanced for Railway debugging
+    LOGS_DIR.mkdir(exist_ok=True)
+except OSError:
+    # Fallback to /tmp for Railway or other read-only filesystems
+    LOGS_DIR = Path('/tmp') / 'jaytipargal' / 'logs'
+    LOGS_DIR.mkdir(parents=True, exist_ok=True)
+
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # or 'text'
+LOG_FILE_MAX_BYTES = int(os.environ.get('LOG_FILE_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_FILE_BACKUPS = int(os.environ.get('LOG_FILE_BACKUPS', '5'))
+LOG_SLOW_REQUEST_MS = float(os.environ.get('LOG_SLOW_REQUEST_MS', '1000'))
+LOG_SAMPLING = {
+    # One line per request; errors and slow requests log as warnings and are always kept
+    'core.requests': float(os.environ.get('LOG_REQUEST_SAMPLE_RATE', '1.0')),
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '[{levelname}] {asctime} {module} {message}',
-            'style': '{',
-        },
-        'simple': {
-            'format': '{levelname} {message}',
-            'style': '{',
-        },
+    'filters': {
+        'request_id': {'()': 'core.logs.RequestIdFilter'},
+        'sampling': {'()': 'core.logs.SamplingFilter', 'rates': LOG_SAMPLING},
     },
     'handlers': {
-        'file': {
-            'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'django.log',
-            'formatter': 'verbose',
-        },
-        'console': {
+        'async': {
+            '()': 'core.logs.AsyncLogHandler',
             'level': 'INFO',
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            'filename': LOGS_DIR / 'django.log',
+            'max_bytes': LOG_FILE_MAX_BYTES,
+            'backup_count': LOG_FILE_BACKUPS,
+            'format': LOG_FORMAT,
+            'filters': ['request_id', 'sampling'],
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['file', 'console'],
-            'level': 'INFO',
-            'propagate': True,
-        },
-        'django.request': {
-            'handlers': ['file', 'console'],
+            'handlers': ['async'],
             'level': 'INFO',
             'propagate': False,
         },
         'goals': {
-            'handlers': ['file', 'console'],
+            'handlers': ['async'],
             'level': 'INFO',
-            'propagate': True,
+            'propagate': False,
         },
         'core': {
-            'handlers': ['file', 'console'],
+            'handlers': ['async'],
             'level': 'INFO',
-            'propagate': True,
+            'propagate': False,
+        },
+        'ai_chat': {
+            'handlers': ['async'],
+            'level': 'INFO',
+            'propagate': False,
         },
     },
 }
 
-# Create logs directory if it doesn't exist (skip on Railway if read-only)
-LOGS_DIR = BASE_DIR / 'logs'
+# Per-user retrieval indexes over notes and diary (ai_chat.retrieval)
+AI_CHAT_RETRIEVAL_ENABLED = os.environ.get('AI_CHAT_RETRIEVAL_ENABLED', 'true').lower() == 'true'
+AI_CHAT_INDEX_DIR = Path(os.environ.get('AI_CHAT_INDEX_DIR', BASE_DIR / 'data' / 'retrieval'))
 try:
-    LOGS_DIR.mkdir(exist_ok=True)
+    AI_CHAT_INDEX_DIR.mkdir(parents=True, exist_ok=True)
 except OSError:
-    # Fallback to /tmp for Railway or other read-only filesystems
-    LOGS_DIR = Path('/tmp') / 'jaytipargal' / 'logs'
-    LOGS_DIR.mkdir(parents=True, exist_ok=True)
-    # Update logging file handler path
-    LOGGING['handlers']['file']['filename'] = LOGS_DIR / 'django.log'
+    AI_CHAT_INDEX_DIR = Path('/tmp') / 'jaytipargal' / 'retrieval'
+    AI_CHAT_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+
+# Offline sync (core.offline_sync): a diary entry queued offline yesterday is
+# still accepted for this many hours after midnight (server time)
+OFFLINE_DIARY_GRACE_HOURS = float(os.environ.get('OFFLINE_DIARY_GRACE_HOURS', '6'))
 
 # Railway-specific settings
 RAILWAY_DEBUG = os.environ.get('RAILWAY_DEBUG', 'false').lower() == 'true'
 if RAILWAY_DEBUG:
     # More verbose logging in debug mode
     LOGGING['loggers']['django']['level'] = 'DEBUG'
-    LOGGING['handlers']['console']['level'] = 'DEBUG'
+    LOGGING['handlers']['async']['level'] = 'DEBUG'
@@ -23,6 +23,8 @@ class Note(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
     is_pinned = models.BooleanField(default=False)
+    # Bumped on every save; autosave patches must name the version they edit
+    version = models.PositiveIntegerField(default=0)
     
     class Meta:
         ordering = ['-is_pinned', '-modified_at']
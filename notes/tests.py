@@ -1,3 +1,57 @@
+import json
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from .models import Note
 
-# Create your tests here.
+
+class NoteAutosaveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('writer', password='pw')
+        self.client.force_login(self.user)
+        self.note = Note.objects.create(user=self.user, title='Plan', content='')
+
+    def patch(self, version, ops):
+        return self.client.patch(
+            reverse('note_autosave', args=[self.note.pk]),
+            json.dumps({'version': version, 'patches': {'content': ops}}),
+            content_type='application/json',
+        )
+
+    def test_form_save_stores_lf_line_breaks(self):
+        self.client.post(reverse('note_edit', args=[self.note.pk]),
+                         {'title': 'Plan', 'content': 'one\r\ntwo\r\nthree'})
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.content, 'one\ntwo\nthree')
+
+    def test_patch_after_form_save_lands_where_the_editor_put_it(self):
+        self.client.post(reverse('note_edit', args=[self.note.pk]),
+                         {'title': 'Plan', 'content': 'one\r\ntwo\r\nthree'})
+        self.note.refresh_from_db()
+
+        # The textarea shows 'one\ntwo\nthree'; the editor inserts '2 ' before 'three'
+        response = self.patch(self.note.version, [[8, 0, '2 ']])
+
+        self.assertEqual(response.status_code, 200)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.content, 'one\ntwo\n2 three')
+
+    def test_patch_normalizes_rows_stored_with_crlf(self):
+        Note.objects.filter(pk=self.note.pk).update(content='one\r\ntwo\r\nthree', version=3)
+
+        response = self.patch(3, [[4, 3, 'TWO']])
+
+        self.assertEqual(response.status_code, 200)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.content, 'one\nTWO\nthree')
+
+    def test_oversized_title_is_rejected(self):
+        response = self.client.patch(
+            reverse('note_autosave', args=[self.note.pk]),
+            json.dumps({'version': self.note.version, 'patches': {'title': [[4, 0, 'x' * 200]]}}),
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.title, 'Plan')
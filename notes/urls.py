@@ -6,5 +6,6 @@ urlpatterns = [
     path('create/', views.note_create, name='note_create'),
     path('<uuid:pk>/', views.note_detail, name='note_detail'),
     path('<uuid:pk>/edit/', views.note_edit, name='note_edit'),
+    path('<uuid:pk>/autosave/', views.note_autosave, name='note_autosave'),
     path('<uuid:pk>/delete/', views.note_delete, name='note_delete'),
 ]
@@ -2,6 +2,9 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+from core.autosave import PatchError, normalize_newlines, parse_autosave_request, autosave_instance
 from .models import Note, Tag
 
 
@@ -40,8 +43,8 @@ def note_list(request):
 def note_create(request):
     """Create a new note"""
     if request.method == 'POST':
-        title = request.POST.get('title', '')
-        content = request.POST.get('content', '')
+        title = normalize_newlines(request.POST.get('title', ''))
+        content = normalize_newlines(request.POST.get('content', ''))
         tag_names = request.POST.get('tags', '').split(',')
         
         note = Note.objects.create(
@@ -76,8 +79,8 @@ def note_edit(request, pk):
     note = get_object_or_404(Note, pk=pk, user=request.user)
     
     if request.method == 'POST':
-        note.title = request.POST.get('title', '')
-        note.content = request.POST.get('content', '')
+        note.title = normalize_newlines(request.POST.get('title', ''))
+        note.content = normalize_newlines(request.POST.get('content', ''))
         
         # Update tags
         note.tags.clear()
@@ -88,6 +91,7 @@ def note_edit(request, pk):
                 tag, _ = Tag.objects.get_or_create(name=tag_name.lower())
                 note.tags.add(tag)
         
+        note.version += 1
         note.save()
         messages.success(request, 'Note updated successfully.')
         return redirect('note_detail', pk=note.pk)
@@ -99,6 +103,25 @@ def note_edit(request, pk):
     return render(request, 'notes/note_form.html', context)
 
 
+@login_required
+@require_http_methods(['PATCH'])
+def note_autosave(request, pk):
+    """Apply debounced editor patches to a note (JSON)"""
+    try:
+        base_version, patches = parse_autosave_request(request)
+    except PatchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return autosave_instance(
+        Note.objects.all(),
+        {'pk': pk, 'user': request.user},
+        base_version,
+        patches,
+        fields=['title', 'content'],
+        derived_fields={'content': ['content_plain']},
+    )
+
+
 @login_required
 def note_delete(request, pk):
     """Delete a note"""
@@ -21,9 +21,25 @@ $PYTHON manage.py collectstatic --noinput --verbosity=0 2>/dev/null || true
 echo "→ Running migrations..."
 $PYTHON manage.py migrate --noinput --verbosity=1
 
+echo "→ Seeding sync change log..."
+$PYTHON manage.py rebuild_changelog --if-empty || true
+
+echo "→ Updating task statuses..."
+$PYTHON manage.py update_task_statuses || true
+
 echo "→ Creating superuser..."
 $PYTHON manage.py create_initial_user 2>/dev/null || true
 
+# The disk is wiped on deploy: rebuild chat retrieval indexes alongside the
+# server rather than on each user's first message
+echo "→ Building missing retrieval indexes (background)..."
+$PYTHON manage.py build_retrieval_index --missing > /dev/null 2>&1 &
+
+# Overdue / at-risk flags change with the date, not with deploys: keep
+# refreshing them for as long as the server runs (hourly by default)
+echo "→ Scheduling task status updates (background)..."
+$PYTHON manage.py update_task_statuses --loop "${TASK_STATUS_INTERVAL:-3600}" &
+
 echo "→ Starting server..."
 exec $PYTHON -m gunicorn jaytipargal.wsgi:application \
     --bind "0.0.0.0:$PORT" \
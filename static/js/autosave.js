@@ -0,0 +1,136 @@
+/* ============================================
+   AUTOSAVE - Debounced Delta Patches
+   Sends [start, deleteCount, insert] splices
+   against the last version the server acked
+   ============================================ */
+
+(function (window) {
+    'use strict';
+
+    // Single splice turning oldText into newText (common prefix/suffix trim).
+    // Works on code points so offsets match Python string indices.
+    function diff(oldText, newText) {
+        if (oldText === newText) {
+            return null;
+        }
+        const a = Array.from(oldText);
+        const b = Array.from(newText);
+
+        let start = 0;
+        while (start < a.length && start < b.length && a[start] === b[start]) {
+            start++;
+        }
+
+        let endA = a.length;
+        let endB = b.length;
+        while (endA > start && endB > start && a[endA - 1] === b[endB - 1]) {
+            endA--;
+            endB--;
+        }
+
+        return [start, endA - start, b.slice(start, endB).join('')];
+    }
+
+    class Autosave {
+        constructor(options) {
+            this.url = options.url;
+            this.version = options.version || 0;
+            this.fields = options.fields;
+            this.csrfToken = options.csrfToken;
+            this.delay = options.delay || 1500;
+            this.onStatus = options.onStatus || function () {};
+
+            this.synced = {};
+            this.timer = null;
+            this.inFlight = false;
+            this.dirty = false;
+
+            Object.entries(this.fields).forEach(([name, el]) => {
+                this.synced[name] = el.value;
+                el.addEventListener('input', () => this.schedule());
+            });
+
+            window.addEventListener('online', () => this.schedule());
+            document.addEventListener('visibilitychange', () => {
+                if (document.visibilityState === 'hidden') {
+                    this.flush(true);
+                }
+            });
+        }
+
+        schedule() {
+            clearTimeout(this.timer);
+            this.timer = setTimeout(() => this.flush(), this.delay);
+        }
+
+        collectPatches() {
+            const patches = {};
+            const snapshot = {};
+            Object.entries(this.fields).forEach(([name, el]) => {
+                const op = diff(this.synced[name], el.value);
+                if (op) {
+                    patches[name] = [op];
+                    snapshot[name] = el.value;
+                }
+            });
+            return { patches, snapshot };
+        }
+
+        async flush(keepalive = false) {
+            clearTimeout(this.timer);
+            if (this.inFlight) {
+                this.dirty = true;
+                return;
+            }
+
+            const { patches, snapshot } = this.collectPatches();
+            if (Object.keys(patches).length === 0) {
+                return;
+            }
+
+            this.inFlight = true;
+            this.onStatus('saving');
+            try {
+                const response = await fetch(this.url, {
+                    method: 'PATCH',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRFToken': this.csrfToken,
+                    },
+                    body: JSON.stringify({ version: this.version, patches: patches }),
+                    credentials: 'same-origin',
+                    keepalive: keepalive,
+                });
+                const data = await response.json();
+
+                if (response.ok) {
+                    Object.assign(this.synced, snapshot);
+                    this.version = data.version;
+                    this.onStatus('saved', data);
+                } else if (response.status === 409) {
+                    // Someone else saved first: rebase on the server copy,
+                    // the next flush re-sends local edits against it
+                    Object.assign(this.synced, data.fields);
+                    this.version = data.version;
+                    this.dirty = true;
+                    this.onStatus('conflict', data);
+                } else {
+                    this.onStatus('error', data);
+                }
+            } catch (error) {
+                this.onStatus('offline');
+            } finally {
+                this.inFlight = false;
+                if (this.dirty) {
+                    this.dirty = false;
+                    this.schedule();
+                }
+            }
+        }
+    }
+
+    window.JaytiAutosave = {
+        attach: (options) => new Autosave(options),
+        diff: diff,
+    };
+})(window);
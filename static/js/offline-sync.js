@@ -0,0 +1,287 @@
+/* ============================================
+   OFFLINE SYNC - IndexedDB Write Queue
+   Queues diary, note, task and board mutations while
+   offline and replays them in one batch request.
+   Operations the server did not apply (conflict or
+   error) are kept in a second store and listed in
+   a panel next to the server copy until the user
+   keeps their change or drops it
+   ============================================ */
+
+(function (window) {
+    'use strict';
+
+    const DB_NAME = 'jaytipargal-offline';
+    const STORE_NAME = 'mutations';
+    const UNSYNCED_STORE = 'unsynced';
+    const SYNC_URL = '/api/offline-sync/';
+    const SYNC_TAG = 'sync-offline-writes';
+    const BATCH_SIZE = 200;
+
+    let flushing = null;
+
+    function openDB() {
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.open(DB_NAME, 2);
+            request.onupgradeneeded = (event) => {
+                const db = request.result;
+                if (event.oldVersion < 1) {
+                    const store = db.createObjectStore(STORE_NAME, { keyPath: 'id' });
+                    store.createIndex('queued_at', 'queued_at');
+                }
+                if (event.oldVersion < 2) {
+                    // {id, op, result}: the queued operation and the server's answer
+                    db.createObjectStore(UNSYNCED_STORE, { keyPath: 'id' });
+                }
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    async function withStore(mode, callback, storeName = STORE_NAME) {
+        const db = await openDB();
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(storeName, mode);
+            const result = callback(tx.objectStore(storeName));
+            tx.oncomplete = () => resolve(result && result.result !== undefined ? result.result : result);
+            tx.onerror = () => reject(tx.error);
+        });
+    }
+
+    function newKey() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+
+    function getCookie(name) {
+        const match = document.cookie.match(new RegExp('(^|;\\s*)' + name + '=([^;]*)'));
+        return match ? decodeURIComponent(match[2]) : null;
+    }
+
+    // Queue a mutation: {type: 'diary'|'note'|'task'|'board', action, pk?, data, base_modified_at?}
+    async function queue(mutation) {
+        const op = Object.assign({}, mutation, {
+            id: newKey(),
+            queued_at: new Date().toISOString(),
+        });
+        await withStore('readwrite', (store) => store.put(op));
+
+        if ('serviceWorker' in navigator && 'SyncManager' in window) {
+            try {
+                const registration = await navigator.serviceWorker.ready;
+                await registration.sync.register(SYNC_TAG);
+            } catch (error) {
+                // Background sync unavailable, the online listener covers it
+            }
+        }
+        if (navigator.onLine) {
+            flush();
+        }
+        return op;
+    }
+
+    function pending() {
+        return withStore('readonly', (store) => store.getAll())
+            .then((ops) => ops.sort((a, b) => a.queued_at.localeCompare(b.queued_at)));
+    }
+
+    function unsynced() {
+        return withStore('readonly', (store) => store.getAll(), UNSYNCED_STORE);
+    }
+
+    async function sendBatch(ops) {
+        const response = await fetch(SYNC_URL, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken'),
+            },
+            credentials: 'same-origin',
+            body: JSON.stringify({ operations: ops }),
+        });
+        if (!response.ok) {
+            throw new Error('Sync failed with status ' + response.status);
+        }
+        return (await response.json()).results;
+    }
+
+    // Replay everything queued; every result (applied, conflict, error) is final
+    function flush() {
+        if (flushing) {
+            return flushing;
+        }
+        flushing = (async () => {
+            const allResults = [];
+            let ops = await pending();
+            while (ops.length) {
+                const batch = ops.slice(0, BATCH_SIZE);
+                const results = await sendBatch(batch);
+                // Keep what did not apply where the user can see it before
+                // dropping it from the queue
+                const byId = Object.fromEntries(batch.map((op) => [op.id, op]));
+                await withStore('readwrite', (store) => {
+                    results.filter((result) => result.status !== 'applied')
+                        .forEach((result) => store.put({ id: result.id, op: byId[result.id], result: result }));
+                }, UNSYNCED_STORE);
+                await withStore('readwrite', (store) => {
+                    results.forEach((result) => store.delete(result.id));
+                });
+                allResults.push(...results);
+                ops = ops.slice(BATCH_SIZE);
+            }
+            if (allResults.length) {
+                window.dispatchEvent(new CustomEvent('jayti:offline-synced', { detail: allResults }));
+            }
+            return allResults;
+        })().catch((error) => {
+            console.log('[OfflineSync] Will retry later:', error.message);
+            return [];
+        }).finally(() => {
+            flushing = null;
+        });
+        return flushing;
+    }
+
+    // Conflicts and errors, resolved by the user
+
+    // Keep the queued change: queue it again on top of the server copy
+    async function keepMine(id) {
+        const entry = await withStore('readonly', (store) => store.get(id), UNSYNCED_STORE);
+        if (!entry) {
+            return;
+        }
+        const op = Object.assign({}, entry.op);
+        delete op.id;
+        delete op.queued_at;
+        const record = entry.result.record;
+        if (record && record.modified_at) {
+            op.base_modified_at = record.modified_at;
+        }
+        await withStore('readwrite', (store) => store.delete(id), UNSYNCED_STORE);
+        await queue(op);
+        renderUnsynced();
+    }
+
+    async function discard(id) {
+        await withStore('readwrite', (store) => store.delete(id), UNSYNCED_STORE);
+        renderUnsynced();
+    }
+
+    const LABELS = { diary: 'Diary entry', note: 'Note', task: 'Task', board: 'Board move' };
+
+    function describe(value) {
+        if (Array.isArray(value)) {
+            return value.map((item) => (typeof item === 'object' ? JSON.stringify(item) : item)).join(', ');
+        }
+        if (value && typeof value === 'object') {
+            return JSON.stringify(value);
+        }
+        return value === undefined || value === null || value === '' ? '—' : String(value);
+    }
+
+    function element(tag, className, text) {
+        const el = document.createElement(tag);
+        if (className) {
+            el.className = className;
+        }
+        if (text !== undefined) {
+            el.textContent = text;  // never innerHTML: these are user texts
+        }
+        return el;
+    }
+
+    // One card per unsynced operation: the queued values next to the server's
+    function renderEntry(entry) {
+        const { op, result } = entry;
+        const conflict = result.status === 'conflict';
+        const card = element('div', 'border rounded p-2 mb-2 bg-white');
+        const heading = conflict
+            ? `${LABELS[op.type] || op.type} changed elsewhere while you were offline`
+            : `${LABELS[op.type] || op.type} could not be saved: ${result.error}`;
+        card.appendChild(element('div', 'fw-semibold small mb-1', heading));
+
+        const data = op.data || {};
+        const record = result.record || {};
+        const table = element('table', 'table table-sm small mb-2');
+        const head = table.createTHead().insertRow();
+        ['', 'Your change'].concat(conflict ? ['Saved version'] : []).forEach((label) => {
+            head.appendChild(element('th', '', label));
+        });
+        const body = table.createTBody();
+        Object.keys(data).forEach((field) => {
+            const row = body.insertRow();
+            row.appendChild(element('th', 'text-muted fw-normal', field));
+            row.appendChild(element('td', 'text-break', describe(data[field])));
+            if (conflict) {
+                row.appendChild(element('td', 'text-break', describe(record[field])));
+            }
+        });
+        card.appendChild(table);
+
+        if (conflict) {
+            const keep = element('button', 'btn btn-sm btn-primary me-2', 'Keep my change');
+            keep.type = 'button';
+            keep.addEventListener('click', () => keepMine(entry.id));
+            card.appendChild(keep);
+        }
+        const drop = element('button', 'btn btn-sm btn-outline-secondary',
+            conflict ? 'Keep saved version' : 'Dismiss');
+        drop.type = 'button';
+        drop.addEventListener('click', () => discard(entry.id));
+        card.appendChild(drop);
+        return card;
+    }
+
+    async function renderUnsynced() {
+        let entries;
+        try {
+            entries = await unsynced();
+        } catch (error) {
+            return;  // IndexedDB unavailable (private mode)
+        }
+        let panel = document.getElementById('offlineUnsynced');
+        if (!entries.length) {
+            if (panel) {
+                panel.remove();
+            }
+            return;
+        }
+        if (!panel) {
+            panel = element('div', 'offline-unsynced alert alert-warning shadow');
+            panel.id = 'offlineUnsynced';
+            panel.setAttribute('role', 'alert');
+            document.body.appendChild(panel);
+        }
+        panel.replaceChildren(element('div', 'fw-semibold mb-2',
+            `${entries.length} offline change${entries.length === 1 ? '' : 's'} need${entries.length === 1 ? 's' : ''} your attention`));
+        entries.forEach((entry) => panel.appendChild(renderEntry(entry)));
+    }
+
+    window.addEventListener('jayti:offline-synced', renderUnsynced);
+    window.addEventListener('online', flush);
+
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.addEventListener('message', (event) => {
+            if (event.data && event.data.type === 'SYNC_OFFLINE_WRITES') {
+                flush();
+            }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        renderUnsynced();
+        if (navigator.onLine) {
+            flush();
+        }
+    });
+
+    window.JaytiOffline = {
+        queue: queue,
+        flush: flush,
+        pending: pending,
+        unsynced: unsynced,
+    };
+})(window);
@@ -1,9 +1,24 @@
 /* ============================================
    SERVICE WORKER - TRUE OFFLINE MODE (PWA)
-   Cache-First Strategy | Offline Write Support
+   Hashed Precache | Offline Write Support
    ============================================ */
 
-const CACHE_NAME = 'jaytipargal-v1';
+// Precache manifest generated by collectstatic (core.storage): hashed
+// static URLs with per-file revisions. Missing in local dev, where
+// nothing is precached and static files go through the runtime cache.
+try {
+    importScripts('/static/precache-manifest.js');
+} catch (error) {
+    console.log('[SW] No precache manifest, skipping precache');
+}
+
+const PRECACHE_MANIFEST = self.__PRECACHE_MANIFEST || { version: 'dev', entries: [] };
+const PRECACHE_URLS = PRECACHE_MANIFEST.entries.map((entry) => new URL(entry.url, self.location.origin).href);
+const PRECACHE_NAME = 'jaytipargal-precache';
+const RUNTIME_CACHE_NAME = 'jaytipargal-runtime';
+const CURRENT_CACHES = [PRECACHE_NAME, RUNTIME_CACHE_NAME];
+
+// Pages and third-party assets warmed on install (best effort)
 const APP_SHELL_URLS = [
     '/',
     '/dashboard/',
@@ -12,99 +27,106 @@ const APP_SHELL_URLS = [
     '/goals/',
     '/notes/',
     '/astro/',
-    '/static/css/custom.css',
-    '/static/js/offline-sync.js',
     'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css',
     'https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js',
     'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css',
     'https://fonts.googleapis.com/css2?family=Playfair+Display:ital,wght@0,400;0,600;0,700;1,400&family=Lato:wght@300;400;700&family=Dancing+Script:wght@400;600&display=swap'
 ];
 
-// Install Event - Cache App Shell
+// Install Event - Download only the assets this deploy changed
 self.addEventListener('install', (event) => {
-    console.log('[SW] Installing...');
+    console.log('[SW] Installing precache', PRECACHE_MANIFEST.version);
     
     event.waitUntil(
-        caches.open(CACHE_NAME)
-            .then((cache) => {
-                console.log('[SW] Caching app shell');
-                return cache.addAll(APP_SHELL_URLS);
-            })
-            .then(() => {
-                console.log('[SW] App shell cached successfully');
-                return self.skipWaiting();
-            })
-            .catch((error) => {
-                console.error('[SW] Cache failed:', error);
-            })
+        (async () => {
+            const cache = await caches.open(PRECACHE_NAME);
+            const cachedUrls = new Set((await cache.keys()).map((request) => request.url));
+            const missing = PRECACHE_URLS.filter((url) => !cachedUrls.has(url));
+            
+            // Hashed URLs never change content, so anything already cached is current
+            console.log(`[SW] Fetching ${missing.length} of ${PRECACHE_URLS.length} assets`);
+            await cache.addAll(missing);
+            
+            const runtime = await caches.open(RUNTIME_CACHE_NAME);
+            await Promise.all(APP_SHELL_URLS.map((url) =>
+                runtime.add(url).catch(() => console.log('[SW] Could not warm:', url))
+            ));
+            
+            return self.skipWaiting();
+        })().catch((error) => {
+            console.error('[SW] Precache failed:', error);
+            throw error;
+        })
     );
 });
 
-// Activate Event - Clean old caches
+// Activate Event - Drop old caches and assets no longer in the manifest
 self.addEventListener('activate', (event) => {
     console.log('[SW] Activating...');
     
     event.waitUntil(
-        caches.keys()
-            .then((cacheNames) => {
-                return Promise.all(
-                    cacheNames
-                        .filter((name) => name !== CACHE_NAME)
-                        .map((name) => caches.delete(name))
-                );
-            })
-            .then(() => {
-                console.log('[SW] Activated successfully');
-                return self.clients.claim();
-            })
+        (async () => {
+            const cacheNames = await caches.keys();
+            await Promise.all(
+                cacheNames
+                    .filter((name) => !CURRENT_CACHES.includes(name))
+                    .map((name) => caches.delete(name))
+            );
+            
+            const wanted = new Set(PRECACHE_URLS);
+            const cache = await caches.open(PRECACHE_NAME);
+            const stale = (await cache.keys()).filter((request) => !wanted.has(request.url));
+            await Promise.all(stale.map((request) => cache.delete(request)));
+            
+            console.log(`[SW] Activated, removed ${stale.length} stale assets`);
+            return self.clients.claim();
+        })()
     );
 });
 
-// Fetch Event - Cache-First Strategy
+// Fetch Event
 self.addEventListener('fetch', (event) => {
     const { request } = event;
     const url = new URL(request.url);
     
-    // Skip non-GET requests (POST, PUT, DELETE go to network)
+    // Skip non-GET requests (POST, PUT, PATCH, DELETE go to network)
     if (request.method !== 'GET') {
         return;
     }
     
-    // Strategy: Cache-First for App Shell, Network-First for API
-    if (isAppShell(url.pathname)) {
-        event.respondWith(cacheFirst(request));
+    if (PRECACHE_URLS.includes(url.href)) {
+        // Hashed static asset: cache-first, it can never go stale
+        event.respondWith(cacheFirst(request, PRECACHE_NAME));
     } else if (isAPIRequest(url.pathname)) {
         event.respondWith(networkFirst(request));
+    } else if (request.mode === 'navigate') {
+        // Pages carry user data: always try the network first
+        event.respondWith(networkFirst(request));
     } else {
         // Default: Cache with network fallback
         event.respondWith(cacheWithNetworkFallback(request));
     }
 });
 
-// Helper: Check if request is for app shell
-function isAppShell(pathname) {
-    const appPaths = ['/', '/dashboard/', '/diary/', '/goals/', '/notes/', '/astro/', '/static/'];
-    return appPaths.some(path => pathname.startsWith(path));
-}
-
 // Helper: Check if request is for API
 function isAPIRequest(pathname) {
     return pathname.startsWith('/api/') || pathname.includes('/send_message/');
 }
 
 // Cache-First Strategy
-async function cacheFirst(request) {
-    const cache = await caches.open(CACHE_NAME);
+async function cacheFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
     const cached = await cache.match(request);
     
     if (cached) {
-        console.log('[SW] Serving from cache:', request.url);
         return cached;
     }
     
     try {
         const networkResponse = await fetch(request);
-        cache.put(request, networkResponse.clone());
+        if (networkResponse.ok) {
+            cache.put(request, networkResponse.clone());
+        }
         return networkResponse;
     } catch (error) {
         console.error('[SW] Network failed, no cache:', request.url);
@@ -112,13 +134,15 @@ async function cacheFirst(request) {
     }
 }
 
-// Network-First Strategy (for API calls)
+// Network-First Strategy (for pages and API calls)
 async function networkFirst(request) {
-    const cache = await caches.open(CACHE_NAME);
+    const cache = await caches.open(RUNTIME_CACHE_NAME);
     
     try {
         const networkResponse = await fetch(request);
-        cache.put(request, networkResponse.clone());
+        if (networkResponse.ok) {
+            cache.put(request, networkResponse.clone());
+        }
         return networkResponse;
     } catch (error) {
         console.log('[SW] Network failed, trying cache:', request.url);
@@ -144,12 +168,14 @@ async function networkFirst(request) {
 
 // Cache with Network Fallback
 async function cacheWithNetworkFallback(request) {
-    const cache = await caches.open(CACHE_NAME);
+    const cache = await caches.open(RUNTIME_CACHE_NAME);
     const cached = await cache.match(request);
     
     const networkFetch = fetch(request)
         .then((response) => {
-            cache.put(request, response.clone());
+            if (response.ok) {
+                cache.put(request, response.clone());
+            }
             return response;
         })
         .catch(() => cached);
@@ -159,19 +185,19 @@ async function cacheWithNetworkFallback(request) {
 
 // Background Sync for Offline Writes
 self.addEventListener('sync', (event) => {
-    if (event.tag === 'sync-diary-entries') {
+    if (event.tag === 'sync-offline-writes') {
         console.log('[SW] Background sync triggered');
-        event.waitUntil(syncDiaryEntries());
+        event.waitUntil(syncOfflineWrites());
     }
 });
 
-// Sync diary entries from IndexedDB to server
-async function syncDiaryEntries() {
+// Ask an open page to replay its IndexedDB write queue (see offline-sync.js)
+async function syncOfflineWrites() {
     const clients = await self.clients.matchAll();
     
     clients.forEach((client) => {
         client.postMessage({
-            type: 'SYNC_DIARY_ENTRIES'
+            type: 'SYNC_OFFLINE_WRITES'
         });
     });
 }